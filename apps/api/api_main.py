@@ -23,6 +23,12 @@ except ImportError:
     log.warning("New schema/middleware not available, using legacy")
     SCHEMA_AVAILABLE = False
 
+# Pooled outbound HTTP clients, closed with the app
+try:
+    from .common.http_pool import http_clients, http_clients_lifespan
+except ImportError:
+    from common.http_pool import http_clients, http_clients_lifespan
+
 # Import error utilities (with fallback)
 try:
     from .error_utils import ApiError, json_error, validate_base64_size
@@ -47,13 +53,6 @@ except ImportError:
         if size_mb > max_mb:
             raise ApiError(413, f"File too large ({size_mb:.2f}MB). Max {max_mb}MB.", "payload_too_large")
 
-# Import ticket-only prediction router
-try:
-    from .ticket_predict import router as ticket_router
-    app.include_router(ticket_router)
-except ImportError as e:
-    log.warning(f"ticket_predict router not found: {e}")
-
 # Import other modules (with safe fallbacks to prevent startup failures)
 try:
     from .odds import ml_to_fraction, ml_to_prob
@@ -84,7 +83,7 @@ try:
     from .research_scoring import calculate_research_predictions
 except ImportError:
     log.warning("research_scoring not found, using stub")
-    def calculate_research_predictions(horses, ctx): return {"predictions": {}}
+    def calculate_research_predictions(horses, model=None): return {"predictions": {}}
 
 try:
     from .openai_ocr import extract_rows_with_openai
@@ -95,9 +94,25 @@ except ImportError:
 app = FastAPI(
     title="FinishLine WPS AI",
     description="Win/Place/Show horse race prediction API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=http_clients_lifespan
 )
 
+# Import ticket-only prediction router
+try:
+    from .ticket_predict import router as ticket_router, artifacts
+    app.include_router(ticket_router)
+except ImportError as e:
+    log.warning(f"ticket_predict router not found: {e}")
+    artifacts = None
+
+# Import live odds stream router (SSE over ticket sessions)
+try:
+    from .ticket_stream import router as ticket_stream_router
+    app.include_router(ticket_stream_router)
+except ImportError as e:
+    log.warning(f"ticket_stream router not found: {e}")
+
 # Install new error middleware (ensures all responses are JSON)
 if SCHEMA_AVAILABLE:
     install_error_middleware(app)
@@ -221,6 +236,16 @@ async def debug_info():
     has_tavily = bool(os.getenv("FINISHLINE_TAVILY_API_KEY", "").strip())
     has_openai = bool(os.getenv("FINISHLINE_OPENAI_API_KEY", "").strip() or os.getenv("OPENAI_API_KEY", "").strip())
     timeout_ms = int(os.getenv("FINISHLINE_PROVIDER_TIMEOUT_MS", "25000"))
+
+    # Research cache counters (hits, misses, coalesced in-flight calls) per provider
+    provider_cache = {}
+    try:
+        from .provider_custom import cache_stats
+        provider_cache["custom"] = cache_stats()
+        from .provider_websearch import cache_stats
+        provider_cache["websearch"] = cache_stats()
+    except ImportError:
+        pass
     
     return {
         "allowed_origins": allow_origins,
@@ -231,6 +256,8 @@ async def debug_info():
         "openai_present": has_openai,
         "provider_timeout_ms": timeout_ms,
         "websearch_ready": provider_name == "websearch" and has_tavily and has_openai,
+        "provider_cache": provider_cache,
+        "http_pools": http_clients.stats(),
         "hints": {
             "websearch_provider_needs": ["FINISHLINE_TAVILY_API_KEY", "FINISHLINE_OPENAI_API_KEY"]
         }
@@ -270,7 +297,8 @@ async def predict_endpoint(request: Request, body: Dict[str, Any]):
             research_data = prior_analysis.get("research") or prior_analysis
         
         # Score horses using multi-factor handicapping
-        scored_horses = score_horses(horses, race_context, research_data)
+        snapshot = artifact_snapshot()
+        scored_horses = score_horses(horses, race_context, research_data, model=feature_model("predict", snapshot))
         
         # Extract W/P/S predictions
         predictions = wps_from_probs(scored_horses)
@@ -283,6 +311,7 @@ async def predict_endpoint(request: Request, body: Dict[str, Any]):
             "predictions": predictions,
             "scored": scored_horses[:10],  # Top 10 for display
             "mode": "fast" if fast_mode else "full",
+            "meta": artifact_meta(snapshot),
             "reqId": req_id,
             "elapsed_ms": elapsed_ms
         }, status_code=200)
@@ -422,7 +451,6 @@ async def photo_extract_openai_url(data: Dict[str, Any]):
     Returns: Same as photo_extract_openai
     """
     import os
-    import httpx
     from io import BytesIO
     from PIL import Image
     
@@ -441,14 +469,13 @@ async def photo_extract_openai_url(data: Dict[str, Any]):
             )
         
         # Download image
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            r = await client.get(image_url)
-            if r.status_code != 200:
-                return JSONResponse(
-                    status_code=400,
-                    content={"error": "download_failed", "where": "photo_extract_openai_url", "detail": f"HTTP {r.status_code}"}
-                )
-            image_data = r.content
+        r = await http_clients.get("download").get(image_url, timeout=10.0)
+        if r.status_code != 200:
+            return JSONResponse(
+                status_code=400,
+                content={"error": "download_failed", "where": "photo_extract_openai_url", "detail": f"HTTP {r.status_code}"}
+            )
+        image_data = r.content
         
         # Create a fake UploadFile from the downloaded data
         from fastapi import UploadFile
@@ -692,6 +719,54 @@ async def photo_extract_openai_b64_legacy(request: Request, body: Dict[str, Any]
             detail=str(e)[:200]
         )
 
+def artifact_snapshot():
+    """
+    The current artifact snapshot, taken once per request and passed down.
+    
+    Returns None when the artifact registry is unavailable.
+    """
+    if artifacts is None:
+        return None
+    return artifacts.current()
+
+
+def artifact_meta(snapshot) -> Dict[str, Any]:
+    """Response meta naming the artifact snapshot a request was served from."""
+    return {"artifact_version": snapshot.version if snapshot is not None else None}
+
+
+def feature_model(name: str, snapshot):
+    """
+    Horse feature model `name` from the request's artifact snapshot.
+    
+    Returns None (the scorer's built-in default) when there is no snapshot.
+    """
+    if snapshot is None:
+        return None
+    return snapshot.feature_models.get(name)
+
+
+def recalibrate_picks(resp_data: Dict[str, Any], snapshot) -> None:
+    """
+    Record why the reliability curve is not applied to research picks, in place.
+    
+    The artifact curve maps pick confidence as predict_wps computes it
+    (mean top-3 composite ** 0.9, clamped to 8%-85%), fitted over a narrow
+    confidence range. A research pick's prob is its share of the top-3
+    research scores (or an odds-implied probability for the stub), not that
+    confidence, so pushing it through the curve would flatten the picks onto
+    the curve's end points. prob is returned unchanged.
+    """
+    if snapshot is None:
+        return
+    resp_data["recalibration"] = {
+        "artifact_version": snapshot.version,
+        "temp_tau": snapshot.temp_tau,
+        "applied": False,
+        "skipped": "pick prob is a share of research scores, not the pick confidence the reliability curve is fitted on"
+    }
+
+
 @app.post("/api/finishline/research_predict")
 async def research_predict(payload: Dict[str, Any]):
     """
@@ -732,6 +807,8 @@ async def research_predict(payload: Dict[str, Any]):
         horses = payload.get("horses", [])
         race_context = payload.get("race_context", {})
         use_research = bool(payload.get("useResearch", True))
+        use_recalibration = bool(payload.get("recalibrate", False))
+        snapshot = artifact_snapshot()
         
         if not horses:
             return JSONResponse(
@@ -777,25 +854,15 @@ async def research_predict(payload: Dict[str, Any]):
             import time
             t0 = time.perf_counter()
             
-            # Helper: parse fractional odds to implied probability
-            def _norm_frac_odds(s):
-                if not s: return None
-                t = str(s).strip().upper().replace("–","-").replace("—","-").replace(" TO ","/").replace("TO","/").replace(":","/").replace(" ","")
-                for sep in ("/","-"):
-                    if sep in t:
-                        parts = t.split(sep, 1)
-                        if len(parts)==2 and parts[0].isdigit() and parts[1].isdigit():
-                            return (int(parts[0]), int(parts[1]))
-                if t.isdigit():
-                    return (int(t), 1)
-                return None
+            # Implied probability from ML odds (0.0 when unparsable)
+            try:
+                from .predict.odds import parse_odds
+            except ImportError:
+                from predict.odds import parse_odds
             
             def _implied_prob(odds):
-                fb = _norm_frac_odds(odds)
-                if not fb: return 0.0
-                a, b = fb
-                denom = a + b
-                return (b / denom) if denom > 0 else 0.0
+                parsed = parse_odds(odds)
+                return parsed.implied_win if parsed else 0.0
             
             # Rank by implied probability (lower ML odds → higher chance)
             scored = []
@@ -824,8 +891,11 @@ async def research_predict(payload: Dict[str, Any]):
                     "track": track,
                     "surface": surface,
                     "distance": distance
-                }
+                },
+                "meta": artifact_meta(snapshot)
             }
+            if use_recalibration:
+                recalibrate_picks(resp_data, snapshot)
             res = JSONResponse(resp_data, status_code=200)
             res.headers["X-Analysis-Duration"] = str(elapsed_ms)
             return res
@@ -842,10 +912,10 @@ async def research_predict(payload: Dict[str, Any]):
             # Override provider per request if specified
             if provider_name == "websearch" and not is_quick:
                 from .provider_websearch import WebSearchProvider
-                provider = WebSearchProvider()
+                provider = WebSearchProvider(budget_ms=timeout_ms)
             elif provider_name == "custom" and not is_quick:
                 from .provider_custom import CustomProvider
-                provider = CustomProvider()
+                provider = CustomProvider(budget_ms=timeout_ms)
             else:
                 # Quick mode or stub → use stub provider (no external calls)
                 class QuickStubProvider:
@@ -854,35 +924,14 @@ async def research_predict(payload: Dict[str, Any]):
                         return horses
                 provider = QuickStubProvider()
             
-            # Provider.enrich_horses is now async (no asyncio.run inside)
-            # For stability with many horses, process in smaller batches
-            horse_list = list(allowed.values())
-            if len(horse_list) > 6 and provider_name == "websearch":
-                # Batch processing for large fields (reduces timeout risk)
-                batch_size = 4
-                enriched = []
-                for i in range(0, len(horse_list), batch_size):
-                    batch = horse_list[i:i+batch_size]
-                    # Per-batch timeout (25s max per batch)
-                    try:
-                        batch_result = await asyncio.wait_for(
-                            provider.enrich_horses(batch, date=date, track=track),
-                            timeout=25.0
-                        )
-                        enriched.extend(batch_result)
-                    except asyncio.TimeoutError:
-                        logger.warning(f"[research_predict] Batch {i//batch_size+1} timed out, using original data")
-                        enriched.extend(batch)  # Use un-enriched data for this batch
-                enriched_horses = enriched
-            else:
-                # Small field or stub → process all at once
-                enriched_horses = await provider.enrich_horses(
-                    horse_list,
-                    date=date,
-                    track=track
-                )
+            # Provider.enrich_horses is async; providers enrich the whole field concurrently within the budget
+            enriched_horses = await provider.enrich_horses(
+                list(allowed.values()),
+                date=date,
+                track=track
+            )
             
-            predictions = calculate_research_predictions(enriched_horses)
+            predictions = calculate_research_predictions(enriched_horses, model=feature_model("research", snapshot))
             return predictions
         
         predictions = await asyncio.wait_for(_run(), timeout=timeout_ms / 1000.0)
@@ -935,8 +984,11 @@ async def research_predict(payload: Dict[str, Any]):
                 "track": track,
                 "surface": surface,
                 "distance": distance
-            }
+            },
+            "meta": artifact_meta(snapshot)
         }
+        if use_recalibration:
+            recalibrate_picks(resp_data, snapshot)
         res = JSONResponse(resp_data, status_code=200)
         res.headers["X-Analysis-Duration"] = str(elapsed_ms)
         return res
@@ -0,0 +1,160 @@
+"""
+Process-wide pooled HTTP clients for outbound calls.
+
+One httpx.AsyncClient per named pool (one upstream host each: the research
+API, web search, OpenAI), created on first use and kept for the life of the
+app, so connections (TCP + TLS) are reused across requests. Pools use
+HTTP/2 when the h2 package is installed, bounded connection counts and
+keep-alive expiry, and (over HTTP/1.1) count how often callers found every
+connection busy.
+
+Mount http_clients_lifespan on the app to close the pools on shutdown.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+try:
+    from ..config import HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_S, HTTP2_ENABLED
+except ImportError:
+    from config import HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_S, HTTP2_ENABLED
+
+log = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (httpx's optional HTTP/2 support)
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+# Default client timeout; callers pass their own per request
+DEFAULT_TIMEOUT_S = 30.0
+
+
+class _MeteredTransport(httpx.AsyncBaseTransport):
+    """
+    Transport wrapper counting in-flight requests against the pool size.
+
+    Saturation (a request arriving while max_connections are already in
+    flight, so it queues for a connection) is only counted over HTTP/1.1:
+    with HTTP/2 many requests share one connection and nothing queues at
+    that count, so the stat is reported as None.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, max_connections: int, http2: bool = False):
+        self._inner = inner
+        self.max_connections = max_connections
+        self.http2 = http2
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.saturated = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if not self.http2 and self.in_flight >= self.max_connections:
+            # Every connection is busy: this request queues for one
+            self.saturated += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self._inner.handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "saturated": None if self.http2 else self.saturated,
+            "max_connections": self.max_connections
+        }
+
+
+class HttpClientRegistry:
+    """Named, lazily created AsyncClients sharing one set of pool limits."""
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_MAX_KEEPALIVE,
+        keepalive_s: float = HTTP_KEEPALIVE_S,
+        http2: bool = HTTP2_ENABLED
+    ):
+        """
+        Args:
+            max_connections: Connection cap per pool (further requests queue)
+            max_keepalive: Idle connections kept open per pool
+            keepalive_s: Seconds an idle connection is kept
+            http2: Negotiate HTTP/2 (ignored if h2 is not installed)
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_s
+        )
+        self.http2 = http2 and H2_AVAILABLE
+        self._clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient, _MeteredTransport]] = {}
+
+    def get(self, pool: str = "default", transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+        """
+        Shared client for `pool`, created on first use.
+
+        A client belongs to the event loop that created it; a call from
+        another loop (or after close) gets a fresh client. Callers must not
+        close the returned client.
+
+        Args:
+            pool: Pool name, one per upstream host
+            transport: Inner transport for a new client (tests; default pooled HTTP)
+
+        Returns:
+            The pool's AsyncClient
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(pool)
+        if entry is not None and entry[0] is loop and not entry[1].is_closed:
+            return entry[1]
+        inner = transport or httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+        metered = _MeteredTransport(inner, self.limits.max_connections, http2=self.http2)
+        client = httpx.AsyncClient(transport=metered, timeout=DEFAULT_TIMEOUT_S)
+        self._clients[pool] = (loop, client, metered)
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-pool request counts, in-flight/peak and saturation (None under HTTP/2), plus the protocol settings."""
+        return {
+            "http2": self.http2,
+            "pools": {pool: metered.stats() for pool, (_, _, metered) in self._clients.items()}
+        }
+
+    async def aclose(self) -> None:
+        """Close every client created on the running loop and forget all pools."""
+        loop = asyncio.get_running_loop()
+        clients, self._clients = self._clients, {}
+        for pool, (owner, client, _) in clients.items():
+            if owner is loop:
+                try:
+                    await client.aclose()
+                except Exception as e:
+                    log.warning(f"closing HTTP pool {pool} failed: {e}")
+
+
+# Process-wide registry used by the providers and OCR calls
+http_clients = HttpClientRegistry()
+
+
+@asynccontextmanager
+async def http_clients_lifespan(app):
+    """Close the pooled clients when the app shuts down."""
+    try:
+        yield
+    finally:
+        await http_clients.aclose()
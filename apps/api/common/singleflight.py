@@ -0,0 +1,109 @@
+"""
+Single-flight request coalescing with a TTL result cache.
+
+Concurrent callers asking for the same key share one in-flight call instead
+of each starting their own; the result is cached for later callers.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """Per-key coalescing of async calls, plus hit/miss/coalesced counters."""
+
+    def __init__(self, ttl_s: float = 0):
+        """
+        Args:
+            ttl_s: Seconds a non-None result stays cached (0 = no caching)
+        """
+        self.ttl_s = ttl_s
+        self.cache: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def cached(self, key: Hashable) -> Any:
+        """Cached result for `key` (counted as a hit), or None if absent or expired."""
+        hit = self.cache.get(key)
+        if not hit:
+            return None
+        ts, value = hit
+        if time.time() - ts > self.ttl_s:
+            self.cache.pop(key, None)
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache a result obtained elsewhere (e.g. from a batch call)."""
+        if value is not None and self.ttl_s:
+            self.cache[key] = (time.time(), value)
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        timeout_s: Optional[float] = None
+    ) -> Any:
+        """
+        Result of `fn()` for `key`, shared with every concurrent caller.
+
+        A cached result is returned directly (hit). Otherwise the first
+        caller starts `fn()` (miss) and later callers await the same task
+        (coalesced). A caller that times out or is cancelled leaves the
+        shared task running for the others.
+
+        Args:
+            key: Hashable identity of the call (endpoint, params)
+            fn: Zero-argument coroutine factory doing the actual call
+            timeout_s: This caller's wait limit (None = no limit)
+
+        Returns:
+            The call's result
+
+        Raises:
+            asyncio.TimeoutError: If the wait exceeds timeout_s
+            Exception: Whatever fn() raised
+        """
+        if self.ttl_s:
+            value = self.cached(key)
+            if value is not None:
+                return value
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is loop:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = loop.create_task(self._run(key, fn))
+            # Nobody may be left to retrieve a failure (all callers timed out)
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return await asyncio.wait_for(asyncio.shield(task), timeout_s)
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fn()
+            self.put(key, value)
+            return value
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Counters plus current cache and in-flight sizes."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "cached": len(self.cache),
+            "inflight": len(self._inflight)
+        }
+
+    def clear(self) -> None:
+        """Drop cached results and reset the counters (in-flight calls finish normally)."""
+        self.cache.clear()
+        self.hits = self.misses = self.coalesced = 0
@@ -10,6 +10,34 @@ def env_bool(name: str, default: bool=False) -> bool:
     if val in ("0","false","no","off"): return False
     return default
 
+# Ticket-only prediction mode (pure math, no external calls)
+TICKET_ONLY_MODE = env_bool("FINISHLINE_TICKET_ONLY_MODE", True)
+
+# Time budgets and retry/backoff tuning
+ANALYZE_BUDGET_MS = int(os.getenv("FINISHLINE_ANALYZE_BUDGET_MS", "38000"))    # 38s total for analyze
+PREDICT_BUDGET_MS = int(os.getenv("FINISHLINE_PREDICT_BUDGET_MS", "55000"))    # 55s total for predict
+PER_CALL_TIMEOUT_MS = int(os.getenv("FINISHLINE_PER_CALL_TIMEOUT_MS", "12000"))  # 12s per upstream call
+JSON_RETRIES = 2             # Max retries for JSON parsing
+BACKOFF_BASE_MS = 250        # Base backoff delay
+BACKOFF_FACTOR = 1.8         # Exponential growth
+BACKOFF_JITTER_MAX_MS = 120  # Random jitter
+
+# Live race sessions (odds-delta recompute)
+SESSION_MAX = int(os.getenv("FINISHLINE_SESSION_MAX", "1000"))          # Sessions kept in memory
+SESSION_TTL_S = int(os.getenv("FINISHLINE_SESSION_TTL_S", "3600"))      # Idle expiry
+STREAM_COALESCE_MS = int(os.getenv("FINISHLINE_STREAM_COALESCE_MS", "250"))  # Ticks merged per recompute
+STREAM_KEEPALIVE_S = 15      # Idle SSE keepalive comment interval
+STREAM_QUEUE_SIZE = 8        # Pending events per subscriber before dropping oldest
+
+# Model artifacts (calibration / policy / signal weights), hot-reloaded
+ARTIFACT_POLL_S = float(os.getenv("FINISHLINE_ARTIFACT_POLL_S", "5"))  # 0 disables the watcher
+
+# Pooled outbound HTTP clients (one keep-alive pool per upstream)
+HTTP_MAX_CONNECTIONS = int(os.getenv("FINISHLINE_HTTP_MAX_CONNECTIONS", "64"))  # Per pool
+HTTP_MAX_KEEPALIVE = int(os.getenv("FINISHLINE_HTTP_MAX_KEEPALIVE", "16"))      # Idle connections kept per pool
+HTTP_KEEPALIVE_S = float(os.getenv("FINISHLINE_HTTP_KEEPALIVE_S", "30"))        # Idle connection expiry
+HTTP2_ENABLED = env_bool("FINISHLINE_HTTP2", True)                              # Used only if h2 is installed
+
 class Settings:
     VERCEL_ENV = os.getenv("VERCEL_ENV", "").lower()  # "production" | "preview" | "development"
     OCR_PROVIDER = os.getenv("OCR_PROVIDER", "openai").lower()  # "openai" | "tesseract" | "web" | "stub"
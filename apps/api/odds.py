@@ -2,10 +2,18 @@
 ML Odds Conversion Utilities
 Converts various odds formats to decimal and probability formats
 """
+try:
+    from .predict.odds import parse_odds
+except ImportError:
+    from predict.odds import parse_odds
+
 
 def ml_to_fraction(odds_str: str) -> float:
     """
-    Convert odds string like '5-2' or '6' into decimal format.
+    Convert odds string like '5-2' or '6' into fractional (profit) format.
+    
+    Parsing is done by predict.odds.parse_odds, so "7/2", "EVEN", "+350"
+    and decimal "3.50" are accepted as well.
     
     Examples:
     - "5-2" -> 2.5
@@ -13,18 +21,9 @@ def ml_to_fraction(odds_str: str) -> float:
     - "3-1" -> 3.0
     - "1-1" -> 1.0
     """
-    try:
-        # Handle fractional odds like "5-2"
-        if '-' in odds_str:
-            numerator, denominator = odds_str.split('-')
-            return float(numerator) / float(denominator)
-        
-        # Handle decimal odds like "6" or "6.5"
-        return float(odds_str)
-    
-    except (ValueError, ZeroDivisionError):
-        # Default to even odds if parsing fails
-        return 1.0
+    parsed = parse_odds(odds_str)
+    # Default to even odds if parsing fails
+    return parsed.decimal - 1.0 if parsed else 1.0
 
 def ml_to_prob(odds_str: str) -> float:
     """
@@ -35,15 +34,9 @@ def ml_to_prob(odds_str: str) -> float:
     - "6" -> 1/(6+1) ≈ 0.1429
     - "1-1" -> 1/(1+1) = 0.5
     """
-    try:
-        decimal_odds = ml_to_fraction(odds_str)
-        # Convert decimal odds to probability
-        probability = 1 / (decimal_odds + 1)
-        return round(probability, 4)
-    
-    except (ValueError, ZeroDivisionError):
-        # Default to 50% probability if parsing fails
-        return 0.5
+    parsed = parse_odds(odds_str)
+    # Default to 50% probability if parsing fails
+    return round(parsed.implied_win, 4) if parsed else 0.5
 
 def prob_to_ml(probability: float) -> str:
     """
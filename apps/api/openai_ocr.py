@@ -9,6 +9,8 @@ from fastapi import UploadFile
 from PIL import Image
 from openai import OpenAI
 
+from .common.http_pool import http_clients
+
 logger = logging.getLogger("finishline")
 logger.setLevel(logging.INFO)
 
@@ -135,20 +137,20 @@ async def run_openai_ocr_on_bytes(content: bytes, filename: str) -> Dict[str, An
     }
     
     headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post("https://api.openai.com/v1/chat/completions", json=body, headers=headers)
-        r.raise_for_status()
-        data = r.json()
-        raw = data["choices"][0]["message"]["content"]
-        try:
-            import json as json_module
-            parsed = json_module.loads(raw)
-            rows = parsed.get("parsed_horses", parsed.get("horses", []))
-            cleaned = post_process_horses(rows)
-            return {"horses": cleaned}
-        except Exception as e:
-            print(f"[OpenAI OCR] Parse error: {e}")
-            return {"horses": []}
+    client = http_clients.get("openai")
+    r = await client.post("https://api.openai.com/v1/chat/completions", json=body, headers=headers, timeout=30)
+    r.raise_for_status()
+    data = r.json()
+    raw = data["choices"][0]["message"]["content"]
+    try:
+        import json as json_module
+        parsed = json_module.loads(raw)
+        rows = parsed.get("parsed_horses", parsed.get("horses", []))
+        cleaned = post_process_horses(rows)
+        return {"horses": cleaned}
+    except Exception as e:
+        print(f"[OpenAI OCR] Parse error: {e}")
+        return {"horses": []}
 
 def decode_data_url_or_b64(data_b64: str) -> bytes:
     """Decode plain base64 or data URL to bytes"""
@@ -439,19 +441,19 @@ async def extract_rows_with_openai(files: List[UploadFile]) -> Dict[str, Any]:
     }
 
     headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post("https://api.openai.com/v1/chat/completions", json=body, headers=headers)
-        r.raise_for_status()
-        data = r.json()
-        raw = data["choices"][0]["message"]["content"]
-        try:
-            import json
-            parsed = json.loads(raw)
-            rows = parsed.get("parsed_horses", parsed.get("horses", []))
-            # Post-process: normalize odds, ignore sire, add defaults
-            cleaned = post_process_horses(rows)
-            return {"parsed_horses": cleaned}
-        except Exception as e:
-            print(f"[OpenAI OCR] Parse error: {e}")
-            return {"parsed_horses": []}
+    client = http_clients.get("openai")
+    r = await client.post("https://api.openai.com/v1/chat/completions", json=body, headers=headers, timeout=30)
+    r.raise_for_status()
+    data = r.json()
+    raw = data["choices"][0]["message"]["content"]
+    try:
+        import json
+        parsed = json.loads(raw)
+        rows = parsed.get("parsed_horses", parsed.get("horses", []))
+        # Post-process: normalize odds, ignore sire, add defaults
+        cleaned = post_process_horses(rows)
+        return {"parsed_horses": cleaned}
+    except Exception as e:
+        print(f"[OpenAI OCR] Parse error: {e}")
+        return {"parsed_horses": []}
 
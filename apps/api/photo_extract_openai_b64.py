@@ -2,8 +2,8 @@
 import json, os, sys, traceback, base64, time
 from typing import Dict, Any
 from apps.lib.config import FINISHLINE_OPENAI_API_KEY, FINISHLINE_OPENAI_MODEL, boot_banner
+from apps.api.common.http_pool import http_clients
 from fastapi import APIRouter, Request, Response
-import httpx
 
 router = APIRouter()
 
@@ -52,8 +52,7 @@ async def _call_openai(image_b64: str, model: str, timeout=60) -> Dict[str, Any]
     }
 
     t0 = time.time()
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        r = await client.post(OPENAI_URL, headers=headers, json=payload)
+    r = await http_clients.get("openai").post(OPENAI_URL, headers=headers, json=payload, timeout=timeout)
     dt = time.time() - t0
 
     meta = {
@@ -0,0 +1,310 @@
+"""
+Hot-reloadable registry of model artifacts.
+
+Loads the calibration summary (calibration_v1.json), the reliability /
+policy parameters (model_params.json), the signal weights
+(signal_weights_v1.json), the per-endpoint horse feature models
+(horse_models_v1.json), the fitted
+calibration constants (calibration_params_v1.json) and the bootstrap CI
+table (ci_table_v1.json) into one immutable ArtifactSnapshot of compact
+arrays. Requests read registry.current() (a single attribute read, no
+file I/O) and use that snapshot for the whole request, so a reload can
+never mix two versions inside one response.
+
+A background task polls the files' (mtime, size) and, when one changes,
+builds a new snapshot and swaps the reference. A file that fails to parse
+(e.g. caught mid-write) leaves the previous snapshot in place until the
+next poll.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from .features import models_from_artifact
+from .intervals import CITable, DEFAULT_CI_TABLE_PATH
+from .params import DEFAULT_PARAMS, DEFAULT_PARAMS_PATH, DEFAULT_VERSION, params_from_artifact
+from .recalibrate import Recalibrator
+
+log = logging.getLogger(__name__)
+
+
+ARTIFACT_FILES = {
+    "calibration": "calibration_v1.json",
+    "model_params": "model_params.json",
+    "signal_weights": "signal_weights_v1.json",
+    "horse_models": "horse_models_v1.json",
+    "fitted_params": DEFAULT_PARAMS_PATH.name,
+    "ci_table": DEFAULT_CI_TABLE_PATH.name,
+}
+
+# Leading number of a bin/band label ("60-64", "85+")
+_LOWER_EDGE = re.compile(r"^\s*(\d+(?:\.\d+)?)")
+
+
+def default_artifact_paths(directory: Optional[str] = None) -> Dict[str, str]:
+    """
+    Artifact paths under `directory` (default FINISHLINE_ARTIFACT_DIR or data/).
+
+    The fitted parameters keep their own FINISHLINE_CALIBRATION_PARAMS override.
+    """
+    directory = directory or os.getenv("FINISHLINE_ARTIFACT_DIR") or str(DEFAULT_PARAMS_PATH.parent)
+    paths = {name: os.path.join(directory, filename) for name, filename in ARTIFACT_FILES.items()}
+    if os.getenv("FINISHLINE_CALIBRATION_PARAMS"):
+        paths["fitted_params"] = os.environ["FINISHLINE_CALIBRATION_PARAMS"]
+    return paths
+
+
+def _edge_table(mapping: Dict[str, Any]) -> Tuple[np.ndarray, Tuple[str, ...]]:
+    """Labels sorted by their numeric lower edge, as (edges, labels)."""
+    keyed = []
+    for label in mapping:
+        m = _LOWER_EDGE.match(str(label))
+        if m:
+            keyed.append((float(m.group(1)), str(label)))
+    keyed.sort()
+    return np.array([k for k, _ in keyed], dtype=np.float64), tuple(label for _, label in keyed)
+
+
+def _bucket(edges: np.ndarray, value: float) -> int:
+    """Index of the bucket whose lower edge is <= value (clamped to the table)."""
+    i = int(np.searchsorted(edges, value, side="right")) - 1
+    return min(max(i, 0), edges.shape[0] - 1)
+
+
+class ArtifactSnapshot:
+    """One immutable, fully parsed set of artifacts."""
+
+    __slots__ = (
+        "version", "sources", "loaded_at", "params", "ci_table",
+        "reliability_c", "reliability_p", "temp_tau", "recalibrator",
+        "policy_edges", "policy_bands", "policy_recommended", "policy_stats",
+        "bin_edges", "bin_labels", "bin_count", "bin_win_rate", "bin_top3_rate",
+        "stake_edges", "stake_units", "exotics_rules",
+        "signal_features", "signal_weights", "signal_intercept", "feature_models",
+    )
+
+    def __init__(self, documents: Dict[str, Optional[Dict[str, Any]]], sources: Dict[str, Dict[str, Any]]):
+        """
+        Args:
+            documents: Parsed JSON per artifact name (None if the file is missing)
+            sources: Per-artifact {path, version, sha} for reporting
+        """
+        self.sources = sources
+        self.loaded_at = time.time()
+        digest = hashlib.sha1("|".join(f"{k}:{sources[k]['sha']}" for k in sorted(sources)).encode())
+        self.version = digest.hexdigest()[:12]
+
+        fitted = documents.get("fitted_params")
+        self.params = params_from_artifact(fitted)["params"] if fitted is not None else dict(DEFAULT_PARAMS)
+        ci_doc = documents.get("ci_table")
+        self.ci_table = CITable.from_artifact(ci_doc) if ci_doc is not None else None
+
+        model = documents.get("model_params") or {}
+        points = sorted((float(pt["c"]), float(pt["p"])) for pt in model.get("reliability") or [])
+        self.reliability_c = np.array([c for c, _ in points], dtype=np.float64)
+        self.reliability_p = np.array([p for _, p in points], dtype=np.float64)
+        self.temp_tau = float(model.get("temp_tau") or 1.0)
+        self.recalibrator = Recalibrator(self.reliability_c, self.reliability_p, self.temp_tau)
+        policy = model.get("policy") or {}
+        self.policy_edges, self.policy_bands = _edge_table(policy)
+        self.policy_recommended = tuple(policy[b].get("recommended") for b in self.policy_bands)
+        self.policy_stats = tuple(policy[b].get("stats") for b in self.policy_bands)
+
+        calibration = documents.get("calibration") or {}
+        bins = {str(m["bin"]): m for m in calibration.get("bin_metrics") or [] if "bin" in m}
+        self.bin_edges, self.bin_labels = _edge_table(bins)
+        self.bin_count = np.array([bins[b].get("count") or 0 for b in self.bin_labels], dtype=np.int64)
+        self.bin_win_rate = np.array([bins[b].get("win_rate") or 0.0 for b in self.bin_labels], dtype=np.float64)
+        self.bin_top3_rate = np.array([bins[b].get("top3_rate") or 0.0 for b in self.bin_labels], dtype=np.float64)
+        stake_curve = calibration.get("stake_curve") or {}
+        self.stake_edges, stake_labels = _edge_table(stake_curve)
+        self.stake_units = np.array([stake_curve[k] for k in stake_labels], dtype=np.float64)
+        self.exotics_rules = dict(calibration.get("exotics_rules") or {})
+
+        signals = documents.get("signal_weights") or {}
+        self.signal_features = tuple(signals.get("feature_order") or ())
+        weights = list(signals.get("weights") or [])[:len(self.signal_features)]
+        self.signal_weights = np.array(weights + [0.0] * (len(self.signal_features) - len(weights)), dtype=np.float64)
+        self.signal_intercept = float(signals.get("intercept") or 0.0)
+        horse_models = documents.get("horse_models")
+        if horse_models is None and sources:
+            log.warning("No horse_models artifact, scoring with the built-in feature models")
+        self.feature_models = models_from_artifact(horse_models)
+
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+
+    def reliability(self, confidence):
+        """
+        Map raw confidence (0-1) through the reliability curve.
+
+        Linear interpolation between curve points, clamped at both ends;
+        identity when the curve is empty. Accepts scalars or arrays.
+        """
+        if self.reliability_c.shape[0] == 0:
+            return confidence
+        return np.interp(confidence, self.reliability_c, self.reliability_p)
+
+    def policy_for(self, confidence_pct: float) -> Optional[Dict[str, Any]]:
+        """Policy band for a confidence percentage: {band, recommended, stats}, or None."""
+        if self.policy_edges.shape[0] == 0:
+            return None
+        i = _bucket(self.policy_edges, confidence_pct)
+        return {"band": self.policy_bands[i], "recommended": self.policy_recommended[i], "stats": self.policy_stats[i]}
+
+    def stake_for(self, confidence_pct: float) -> Optional[float]:
+        """Stake units from the stake curve, or None if there is no curve."""
+        if self.stake_edges.shape[0] == 0:
+            return None
+        return float(self.stake_units[_bucket(self.stake_edges, confidence_pct)])
+
+    def bin_for(self, confidence_pct: float) -> Optional[Dict[str, Any]]:
+        """Historical bin metrics for a confidence percentage, or None."""
+        if self.bin_edges.shape[0] == 0:
+            return None
+        i = _bucket(self.bin_edges, confidence_pct)
+        return {
+            "bin": self.bin_labels[i],
+            "count": int(self.bin_count[i]),
+            "win_rate": float(self.bin_win_rate[i]),
+            "top3_rate": float(self.bin_top3_rate[i])
+        }
+
+    def signal_score(self, features: Dict[str, float]) -> float:
+        """intercept + Σ weight_k · feature_k in the artifact's feature order (missing features are 0)."""
+        values = np.array([float(features.get(f, 0.0) or 0.0) for f in self.signal_features], dtype=np.float64)
+        return self.signal_intercept + float(values @ self.signal_weights)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"version": self.version, "loaded_at": self.loaded_at, "params": self.params, "sources": self.sources}
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def load_snapshot(paths: Dict[str, str]) -> ArtifactSnapshot:
+    """
+    Read and parse every artifact.
+
+    Missing files fall back to defaults; a present but unparsable file raises.
+
+    Raises:
+        ValueError, KeyError, TypeError: If an artifact is malformed
+    """
+    documents, sources = {}, {}
+    for name, path in paths.items():
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            documents[name] = None
+            version = DEFAULT_VERSION if name == "fitted_params" else "missing"
+            sources[name] = {"path": path, "version": version, "sha": "-"}
+            continue
+        doc = json.loads(raw)
+        if not isinstance(doc, dict):
+            raise ValueError(f"{path}: expected a JSON object")
+        documents[name] = doc
+        sources[name] = {
+            "path": path,
+            "version": str(doc.get("version", "unversioned")),
+            "sha": hashlib.sha1(raw).hexdigest()[:8]
+        }
+    return ArtifactSnapshot(documents, sources)
+
+
+class ArtifactRegistry:
+    """Holds the current ArtifactSnapshot and swaps in new ones as files change."""
+
+    def __init__(self, paths: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            paths: {artifact name: file path} (default default_artifact_paths())
+        """
+        self.paths = dict(paths or default_artifact_paths())
+        self.reloads = 0
+        self.failures = 0
+        self._reload_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stamps = self._read_stamps()
+        try:
+            self._snapshot = load_snapshot(self.paths)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning(f"Artifacts unusable at startup, using defaults: {e}")
+            self.failures += 1
+            self._snapshot = load_snapshot({})
+
+    def _read_stamps(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        return tuple(_stamp(self.paths[name]) for name in sorted(self.paths))
+
+    def current(self) -> ArtifactSnapshot:
+        """The live snapshot (take it once per request and use it throughout)."""
+        return self._snapshot
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Rebuild the snapshot if any artifact file changed.
+
+        Args:
+            force: Re-read even if no file stamp changed
+
+        Returns:
+            True if a new version was swapped in
+        """
+        with self._reload_lock:
+            stamps = self._read_stamps()
+            if stamps == self._stamps and not force:
+                return False
+            try:
+                snapshot = load_snapshot(self.paths)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # Keep serving the old snapshot; stamps stay stale so the next poll retries
+                self.failures += 1
+                log.warning(f"Artifact reload failed, keeping {self._snapshot.version}: {e}")
+                return False
+            self._stamps = stamps
+            if snapshot.version == self._snapshot.version:
+                return False
+            previous, self._snapshot = self._snapshot, snapshot
+            self.reloads += 1
+            log.info(f"Artifacts reloaded: {previous.version} -> {snapshot.version}")
+            return True
+
+    async def watch(self, interval_s: float) -> None:
+        """Poll for changed artifacts until cancelled."""
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception:
+                log.exception("Artifact watch iteration failed")
+
+    def start(self, interval_s: float) -> None:
+        """Start the polling task on the running loop (no-op if running or interval <= 0)."""
+        if interval_s <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self.watch(interval_s))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -3,17 +3,51 @@ Calibrated win probabilities from ML odds (ticket-only mode).
 No external data - uses empirical calibration constants.
 """
 import math
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 
-# Calibration constants (derived from historical data, ticket-only safe)
-CALIBRATION_A = 0.04  # Logit intercept
-CALIBRATION_B = 0.92  # Logit slope
+from .params import load_calibration_params
+
+
+# Calibration constants (fitted offline by fit_calibration, else generic priors)
+_FITTED = load_calibration_params()
+CALIBRATION_VERSION = _FITTED["version"]
+CALIBRATION_A = _FITTED["params"]["calibration_a"]  # Logit intercept
+CALIBRATION_B = _FITTED["params"]["calibration_b"]  # Logit slope
+FIELD_SIZE_ALPHA = _FITTED["params"]["field_size_alpha"]  # Field-size smoothing
 
 # Probability bounds
 MIN_PROB = 0.0005  # 0.05% (practical minimum)
 MAX_PROB = 0.85    # 85% (even heavy favorites aren't locks)
 
+# Row-sum floor for the matrix path (keeps empty padding rows at 0/tiny = 0)
+_TINY = np.finfo(np.float64).tiny
+
+
+def wilson_interval(p: np.ndarray, n_trials: int = 100, z: float = 1.96) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Wilson score interval for n_trials pseudo-trials.
+    
+    Used when no bootstrap CI table (intervals.CITable) is available.
+    
+    Returns:
+        (ci_low, ci_high) clamped to [MIN_PROB, MAX_PROB]
+    """
+    p_ci = np.minimum(np.maximum(p, MIN_PROB), 1 - MIN_PROB)
+    denominator = 1 + (z**2 / n_trials)
+    center = (p_ci + (z**2 / (2 * n_trials))) / denominator
+    margin = (z * np.sqrt((p_ci * (1 - p_ci) / n_trials) + (z**2 / (4 * n_trials**2)))) / denominator
+    return np.maximum(MIN_PROB, center - margin), np.minimum(MAX_PROB, center + margin)
+
+
+def _resolve_params(params: Optional[Dict[str, float]], alpha: Optional[float]) -> Tuple[float, float, float]:
+    """(a, b, alpha) from an artifact snapshot's params, else the module constants."""
+    if params is None:
+        return CALIBRATION_A, CALIBRATION_B, FIELD_SIZE_ALPHA if alpha is None else alpha
+    return (params["calibration_a"], params["calibration_b"],
+            params["field_size_alpha"] if alpha is None else alpha)
+
 
 def logit(p: float) -> float:
     """Logit function: log(p / (1-p))"""
@@ -107,7 +141,8 @@ def empirical_calibration(p_vec: List[float]) -> List[float]:
 def get_calibrated_win_probs(
     decimal_odds_list: List[float],
     n_horses: int,
-    alpha: float = 0.6
+    alpha: float = FIELD_SIZE_ALPHA,
+    ci_table=None
 ) -> List[Tuple[float, float, float]]:
     """
     Complete pipeline: odds → calibrated win probabilities with confidence intervals.
@@ -117,46 +152,224 @@ def get_calibrated_win_probs(
     2. Correct for overround
     3. Apply empirical calibration
     4. Field-size smoothing
-    5. Compute Wilson confidence intervals
+    5. Confidence intervals (bootstrap table if given, else Wilson)
     
     Args:
         decimal_odds_list: List of decimal odds
         n_horses: Number of horses in field
         alpha: Field-size smoothing parameter
+        ci_table: Bootstrap CI table (intervals.CITable)
     
     Returns:
         List of (p_win, ci_low, ci_high) tuples
     """
+    n = len(decimal_odds_list)
+    if n == 0 or n_horses <= 0:
+        return []
+    
+    # One-row batch: single and batch calls share calibrate_win_matrix
+    # (field_size_adjust smooths with alpha / n_horses, the matrix path with
+    # alpha / row count, so rescale alpha if the caller's field size differs)
+    odds = np.asarray(decimal_odds_list, dtype=np.float64).reshape(1, n)
+    alpha_row = alpha if n_horses == n else alpha * n / n_horses
+    p_win, ci_low, ci_high = calibrate_win_matrix(odds, np.ones((1, n), dtype=bool), alpha=alpha_row, ci_table=ci_table)
+    
+    return list(zip(p_win[0].tolist(), ci_low[0].tolist(), ci_high[0].tolist()))
+
+
+def calibrate_win_matrix(
+    decimal_odds: np.ndarray,
+    mask: np.ndarray,
+    alpha: Optional[float] = None,
+    params: Optional[Dict[str, float]] = None,
+    ci_table=None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calibrated win probabilities for a padded races×horses matrix.
+    
+    The five get_calibrated_win_probs steps, applied per row over the cells
+    where mask is True. Padding cells come back as 0.0 in every output.
+    
+    Args:
+        decimal_odds: (races, horses) decimal odds (padding values ignored)
+        mask: (races, horses) bool, True for real horses
+        alpha: Field-size smoothing parameter (default from params)
+        params: Calibration parameters (default the module constants)
+        ci_table: Bootstrap CI table (intervals.CITable); Wilson if None
+    
+    Returns:
+        (p_win, ci_low, ci_high) matrices
+    """
+    odds = np.asarray(decimal_odds, dtype=np.float64)
+    mask = np.asarray(mask, dtype=bool)
+    
     # Step 1: Raw implied probabilities
-    p_raw = [base_implied_from_odds(odds) for odds in decimal_odds_list]
+    return calibrate_implied_matrix(implied_matrix(odds, mask), mask, alpha=alpha, params=params, ci_table=ci_table)
+
+
+def implied_matrix(decimal_odds: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Vectorized base_implied_from_odds; padding cells are 0.0.
     
-    # Step 2: Overround correction
-    p_corrected = overround_correction(p_raw)
+    Args:
+        decimal_odds: Decimal odds (any shape)
+        mask: Same shape, True for real horses
+    
+    Returns:
+        Raw implied probabilities
+    """
+    valid_odds = decimal_odds > 1.0
+    p_raw = np.where(valid_odds, 1.0 / np.where(valid_odds, decimal_odds, 2.0), MAX_PROB)
+    return np.where(mask, p_raw, 0.0)
+
+
+def calibrate_implied_matrix(
+    p_raw: np.ndarray,
+    mask: np.ndarray,
+    alpha: Optional[float] = None,
+    total: Optional[np.ndarray] = None,
+    params: Optional[Dict[str, float]] = None,
+    ci_table=None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Steps 2-5 of the calibration pipeline on raw implied probabilities.
+    
+    Args:
+        p_raw: (races, horses) raw implied probabilities (0.0 in padding)
+        mask: (races, horses) bool, True for real horses
+        alpha: Field-size smoothing parameter (default from params)
+        total: Optional precomputed row sums of p_raw, shape (races, 1)
+            (lets callers that track the overround incrementally skip a pass)
+        params: Calibration parameters (default the module constants)
+        ci_table: Bootstrap CI table (intervals.CITable); Wilson if None
+    
+    Returns:
+        (p_win, ci_low, ci_high) matrices
+    """
+    a, b, alpha = _resolve_params(params, alpha)
+
+    # Padding cells are finite all the way through, so masking is a multiply
+    live = mask.astype(np.float64)
+    n_safe = np.maximum(live.sum(axis=-1, keepdims=True), 1.0)
+    
+    # Step 2: Overround correction (rows with no horses stay all-zero)
+    if total is None:
+        total = p_raw.sum(axis=-1, keepdims=True)
+    p_corrected = p_raw / np.maximum(total, _TINY)
     
     # Step 3: Empirical calibration
-    p_calibrated = empirical_calibration(p_corrected)
+    p_safe = np.minimum(np.maximum(p_corrected, MIN_PROB), MAX_PROB)
+    adjusted_logit = a + b * np.log(p_safe / (1 - p_safe))
+    p_calibrated = np.minimum(np.maximum(1.0 / (1.0 + np.exp(-adjusted_logit)), MIN_PROB), MAX_PROB)
     
     # Step 4: Field-size smoothing
-    from .odds import field_size_adjust
-    p_final = field_size_adjust(p_calibrated, n_horses, alpha)
+    smoothed = (p_calibrated + alpha / n_safe) * live
+    total = smoothed.sum(axis=-1, keepdims=True)
+    p_final = smoothed / np.maximum(total, _TINY)
     
-    # Step 5: Wilson confidence intervals (using n=100 pseudo-trials)
-    results = []
-    n_trials = 100
+    # Step 5: Confidence intervals (bootstrap table lookup, else Wilson with n=100 pseudo-trials)
+    if ci_table is not None:
+        ci_low, ci_high = ci_table.interval(p_final, n_safe)
+    else:
+        ci_low, ci_high = wilson_interval(p_final)
     
-    for p in p_final:
-        # Wilson score interval
-        z = 1.96  # 95% confidence
-        p_safe = max(MIN_PROB, min(1 - MIN_PROB, p))
-        
-        denominator = 1 + (z**2 / n_trials)
-        center = (p_safe + (z**2 / (2 * n_trials))) / denominator
-        margin = (z * math.sqrt((p_safe * (1 - p_safe) / n_trials) + (z**2 / (4 * n_trials**2)))) / denominator
-        
-        ci_low = max(MIN_PROB, center - margin)
-        ci_high = min(MAX_PROB, center + margin)
-        
-        results.append((p, ci_low, ci_high))
+    return p_final, ci_low * live, ci_high * live
+
+
+def calibration_jacobian(
+    decimal_odds,
+    alpha: Optional[float] = None,
+    params: Optional[Dict[str, float]] = None
+) -> np.ndarray:
+    """
+    Analytic Jacobian of the calibrated p_win with respect to decimal odds.
+    
+    Chains the derivatives of the five calibration steps for one race
+    (implied → overround → logistic → field-size smoothing); clamped
+    values are locally constant and contribute 0.
+    
+    Args:
+        decimal_odds: Decimal odds for one race (1-D)
+        alpha: Field-size smoothing parameter (default from params)
+        params: Calibration parameters (default the module constants)
+    
+    Returns:
+        (n, n) array J with J[i, k] = ∂p_win_i/∂decimal_odds_k
+    """
+    a, b, alpha = _resolve_params(params, alpha)
+    odds = np.asarray(decimal_odds, dtype=np.float64)
+    n = odds.shape[0]
+    eye = np.eye(n)
+    
+    # Step 1: r = 1 / odds (constant MAX_PROB for invalid odds)
+    valid = odds > 1.0
+    p_raw = np.where(valid, 1.0 / np.where(valid, odds, 2.0), MAX_PROB)
+    d_raw = np.where(valid, -p_raw ** 2, 0.0)
     
-    return results
+    # Step 2: p = r / Σr
+    total = p_raw.sum()
+    p_corrected = p_raw / total
+    d_corrected = (eye - p_corrected[:, None]) / total
+    
+    # Step 3: c = σ(A + B logit(p)), both ends clamped
+    p_safe = np.clip(p_corrected, MIN_PROB, MAX_PROB)
+    adjusted_logit = a + b * np.log(p_safe / (1 - p_safe))
+    c = 1.0 / (1.0 + np.exp(-adjusted_logit))
+    d_c = c * (1 - c) * b / (p_safe * (1 - p_safe))
+    d_c = np.where((p_corrected > MIN_PROB) & (p_corrected < MAX_PROB), d_c, 0.0)
+    d_c = np.where((c > MIN_PROB) & (c < MAX_PROB), d_c, 0.0)
+    
+    # Step 4: p_final = s / Σs, s = c + alpha / n
+    smoothed = np.clip(c, MIN_PROB, MAX_PROB) + alpha / n
+    total = smoothed.sum()
+    d_final = (eye - (smoothed / total)[:, None]) / total
+    
+    return d_final @ (d_c[:, None] * d_corrected) * d_raw[None, :]
+
+
+def benchmark(n_races: int = 10000, n_horses: int = 12, seed: int = 0) -> dict:
+    """
+    Throughput of the calibration pipeline, per-race calls vs one batch.
+    
+    Args:
+        n_races: Races in the synthetic card
+        n_horses: Maximum field size (fields vary from 5 to n_horses)
+        seed: RNG seed for the synthetic odds
+    
+    Returns:
+        {n_races, single_races_per_s, batch_races_per_s, speedup}
+    """
+    import time
+    
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(min(5, n_horses), n_horses + 1, size=n_races)
+    odds = 1.0 + rng.gamma(1.5, 6.0, size=(n_races, n_horses))
+    mask = np.arange(n_horses)[None, :] < sizes[:, None]
+    rows = [odds[r, :sizes[r]].tolist() for r in range(n_races)]
+    
+    t0 = time.perf_counter()
+    for row in rows:
+        get_calibrated_win_probs(row, len(row))
+    single_s = time.perf_counter() - t0
+    
+    t0 = time.perf_counter()
+    calibrate_win_matrix(odds, mask)
+    batch_s = time.perf_counter() - t0
+    
+    return {
+        "n_races": n_races,
+        "single_races_per_s": round(n_races / single_s),
+        "batch_races_per_s": round(n_races / batch_s),
+        "speedup": round(single_s / batch_s, 1)
+    }
+
 
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark the calibration pipeline")
+    parser.add_argument("--races", type=int, default=10000)
+    parser.add_argument("--horses", type=int, default=12)
+    args = parser.parse_args()
+    
+    print(benchmark(args.races, args.horses))
@@ -2,7 +2,9 @@
 Expected Value and Kelly Criterion calculations.
 Ticket-only safe (uses ML odds from the program).
 """
-from typing import Optional
+from typing import Optional, Dict, Any
+
+import numpy as np
 
 
 def kelly_fraction(
@@ -97,7 +99,8 @@ def compute_value_metrics(
     Args:
         p_win, p_place, p_show: Model probabilities
         win_odds: Decimal odds for win bet
-        place_odds: Decimal odds for place (if available)
+        place_odds: Decimal odds for place (if available; see
+            pools.place_show_payouts for estimates from win odds)
         show_odds: Decimal odds for show (if available)
         max_kelly: Maximum Kelly fraction
     
@@ -149,3 +152,47 @@ def compute_value_metrics(
         "best_bet": best_bet
     }
 
+
+
+def expected_value_array(p_win: np.ndarray, decimal_odds: np.ndarray) -> np.ndarray:
+    """
+    Vectorized expected_value (same rounding and invalid-odds rule).
+    
+    Args:
+        p_win: Model win probabilities (any shape)
+        decimal_odds: Decimal odds (same shape)
+    
+    Returns:
+        EV per $1, rounded to 4 places
+    """
+    ev = np.round(p_win * decimal_odds - 1.0, 4)
+    return np.where(decimal_odds <= 0, -1.0, ev)
+
+
+def kelly_fraction_array(
+    p_win: np.ndarray,
+    decimal_odds: np.ndarray,
+    max_kelly: float = 0.25,
+    min_edge: float = 0.01
+) -> np.ndarray:
+    """
+    Vectorized kelly_fraction (same edge threshold and clamping).
+    
+    Args:
+        p_win: Model win probabilities (any shape)
+        decimal_odds: Decimal odds (same shape)
+        max_kelly: Maximum fraction
+        min_edge: Minimum edge required to bet
+    
+    Returns:
+        Kelly fractions in [0.0, max_kelly]
+    """
+    valid = decimal_odds > 1.0
+    safe_odds = np.where(valid, decimal_odds, 2.0)
+    
+    b = safe_odds - 1.0
+    kelly = (b * p_win - (1.0 - p_win)) / b
+    edge = p_win - 1.0 / safe_odds
+    
+    kelly = np.clip(kelly, 0.0, max_kelly)
+    return np.where(valid & (edge >= min_edge), kelly, 0.0)
@@ -0,0 +1,311 @@
+"""
+Horse feature pipeline shared by the scoring endpoints.
+
+Features are registered extractors that compute one column over the whole
+field (odds baseline, trainer/jockey, pace, post, form, layoff, speed).
+A race's FieldInputs computes each column at most once, however many
+models read it. One combiner, FeatureModel, turns the columns into scores:
+
+    score = intercept + Σ_k weight_k · feature_k
+
+with a "logit" link (win probabilities ∝ exp(score), i.e. a conditional
+logit over the field) or a "linear" link (the score is a composite rating;
+probabilities are positive scores normalized).
+
+Weight sets come from the "horse_models" block of horse_models_v1.json (its
+own artifact, since signal_weights_v1.json is regenerated wholesale by the
+calibration cycle), one per endpoint ("predict", "research", "ticket"); DEFAULT_MODELS covers
+any that the artifact leaves out.
+"""
+from typing import Callable, Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+from .odds import parse_odds_column, program_base
+
+
+# Implied win probability for a horse without parsable odds
+DEFAULT_IMPLIED = 0.12
+
+# Trainer/jockey win % assumed when no stats are known
+DEFAULT_JT_PCT = 12.0
+
+# Days since last race assumed when unknown (a typical spacing between starts)
+DEFAULT_DAYS_OFF = 21.0
+
+# Running style → pace column (E early, P presser, S stalker, C closer; unknown 0)
+PACE_SCORES = {"E": 1.0, "P": 0.0, "S": -1.0, "C": -2.0}
+
+# Distances treated as sprints for the post-position penalty
+SPRINT_TOKENS = ("5f", "5 1/2", "6f")
+
+# Floors for log-probabilities and linear scores
+MIN_PROB = 1e-6
+MIN_SCORE = 1e-6
+
+LINKS = ("logit", "linear")
+
+
+FEATURE_EXTRACTORS: Dict[str, Callable[["FieldInputs"], np.ndarray]] = {}
+
+
+def register_feature(name: str):
+    """Register `fn(field) -> (n,) float column` as feature `name`."""
+    def wrap(fn):
+        FEATURE_EXTRACTORS[name] = fn
+        return fn
+    return wrap
+
+
+def _to_float(value) -> float:
+    if value is None or value == "":
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class FieldInputs:
+    """One race's horses as lookup rows plus memoized feature columns."""
+
+    __slots__ = ("names", "rows", "decimal", "surface", "distance", "_columns")
+
+    def __init__(
+        self,
+        horses: Sequence[Dict[str, Any]],
+        ctx: Optional[Dict[str, Any]] = None,
+        research: Optional[Dict[str, Any]] = None,
+        decimal: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            horses: Horse dicts (name, odds or ml_odds, post/program, research fields)
+            ctx: Race context (surface, distance)
+            research: Optional {"horses": {name: research fields}}; these win over the horse dict
+            decimal: Decimal odds per horse, if already parsed (NaN for none)
+        """
+        ctx = ctx or {}
+        by_name = (research or {}).get("horses") or {}
+        self.names = [str(h.get("name", "")) for h in horses]
+        self.rows = [{**h, **(by_name.get(name) or {})} if by_name else h for h, name in zip(horses, self.names)]
+        if decimal is None:
+            decimal = parse_odds_column([h.get("odds") or h.get("ml_odds") for h in horses])
+        self.decimal = np.asarray(decimal, dtype=np.float64)
+        self.surface = str(ctx.get("surface") or "").lower()
+        self.distance = str(ctx.get("distance") or "").lower()
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Feature column `name`, computed on first use.
+
+        Raises:
+            KeyError: If no extractor is registered under `name`
+        """
+        col = self._columns.get(name)
+        if col is None:
+            col = np.asarray(FEATURE_EXTRACTORS[name](self), dtype=np.float64)
+            self._columns[name] = col
+        return col
+
+    def numeric(self, keys: Sequence[str]) -> np.ndarray:
+        """First present of `keys` per horse as float (NaN if none)."""
+        out = np.full(len(self.rows), np.nan)
+        for i, row in enumerate(self.rows):
+            for key in keys:
+                value = _to_float(row.get(key))
+                if value == value:
+                    out[i] = value
+                    break
+        return out
+
+    def text(self, keys: Sequence[str]) -> List[str]:
+        """First non-empty of `keys` per horse, upper-cased ("" if none)."""
+        out = []
+        for row in self.rows:
+            value = next((row.get(key) for key in keys if row.get(key)), "")
+            out.append(str(value).strip().upper())
+        return out
+
+
+@register_feature("odds_baseline")
+def odds_baseline(field: FieldInputs) -> np.ndarray:
+    """Implied win probability normalized over the field."""
+    d = field.decimal
+    valid = d > 1.0
+    implied = np.where(valid, 1.0 / np.where(valid, d, 2.0), DEFAULT_IMPLIED)
+    return implied / implied.sum()
+
+
+@register_feature("odds_implied")
+def odds_implied(field: FieldInputs) -> np.ndarray:
+    """Implied win probability as quoted (overround kept, not normalized)."""
+    d = field.decimal
+    valid = d > 1.0
+    return np.where(valid, 1.0 / np.where(valid, d, 2.0), DEFAULT_IMPLIED)
+
+
+@register_feature("odds_log")
+def odds_log(field: FieldInputs) -> np.ndarray:
+    """Log of odds_baseline (the market offset of a logit model)."""
+    return np.log(np.maximum(field.column("odds_baseline"), MIN_PROB))
+
+
+@register_feature("trainer_jockey")
+def trainer_jockey(field: FieldInputs) -> np.ndarray:
+    """Combined trainer/jockey win %, z-scored within the field (std floored at 1 point)."""
+    pct = field.numeric(("jt_win_pct", "trainer_jockey_win_pct"))
+    # Separate trainer and jockey rates are fractions: their mean as a percentage
+    split = (field.numeric(("trainer_win_pct",)) + field.numeric(("jockey_win_pct",))) * 50.0
+    pct = np.where(np.isnan(pct), split, pct)
+    pct = np.where(np.isnan(pct), DEFAULT_JT_PCT, pct)
+    return (pct - pct.mean()) / max(float(pct.std()), 1.0)
+
+
+@register_feature("trainer_jockey_rate")
+def trainer_jockey_rate(field: FieldInputs) -> np.ndarray:
+    """Combined trainer/jockey win % relative to the DEFAULT_JT_PCT baseline (0 unknown)."""
+    pct = field.numeric(("jt_win_pct", "trainer_jockey_win_pct"))
+    split = (np.nan_to_num(field.numeric(("trainer_win_pct",)), nan=DEFAULT_JT_PCT / 100.0)
+             + np.nan_to_num(field.numeric(("jockey_win_pct",)), nan=DEFAULT_JT_PCT / 100.0)) * 50.0
+    pct = np.where(np.isnan(pct), split, pct)
+    return pct / DEFAULT_JT_PCT - 1.0
+
+
+@register_feature("pace")
+def pace(field: FieldInputs) -> np.ndarray:
+    """Running style: +1 early, 0 presser, -1 stalker, -2 closer (0 unknown)."""
+    return np.array([PACE_SCORES.get(s[:1], 0.0) for s in field.text(("style", "pace", "early_pace"))])
+
+
+@register_feature("post")
+def post(field: FieldInputs) -> np.ndarray:
+    """Post-position penalty: sprints penalize far outside, routes the rail and far outside."""
+    pp = field.numeric(("post",))
+    program = [program_base(p) for p in field.text(("program",))]
+    pp = np.where(np.isnan(pp), [float(p) if p else np.nan for p in program], pp)
+    if any(token in field.distance for token in SPRINT_TOKENS):
+        return np.where(pp >= 10, -0.03, np.where(pp >= 8, -0.02, 0.0))
+    return np.where((pp == 1) | (pp >= 12), -0.02, 0.0)
+
+
+@register_feature("form")
+def form(field: FieldInputs) -> np.ndarray:
+    """Form delta (positive improving), clipped to ±3 (0 unknown)."""
+    return np.clip(np.nan_to_num(field.numeric(("form_delta",))), -3.0, 3.0)
+
+
+@register_feature("layoff")
+def layoff(field: FieldInputs) -> np.ndarray:
+    """Days since last race: +0.1 for 14-35, -0.1 under 7, -0.15 over 60, 0 otherwise (unknown = DEFAULT_DAYS_OFF)."""
+    days = np.nan_to_num(field.numeric(("days_since_race",)), nan=DEFAULT_DAYS_OFF)
+    return np.select(
+        [(days >= 14) & (days <= 35), days < 7, days > 60],
+        [0.1, -0.1, -0.15],
+        default=0.0
+    )
+
+
+@register_feature("speed")
+def speed(field: FieldInputs) -> np.ndarray:
+    """Last speed figure / 100, clipped to [0.5, 1.5] and centered on 80 (0 unknown)."""
+    fig = field.numeric(("last_speed_fig", "speed_fig"))
+    return np.where(np.isnan(fig), 0.0, np.clip(fig / 100.0, 0.5, 1.5) - 0.8)
+
+
+class FeatureModel:
+    """Linear combiner over registered features with a logit or linear link."""
+
+    __slots__ = ("link", "features", "weights", "intercept")
+
+    def __init__(
+        self,
+        features: Sequence[str] = (),
+        weights: Sequence[float] = (),
+        intercept: float = 0.0,
+        link: str = "logit"
+    ):
+        """
+        Raises:
+            ValueError: On an unknown feature or link, or mismatched weights
+        """
+        unknown = [f for f in features if f not in FEATURE_EXTRACTORS]
+        if unknown:
+            raise ValueError(f"unknown features: {unknown}")
+        if link not in LINKS:
+            raise ValueError(f"link must be one of {LINKS}")
+        if len(weights) != len(features):
+            raise ValueError("one weight per feature required")
+        self.features = tuple(features)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.weights.flags.writeable = False
+        self.intercept = float(intercept)
+        self.link = link
+
+    @classmethod
+    def from_artifact(cls, doc: Dict[str, Any]) -> "FeatureModel":
+        """Build from {feature_order, weights, intercept, link}."""
+        return cls(doc.get("feature_order") or (), doc.get("weights") or (),
+                   doc.get("intercept") or 0.0, doc.get("link", "logit"))
+
+    def score(self, field: FieldInputs) -> np.ndarray:
+        """(n,) linear predictor over the field."""
+        out = np.full(len(field), self.intercept)
+        for name, weight in zip(self.features, self.weights.tolist()):
+            if weight:
+                out += weight * field.column(name)
+        return out
+
+    def probabilities(self, field: FieldInputs) -> np.ndarray:
+        """Win probabilities summing to 1 over the field."""
+        s = self.score(field)
+        if self.link == "logit":
+            e = np.exp(s - s.max())
+            return e / e.sum()
+        s = np.maximum(s, MIN_SCORE)
+        return s / s.sum()
+
+    def tilt(self, p_win: np.ndarray, field: FieldInputs) -> np.ndarray:
+        """Reweight existing probabilities by exp(score) (p_win is the offset), renormalized."""
+        s = self.score(field)
+        w = np.asarray(p_win, dtype=np.float64) * np.exp(s - s.max())
+        total = w.sum()
+        return w / total if total > 0 else np.asarray(p_win, dtype=np.float64)
+
+    @property
+    def is_identity(self) -> bool:
+        """True if tilt() would leave probabilities unchanged."""
+        return not self.weights.any()
+
+
+# Built-in weight sets (also shipped in horse_models_v1.json)
+DEFAULT_MODELS: Dict[str, FeatureModel] = {
+    # Multi-factor handicapping: market offset tilted by connections, pace and post
+    "predict": FeatureModel(
+        ("odds_log", "trainer_jockey", "pace", "post"), (1.0, 0.05, 0.01, 1.0), link="logit"
+    ),
+    # Research composite rating (speed, connections, pace, form and rest around the odds)
+    "research": FeatureModel(
+        ("odds_implied", "speed", "trainer_jockey_rate", "pace", "form", "layoff"),
+        (0.3, 0.25, 0.2, 0.005, 0.01, 0.05), intercept=0.65, link="linear"
+    ),
+    # Ticket-only: tilt of the calibrated probabilities (none by default)
+    "ticket": FeatureModel(link="logit"),
+}
+
+
+def models_from_artifact(doc: Optional[Dict[str, Any]]) -> Dict[str, FeatureModel]:
+    """
+    Endpoint models from a parsed horse_models_v1.json (defaults for missing ones).
+
+    Raises:
+        ValueError, TypeError: If a model in the artifact is malformed
+    """
+    models = dict(DEFAULT_MODELS)
+    for name, spec in ((doc or {}).get("horse_models") or {}).items():
+        models[name] = FeatureModel.from_artifact(spec)
+    return models
@@ -0,0 +1,684 @@
+"""
+Offline fitter for the calibration constants, field-size alpha and Stern exponent.
+
+Fits, from per-horse result history (one row per runner with its decimal
+odds and finishing position):
+
+    1. calibration_a / calibration_b: c = σ(a + b·logit(p)) on the
+       overround-corrected implied probability p, by binary-logit IRLS
+       over every runner (win / no win)
+    2. field_size_alpha: p_win ∝ c + α/n; (a, b, α) are then refined
+       jointly by Newton's method on the per-race conditional-logit
+       likelihood of the winner, which is the model the API evaluates
+    3. stern_exponent: P(2nd = j | winner), P(3rd = k | 1st, 2nd) ∝ p_win^γ,
+       by Newton's method on the exploded (rank-ordered) logit; the API
+       applies γ to these lower-place stages only (harville_arrays), so the
+       p_win it reports is the calibrated one from step 2
+    4. p_win_ci bands: race-level bootstrap of observed vs predicted win
+       rates per (field size, probability) bucket (see intervals.py)
+
+Every step runs on whole arrays (flat runner vectors or a padded
+races × horses matrix), so a refit over millions of runner rows takes
+seconds. Finishing positions can come from the runner file itself or be
+joined by race and horse name from our result history
+(data/finishline_tests_calibration_v1.csv, data/historical/*.csv).
+
+Usage:
+    python -m apps.api.predict.fit_calibration runners.csv [--out data/calibration_params_v1.json]
+        [--ci-out data/ci_table_v1.json]
+    python -m apps.api.predict.fit_calibration --synthetic 1000000   # benchmark
+"""
+import csv
+import glob
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .calibration import MIN_PROB, MAX_PROB, implied_matrix
+from .intervals import DEFAULT_CI_TABLE_PATH, DEFAULT_RESAMPLES, bootstrap_ci_table
+from .odds import parse_odds_column
+from .params import DEFAULT_PARAMS, DEFAULT_PARAMS_PATH, PARAM_BOUNDS, validate_params
+
+log = logging.getLogger(__name__)
+
+
+DATA_DIR = Path(__file__).resolve().parents[3] / "data"
+
+# Result history joined onto runner files that carry no finishing position
+DEFAULT_OUTCOME_FILES = (
+    str(DATA_DIR / "finishline_tests_calibration_v1.csv"),
+    str(DATA_DIR / "finishline_historical_v1.csv"),
+    str(DATA_DIR / "historical" / "*.csv"),
+)
+
+# Column aliases, first match wins (compared case-insensitively)
+RACE_ID_COLUMNS = ("race_id", "raceid")
+TRACK_COLUMNS = ("track",)
+DATE_COLUMNS = ("date", "race_date")
+RACE_NO_COLUMNS = ("raceno", "race_no", "race_num", "race_number", "race")
+HORSE_COLUMNS = ("horse", "name", "horse_name")
+DECIMAL_ODDS_COLUMNS = ("ml_decimal", "decimal_odds")
+RAW_ODDS_COLUMNS = ("ml_odds_raw", "ml_odds", "odds")  # parsed like ticket odds ("6" is 6/1)
+FINISH_COLUMNS = ("finish", "finish_pos", "finish_position", "position", "pos")
+RESULT_COLUMNS = (
+    ("outwin", "outplace", "outshow"),
+    ("winhorse", "placehorse", "showhorse"),
+    ("winner", "place", "show"),
+)
+
+# Search range for alpha and solver tolerances
+ALPHA_MAX = PARAM_BOUNDS["field_size_alpha"][1]
+MAX_ITER = 50
+TOL = 1e-10
+
+
+# ---- Loading ----
+
+def _norm_name(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", (name or "").lower())
+
+
+def race_key(track: str, date: str, race_no: str) -> Optional[str]:
+    """
+    Canonical race id, e.g. ("Gulfstream Park", "2024-10-12", "3") → GULFSTREAMPARK-R3-20241012.
+
+    Returns:
+        Key string, or None if any part is missing
+    """
+    track = re.sub(r"[^A-Z0-9]", "", (track or "").upper())
+    digits = re.sub(r"\D", "", date or "")
+    race = re.sub(r"\D", "", race_no or "").lstrip("0")
+    if not track or not race or len(digits) != 8:
+        return None
+    return f"{track}-R{race}-{digits}"
+
+
+def _column(header: Dict[str, int], aliases: Sequence[str]) -> Optional[int]:
+    for alias in aliases:
+        if alias in header:
+            return header[alias]
+    return None
+
+
+def _row_race_key(row: List[str], cols: Dict[str, Optional[int]]) -> Optional[str]:
+    if cols["race_id"] is not None and row[cols["race_id"]].strip():
+        return row[cols["race_id"]].strip().upper()
+    if None in (cols["track"], cols["date"], cols["race_no"]):
+        return None
+    return race_key(row[cols["track"]], row[cols["date"]], row[cols["race_no"]])
+
+
+def _expand(paths: Sequence[str]) -> List[str]:
+    out = []
+    for path in paths:
+        out.extend(sorted(glob.glob(path)) if any(ch in path for ch in "*?[") else [path])
+    return out
+
+
+def _race_columns(header: Dict[str, int]) -> Dict[str, Optional[int]]:
+    return {
+        "race_id": _column(header, RACE_ID_COLUMNS),
+        "track": _column(header, TRACK_COLUMNS),
+        "date": _column(header, DATE_COLUMNS),
+        "race_no": _column(header, RACE_NO_COLUMNS),
+    }
+
+
+def load_outcomes(paths: Sequence[str] = DEFAULT_OUTCOME_FILES) -> Dict[str, Tuple[str, str, str]]:
+    """
+    Official win/place/show finishers per race from result-history CSVs.
+
+    Understands the calibration test log (outWin/outPlace/outShow), the
+    historical drop formats (winner/place/show, winHorse/...) and the
+    canonical FinishLine rows (ai_*_pick on HISTORICAL rows). The first
+    row seen for a race wins.
+
+    Args:
+        paths: CSV paths or glob patterns (missing files are skipped)
+
+    Returns:
+        {race key: (win, place, show)} with normalized horse names
+    """
+    outcomes: Dict[str, Tuple[str, str, str]] = {}
+    for path in _expand(paths):
+        try:
+            f = open(path, "r", encoding="utf-8", newline="")
+        except OSError:
+            continue
+        with f:
+            reader = csv.reader(f)
+            header = {name.strip().lower(): i for i, name in enumerate(next(reader, []))}
+            cols = _race_columns(header)
+            result = next((tuple(header[c] for c in names) for names in RESULT_COLUMNS
+                           if all(c in header for c in names)), None)
+            historical_flag = header.get("strategy_flag")
+            if result is None and historical_flag is not None and "ai_top_pick" in header:
+                result = (header["ai_top_pick"], header["ai_place_pick"], header["ai_show_pick"])
+            if result is None:
+                log.warning(f"No win/place/show columns in {path}, skipped")
+                continue
+            # The canonical schema carries race_num but no date; use race_id there
+            if historical_flag is not None:
+                cols["date"] = None
+
+            for row in reader:
+                if len(row) < len(header):
+                    continue
+                if historical_flag is not None and row[historical_flag].strip().upper() != "HISTORICAL":
+                    continue
+                key = _row_race_key(row, cols)
+                names = tuple(_norm_name(row[i]) for i in result)
+                if key and names[0] and key not in outcomes:
+                    outcomes[key] = names
+    return outcomes
+
+
+@dataclass
+class RunnerTable:
+    """Flat per-runner columns (one entry per horse per race)."""
+    race: np.ndarray    # int64 race code
+    odds: np.ndarray    # float64 decimal odds
+    finish: np.ndarray  # int8 finishing position 1-3, 0 unplaced/unknown
+
+    def __len__(self) -> int:
+        return self.race.shape[0]
+
+    def save(self, path: str) -> None:
+        np.savez(path, race=self.race, odds=self.odds, finish=self.finish)
+
+
+def load_runners(
+    paths: Sequence[str],
+    outcomes: Optional[Dict[str, Tuple[str, str, str]]] = None
+) -> RunnerTable:
+    """
+    Read per-runner rows (CSV, or .npz written by RunnerTable.save).
+
+    A CSV needs a race id (race_id, or track + date + race number), decimal
+    or fractional odds, and either a finish column or a horse name that can
+    be matched against `outcomes`. Rows with unparsable odds are dropped.
+
+    Args:
+        paths: Runner files or glob patterns
+        outcomes: Result history from load_outcomes (for files without finish)
+
+    Returns:
+        RunnerTable
+    """
+    races, odds, finish = [], [], []
+    codes: Dict[str, int] = {}
+
+    saved = []
+    for path in _expand(paths):
+        if path.endswith(".npz"):
+            with np.load(path) as z:
+                saved.append(RunnerTable(z["race"].astype(np.int64), z["odds"].astype(np.float64),
+                                         z["finish"].astype(np.int8)))
+            continue
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = {name.strip().lower(): i for i, name in enumerate(next(reader, []))}
+            cols = _race_columns(header)
+            horse_col = _column(header, HORSE_COLUMNS)
+            odds_col = _column(header, DECIMAL_ODDS_COLUMNS)
+            is_decimal = odds_col is not None
+            if odds_col is None:
+                odds_col = _column(header, RAW_ODDS_COLUMNS)
+            finish_col = _column(header, FINISH_COLUMNS)
+            if odds_col is None or (finish_col is None and (horse_col is None or not outcomes)):
+                log.warning(f"{path} has no odds or no way to find finishing positions, skipped")
+                continue
+
+            file_races, file_odds, file_finish = [], [], []
+            for row in reader:
+                if len(row) < len(header):
+                    continue
+                key = _row_race_key(row, cols)
+                if key is None:
+                    continue
+                if finish_col is not None:
+                    pos = row[finish_col].strip()
+                    place = int(pos) if pos.isdigit() and 1 <= int(pos) <= 3 else 0
+                else:
+                    result = outcomes.get(key)
+                    if result is None:
+                        continue
+                    name = _norm_name(row[horse_col])
+                    place = result.index(name) + 1 if name in result else 0
+                file_races.append(codes.setdefault(f"{path}|{key}", len(codes)))
+                file_odds.append(row[odds_col])
+                file_finish.append(place)
+
+            # Odds are converted per column; unparsable prices drop the row
+            decimals = parse_odds_column(file_odds, decimal=is_decimal)
+            keep = ~np.isnan(decimals)
+            races.append(np.array(file_races, dtype=np.int64)[keep])
+            odds.append(decimals[keep])
+            finish.append(np.array(file_finish, dtype=np.int8)[keep])
+
+    parts = [RunnerTable(np.concatenate(races + [np.zeros(0, dtype=np.int64)]),
+                         np.concatenate(odds + [np.zeros(0)]),
+                         np.concatenate(finish + [np.zeros(0, dtype=np.int8)]))] + saved
+    # Race codes are per file, so shift each part past the previous one
+    offset, shifted = 0, []
+    for part in parts:
+        shifted.append(part.race + offset)
+        offset += int(part.race.max()) + 1 if len(part) else 0
+    return RunnerTable(np.concatenate(shifted), np.concatenate([p.odds for p in parts]),
+                       np.concatenate([p.finish for p in parts]))
+
+
+# ---- Race matrix ----
+
+def race_matrix(table: RunnerTable, max_field: int = 24) -> Dict[str, np.ndarray]:
+    """
+    Pad runners into a races × horses matrix.
+
+    Races with fewer than two runners, no recorded winner, or more than
+    max_field runners are dropped.
+
+    Returns:
+        {"odds": (R, n), "mask": (R, n) bool, "places": (R, 3) column of the
+        1st/2nd/3rd finisher (-1 if unknown)}
+    """
+    order = np.argsort(table.race, kind="stable")
+    race = table.race[order]
+    _, start, counts = np.unique(race, return_index=True, return_counts=True)
+    race_idx = np.repeat(np.arange(start.shape[0]), counts)
+    col = np.arange(race.shape[0]) - np.repeat(start, counts)
+    finish = table.finish[order]
+
+    places = np.full((start.shape[0], 3), -1, dtype=np.int64)
+    placed = finish > 0
+    places[race_idx[placed], finish[placed] - 1] = col[placed]
+
+    keep = (counts >= 2) & (counts <= max_field) & (places[:, 0] >= 0)
+    n = int(counts[keep].max()) if keep.any() else 2
+    cells = keep[race_idx]
+    new_race = np.cumsum(keep) - 1
+
+    odds = np.zeros((int(keep.sum()), n))
+    mask = np.zeros(odds.shape, dtype=bool)
+    odds[new_race[race_idx[cells]], col[cells]] = table.odds[order][cells]
+    mask[new_race[race_idx[cells]], col[cells]] = True
+    return {"odds": odds, "mask": mask, "places": places[keep]}
+
+
+def _overround_corrected(odds: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    p_raw = implied_matrix(odds, mask)
+    return p_raw / np.maximum(p_raw.sum(axis=-1, keepdims=True), np.finfo(np.float64).tiny)
+
+
+def _logit_safe(p: np.ndarray) -> np.ndarray:
+    p_safe = np.minimum(np.maximum(p, MIN_PROB), MAX_PROB)
+    return np.log(p_safe / (1 - p_safe))
+
+
+def calibrated_matrix(p_corrected: np.ndarray, params: Dict[str, float]) -> np.ndarray:
+    """Clamped c = σ(a + b·logit(p)) (step 3 of calibrate_implied_matrix) with explicit parameters."""
+    c = 1.0 / (1.0 + np.exp(-(params["calibration_a"] + params["calibration_b"] * _logit_safe(p_corrected))))
+    return np.minimum(np.maximum(c, MIN_PROB), MAX_PROB)
+
+
+def win_matrix(p_corrected: np.ndarray, mask: np.ndarray, params: Dict[str, float]) -> np.ndarray:
+    """Calibrated p_win (steps 3-4 of calibrate_implied_matrix) with explicit parameters."""
+    live = mask.astype(np.float64)
+    n = np.maximum(live.sum(axis=-1, keepdims=True), 1.0)
+    smoothed = (calibrated_matrix(p_corrected, params) + params["field_size_alpha"] / n) * live
+    return smoothed / smoothed.sum(axis=-1, keepdims=True)
+
+
+# ---- Solvers ----
+
+def fit_logit(x: np.ndarray, y: np.ndarray) -> Tuple[float, float]:
+    """
+    Binary logistic regression y ~ σ(a + b·x) by IRLS (2×2 Newton steps).
+
+    Args:
+        x: Flat covariate (logit of corrected implied probability)
+        y: Flat 0/1 outcome
+
+    Returns:
+        (a, b)
+    """
+    a, b = 0.0, 1.0
+    for _ in range(MAX_ITER):
+        mu = 1.0 / (1.0 + np.exp(-(a + b * x)))
+        w = mu * (1 - mu)
+        r = y - mu
+        g = np.array([r.sum(), (r * x).sum()])
+        wx = w * x
+        h = np.array([[w.sum(), wx.sum()], [wx.sum(), (wx * x).sum()]])
+        step = np.linalg.solve(h, g)
+        a, b = a + step[0], b + step[1]
+        if np.abs(step).max() < TOL:
+            break
+    return float(a), float(b)
+
+
+def _winner_terms(theta: np.ndarray, x: np.ndarray, live: np.ndarray, winners: np.ndarray):
+    """
+    Log-likelihood, gradient and Hessian of Σ log(s_w / Σ s), s = c + α/n, in θ = (a, b, α).
+
+    Cells whose c is clamped contribute no derivative (the clamp is flat there).
+    """
+    a, b, alpha = theta
+    rows = np.arange(x.shape[0])
+    inv_n = 1.0 / live.sum(axis=-1)
+
+    raw = 1.0 / (1.0 + np.exp(-(a + b * x)))
+    c = np.minimum(np.maximum(raw, MIN_PROB), MAX_PROB) * live
+    d = c * (1 - c) * ((raw > MIN_PROB) & (raw < MAX_PROB))   # ∂c/∂a
+    dd = d * (1 - 2 * c)                                        # ∂²c/∂a²
+    s_w = c[rows, winners] + alpha * inv_n
+    s_total = c.sum(axis=-1) + alpha
+
+    # Per-race first and second derivatives of s_w and Σs in (a, b, α)
+    x_w, d_w, dd_w = x[rows, winners], d[rows, winners], dd[rows, winners]
+    g_w = np.stack([d_w, d_w * x_w, inv_n], axis=-1)
+    g_total = np.stack([d.sum(axis=-1), (d * x).sum(axis=-1), np.ones_like(inv_n)], axis=-1)
+
+    ll = float((np.log(s_w) - np.log(s_total)).sum())
+    u_w = g_w / s_w[:, None]
+    u_total = g_total / s_total[:, None]
+    grad = (u_w - u_total).sum(axis=0)
+
+    # Σ_r [∇²s_w / s_w - u_w u_wᵀ - ∇²Σs / Σs + u_total u_totalᵀ]; only the (a, b) block is curved
+    k_w = dd_w / s_w
+    ddx = dd * x
+    k_total = np.stack([dd.sum(axis=-1), ddx.sum(axis=-1), (ddx * x).sum(axis=-1)]) / s_total
+    curve = np.array([k_w.sum(), (k_w * x_w).sum(), (k_w * x_w ** 2).sum()]) - k_total.sum(axis=-1)
+    hess = u_total.T @ u_total - u_w.T @ u_w
+    hess[:2, :2] += np.array([[curve[0], curve[1]], [curve[1], curve[2]]])
+    return ll, grad, hess
+
+
+def fit_win_model(
+    x: np.ndarray,
+    mask: np.ndarray,
+    winners: np.ndarray,
+    start: Tuple[float, float, float]
+) -> Tuple[float, float, float]:
+    """
+    Joint conditional-logit fit of (a, b, α) on the race winners.
+
+    P(win = i) = (c_i + α/n) / Σ_j (c_j + α/n), c = σ(a + b·x); Newton
+    steps with step halving, α kept in [0, ALPHA_MAX].
+
+    Args:
+        x: (races, horses) logit of corrected implied probability
+        mask: (races, horses) bool
+        winners: Winner column per race
+        start: Initial (a, b, α), e.g. the binary-logit IRLS fit
+
+    Returns:
+        (a, b, α)
+    """
+    live = mask.astype(np.float64)
+    x = np.where(mask, x, 0.0)
+    theta = np.array(start, dtype=np.float64)
+    ll, grad, hess = _winner_terms(theta, x, live, winners)
+    for _ in range(MAX_ITER):
+        try:
+            step = -np.linalg.solve(hess, grad)
+        except np.linalg.LinAlgError:
+            step = grad
+        if step @ grad <= 0:
+            # Not an ascent direction (Hessian not negative definite): scaled gradient
+            step = grad / max(np.abs(np.diag(hess)).max(), 1.0)
+        for _ in range(40):
+            candidate = theta + step
+            candidate[2] = min(max(candidate[2], 0.0), ALPHA_MAX)
+            new_ll, new_grad, new_hess = _winner_terms(candidate, x, live, winners)
+            if new_ll >= ll:
+                break
+            step = step / 2
+        else:
+            break
+        moved = np.abs(candidate - theta).max()
+        theta, ll, grad, hess = candidate, new_ll, new_grad, new_hess
+        if moved < 1e-9:
+            break
+    return float(theta[0]), float(theta[1]), float(theta[2])
+
+
+def _exploded_stages(p_win: np.ndarray, mask: np.ndarray, places: np.ndarray):
+    """(log p, choice-set mask, chosen column) for the 2nd- and 3rd-place stages."""
+    rows = np.arange(p_win.shape[0])
+    x = np.log(np.where(mask, p_win, 1.0))
+    stages = []
+    available = mask.copy()
+    for stage in (1, 2):
+        available[rows, np.maximum(places[:, stage - 1], 0)] &= places[:, stage - 1] < 0
+        known = (places[:, stage] >= 0) & (places[:, :stage] >= 0).all(axis=1)
+        stages.append((x[known], available[known], places[known, stage]))
+    return stages
+
+
+def _stage_loglik(stages, gamma: float) -> Tuple[float, float, float]:
+    """Log-likelihood, gradient and Hessian of the exploded logit at gamma."""
+    ll = grad = hess = 0.0
+    for x, avail, chosen in stages:
+        u = np.where(avail, gamma * x, -np.inf)
+        u_max = u.max(axis=1, keepdims=True)
+        e = np.exp(u - u_max)
+        w = e / e.sum(axis=1, keepdims=True)
+        xs = np.where(avail, x, 0.0)
+        mean = (w * xs).sum(axis=1)
+        x_chosen = x[np.arange(x.shape[0]), chosen]
+        ll += float((gamma * x_chosen - u_max[:, 0] - np.log(e.sum(axis=1))).sum())
+        grad += float((x_chosen - mean).sum())
+        hess -= float(((w * xs * xs).sum(axis=1) - mean ** 2).sum())
+    return ll, grad, hess
+
+
+def fit_stern(p_win: np.ndarray, mask: np.ndarray, places: np.ndarray) -> float:
+    """
+    Stern exponent γ for the lower places: Newton's method on the exploded logit.
+
+    P(2nd = j | 1st) ∝ p_j^γ over the remaining field, likewise for 3rd.
+    """
+    stages = _exploded_stages(p_win, mask, places)
+    low, high = PARAM_BOUNDS["stern_exponent"]
+    gamma = 1.0
+    for _ in range(MAX_ITER):
+        _, grad, hess = _stage_loglik(stages, gamma)
+        if hess >= 0:
+            break
+        step = -grad / hess
+        gamma = min(max(gamma + step, low), high)
+        if abs(step) < TOL:
+            break
+    return float(gamma)
+
+
+# ---- Driver ----
+
+def fit(table: RunnerTable, max_field: int = 24) -> Dict[str, Any]:
+    """
+    Fit every parameter and score the fit against the priors.
+
+    Args:
+        table: Runner rows (see load_runners)
+        max_field: Largest field kept
+
+    Returns:
+        Artifact dict: {version, fitted_at, params, priors, n_races, n_runners,
+        log_likelihood: {win, place_show} per race for priors and fit, fit_seconds}
+
+    Raises:
+        ValueError: If there are no usable races
+    """
+    t0 = time.perf_counter()
+    m = race_matrix(table, max_field=max_field)
+    odds, mask, places = m["odds"], m["mask"], m["places"]
+    if odds.shape[0] == 0:
+        raise ValueError("no races with odds and a recorded winner")
+    rows = np.arange(odds.shape[0])
+    winners = places[:, 0]
+
+    p_corrected = _overround_corrected(odds, mask)
+    won = np.zeros(odds.shape, dtype=bool)
+    won[rows, winners] = True
+    x = _logit_safe(p_corrected)
+    a, b = fit_logit(x[mask], won[mask].astype(np.float64))
+
+    a, b, alpha = fit_win_model(x, mask, winners, (a, b, DEFAULT_PARAMS["field_size_alpha"]))
+
+    fitted = {"calibration_a": a, "calibration_b": b, "field_size_alpha": alpha}
+    p_win = win_matrix(p_corrected, mask, fitted)
+    fitted["stern_exponent"] = fit_stern(p_win, mask, places)
+    fitted = validate_params(fitted)
+
+    def _scores(params: Dict[str, float]) -> Dict[str, float]:
+        p = win_matrix(p_corrected, mask, params)
+        stages = _exploded_stages(p, mask, places)
+        n_stage = sum(s[0].shape[0] for s in stages)
+        return {
+            "win": round(float(np.log(p[rows, winners]).mean()), 6),
+            "place_show": round(_stage_loglik(stages, params["stern_exponent"])[0] / max(n_stage, 1), 6)
+        }
+
+    now = datetime.now(timezone.utc)
+    return {
+        "version": now.strftime("fit-%Y%m%dT%H%M%SZ"),
+        "fitted_at": now.isoformat(timespec="seconds"),
+        "params": {k: round(v, 6) for k, v in fitted.items()},
+        "priors": dict(DEFAULT_PARAMS),
+        "n_races": int(odds.shape[0]),
+        "n_runners": int(mask.sum()),
+        "log_likelihood": {"priors": _scores(DEFAULT_PARAMS), "fitted": _scores(fitted)},
+        "fit_seconds": round(time.perf_counter() - t0, 3)
+    }
+
+
+def fit_ci_table(
+    table: RunnerTable,
+    params: Dict[str, float],
+    max_field: int = 24,
+    n_resamples: int = DEFAULT_RESAMPLES,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Bootstrap CI table for the p_win the API reports under `params`.
+
+    Args:
+        table: Runner rows (see load_runners)
+        params: Calibration parameters (normally the freshly fitted ones)
+        max_field: Largest field kept
+        n_resamples: Bootstrap resamples
+        seed: RNG seed
+
+    Returns:
+        CI table artifact (see intervals.bootstrap_ci_table) with version and params version
+
+    Raises:
+        ValueError: If there are no usable races
+    """
+    t0 = time.perf_counter()
+    m = race_matrix(table, max_field=max_field)
+    odds, mask, places = m["odds"], m["mask"], m["places"]
+    if odds.shape[0] == 0:
+        raise ValueError("no races with odds and a recorded winner")
+    rows = np.arange(odds.shape[0])
+    won = np.zeros(odds.shape, dtype=bool)
+    won[rows, places[:, 0]] = True
+    p_win = win_matrix(_overround_corrected(odds, mask), mask, params)
+    field = np.broadcast_to(mask.sum(axis=1, keepdims=True), mask.shape)
+    race = np.broadcast_to(rows[:, None], mask.shape)
+
+    result = bootstrap_ci_table(race[mask], field[mask], p_win[mask], won[mask], n_resamples=n_resamples, seed=seed)
+    now = datetime.now(timezone.utc)
+    return {
+        "version": now.strftime("ci-%Y%m%dT%H%M%SZ"),
+        "fitted_at": now.isoformat(timespec="seconds"),
+        "params": {k: round(v, 6) for k, v in params.items()},
+        **result,
+        "fit_seconds": round(time.perf_counter() - t0, 3)
+    }
+
+
+def write_artifact(artifact: Dict[str, Any], path: str = str(DEFAULT_PARAMS_PATH)) -> None:
+    """Write the artifact atomically (temp file + rename) so readers never see a partial file."""
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def simulate_runners(
+    n_races: int,
+    params: Optional[Dict[str, float]] = None,
+    max_field: int = 14,
+    seed: int = 0
+) -> RunnerTable:
+    """
+    Synthetic results drawn from the model itself (for tests and benchmarks).
+
+    Winners follow the calibrated p_win under `params`; 2nd and 3rd follow
+    p_win^stern_exponent over the remaining field (Gumbel-max sampling).
+    """
+    params = params or DEFAULT_PARAMS
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(min(5, max_field), max_field + 1, size=n_races)
+    mask = np.arange(max_field)[None, :] < sizes[:, None]
+    odds = np.where(mask, 1.0 + rng.gamma(1.5, 6.0, size=mask.shape), 0.0)
+
+    log_p = np.log(np.where(mask, win_matrix(_overround_corrected(odds, mask), mask, params), 1.0))
+    rows = np.arange(n_races)
+    finish = np.zeros(mask.shape, dtype=np.int8)
+    winners = np.argmax(np.where(mask, log_p + rng.gumbel(size=mask.shape), -np.inf), axis=1)
+    finish[rows, winners] = 1
+    lower = np.where(mask & (finish == 0), params["stern_exponent"] * log_p + rng.gumbel(size=mask.shape), -np.inf)
+    order = np.argsort(-lower, axis=1)[:, :2]
+    finish[rows, order[:, 0]] = 2
+    finish[rows, order[:, 1]] = 3
+
+    race = np.broadcast_to(rows[:, None], mask.shape)
+    return RunnerTable(race[mask].astype(np.int64), odds[mask], finish[mask])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fit calibration parameters from result history")
+    parser.add_argument("runners", nargs="*", help="Runner CSV/.npz files (one row per horse per race)")
+    parser.add_argument("--outcomes", nargs="*", default=list(DEFAULT_OUTCOME_FILES),
+                        help="Result-history CSVs joined onto runners without a finish column")
+    parser.add_argument("--out", default=str(DEFAULT_PARAMS_PATH))
+    parser.add_argument("--ci-out", default=str(DEFAULT_CI_TABLE_PATH))
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES, help="Bootstrap resamples for the CI table")
+    parser.add_argument("--synthetic", type=int, default=0, help="Fit N simulated races instead (no write)")
+    parser.add_argument("--max-field", type=int, default=24)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.synthetic:
+        runners = simulate_runners(args.synthetic, seed=1)
+    else:
+        runners = load_runners(args.runners, load_outcomes(args.outcomes))
+    load_s = time.perf_counter() - t0
+    print(f"Loaded {len(runners)} runner rows in {load_s:.2f}s")
+
+    try:
+        result = fit(runners, max_field=args.max_field)
+    except ValueError as e:
+        raise SystemExit(f"Nothing to fit: {e}")
+    print(json.dumps(result, indent=2))
+
+    ci_table = fit_ci_table(runners, result["params"], max_field=args.max_field, n_resamples=args.resamples)
+    print(f"CI table: {ci_table['n_races']} races, {args.resamples} resamples in {ci_table['fit_seconds']}s")
+
+    if not args.synthetic:
+        write_artifact(result, args.out)
+        write_artifact(ci_table, args.ci_out)
+        print(f"Wrote {args.out} and {args.ci_out}")
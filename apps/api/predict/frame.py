@@ -0,0 +1,307 @@
+"""
+Columnar race frame for the ticket-only pipeline.
+
+A RaceFrame holds one race as parallel columns instead of a list of horse
+dicts:
+
+- horse columns, one entry per ticket row (names, raw and decimal odds,
+  parse/scratch flags, betting interest);
+- interest columns, one entry per betting interest (coupled horses share
+  one, scratched horses have none), written whole by the calibration,
+  Harville and EV stages: p_win, p_place, p_show, ci_low, ci_high, ...
+
+Frames are padded into the races×interests matrices the vectorized stages
+work on (pad_frames), and turned into the JSON horse dicts only at the
+response boundary (to_records).
+"""
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .odds import parse_odds_column, is_scratch, detect_coupled_entries, combine_entry_odds
+from .features import FieldInputs
+from .kelly import POOLS
+
+
+# Decimal odds for a race where no horse has parsable odds
+DEFAULT_DECIMAL = 6.0
+
+# Interest columns copied into every horse record: (column, round digits or None)
+RECORD_COLUMNS = (
+    ("p_win", 4), ("p_place", 4), ("p_show", 4),
+    ("place_odds_est", 2), ("show_odds_est", 2),
+    ("ev_win", None), ("ev_place", None), ("ev_show", None),
+    ("kelly_win", None), ("kelly_place", None), ("kelly_show", None)
+)
+
+# Rank columns (0 = not ranked, the key is left out of the record)
+RANK_COLUMNS = ("rank_win", "rank_value", "rank_kelly")
+
+# Record values of a scratched horse
+SCRATCHED_RECORD = {
+    "p_win": 0.0, "p_place": 0.0, "p_show": 0.0, "p_win_ci": None,
+    "place_odds_est": None, "show_odds_est": None,
+    "ev_win": None, "ev_place": None, "ev_show": None,
+    "kelly_win": None, "kelly_place": None, "kelly_show": None,
+    "best_bet": None
+}
+
+
+def rank_column(values: np.ndarray, eligible: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Descending 1-based ranks from a single stable argsort.
+
+    Ties keep their input order (as sorted(..., reverse=True) does).
+
+    Args:
+        values: (m,) values to rank
+        eligible: (m,) bool, rows that take part (default all)
+
+    Returns:
+        (ranks with 0 for ineligible rows, indices of the eligible rows best first)
+    """
+    order = np.argsort(-np.asarray(values, dtype=np.float64), kind="stable")
+    if eligible is not None:
+        order = order[eligible[order]]
+    ranks = np.zeros(len(values), dtype=np.int64)
+    ranks[order] = np.arange(1, order.shape[0] + 1)
+    return ranks, order
+
+
+class RaceFrame:
+    """Struct-of-arrays view of one race's horses and betting interests."""
+
+    __slots__ = (
+        "names", "programs", "odds_raw", "trainers", "jockeys", "owners",
+        "decimal", "parsed", "scratched",
+        "interest_of", "members", "entry_id", "entry_name", "duplicate_of", "interest_odds", "columns"
+    )
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        odds_raw: Sequence[str],
+        programs: Optional[Sequence[str]] = None,
+        trainers: Optional[Sequence[str]] = None,
+        jockeys: Optional[Sequence[str]] = None,
+        owners: Optional[Sequence[str]] = None
+    ):
+        """
+        Parse one race's ML odds into columns.
+
+        Missing/invalid odds take the average of the parsed ones; horses
+        marked "SCR"/"WD" are scratched and keep NaN. Every horse starts as
+        its own betting interest until couple() is called.
+
+        Args:
+            names: Horse names
+            odds_raw: ML odds as printed (any format parse_odds accepts)
+            programs, trainers, jockeys, owners: Optional text columns
+        """
+        n = len(names)
+        blank = [""] * n
+        self.names = list(names)
+        self.odds_raw = list(odds_raw)
+        self.programs = list(programs) if programs is not None else blank
+        self.trainers = list(trainers) if trainers is not None else blank
+        self.jockeys = list(jockeys) if jockeys is not None else blank
+        self.owners = list(owners) if owners is not None else blank
+
+        decimal = parse_odds_column(self.odds_raw)
+        self.scratched = np.fromiter((is_scratch(o) for o in self.odds_raw), dtype=bool, count=n)
+        self.parsed = ~np.isnan(decimal) & ~self.scratched
+        fill = decimal[self.parsed].mean() if self.parsed.any() else DEFAULT_DECIMAL
+        self.decimal = np.where(self.scratched, np.nan, np.where(self.parsed, decimal, fill))
+
+        live = np.flatnonzero(~self.scratched)
+        self.interest_of = np.full(n, -1, dtype=np.int64)
+        self.interest_of[live] = np.arange(live.shape[0])
+        self.members = [[int(i)] for i in live]
+        self.entry_id: List[Optional[str]] = [None] * n
+        self.entry_name: List[Optional[str]] = [None] * n
+        self.duplicate_of: Dict[int, int] = {}
+        self.interest_odds = self.decimal[live]
+        self.columns: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_horses(cls, horses: Sequence[Any]) -> "RaceFrame":
+        """Build from ticket horse objects (name, ml_odds_raw, program, trainer, jockey, owner)."""
+        return cls(
+            [h.name for h in horses], [h.ml_odds_raw for h in horses],
+            programs=[h.program for h in horses], trainers=[h.trainer for h in horses],
+            jockeys=[h.jockey for h in horses], owners=[h.owner for h in horses]
+        )
+
+    @property
+    def n_horses(self) -> int:
+        return len(self.names)
+
+    @property
+    def n_interests(self) -> int:
+        return len(self.members)
+
+    @property
+    def leads(self) -> np.ndarray:
+        """Horse index of each interest's lead (its first live horse)."""
+        return np.array([members[0] for members in self.members], dtype=np.int64)
+
+    @property
+    def labels(self) -> List[str]:
+        """Display name per interest (the entry name for coupled entries)."""
+        return [self.entry_name[m[0]] or self.names[m[0]] for m in self.members]
+
+    def horse_odds(self) -> List[Optional[float]]:
+        """Decimal odds per horse, None if scratched."""
+        return [None if s else float(d) for d, s in zip(self.decimal.tolist(), self.scratched.tolist())]
+
+    def couple(self, couple_by_trainer: bool = False) -> Dict[str, Any]:
+        """
+        Group horses into betting interests and tag coupled entries.
+
+        Duplicate rows (a name repeated on the ticket) are left out of the
+        field like scratches and recorded in duplicate_of.
+
+        Args:
+            couple_by_trainer: Also couple horses sharing a trainer
+
+        Returns:
+            detect_coupled_entries result
+        """
+        odds = self.horse_odds()
+        rows = [
+            {"name": name, "program": program, "owner": owner, "trainer": trainer,
+             "ml_decimal": decimal, "scratched": decimal is None}
+            for name, program, owner, trainer, decimal
+            in zip(self.names, self.programs, self.owners, self.trainers, odds)
+        ]
+        coupling = detect_coupled_entries(rows, couple_by_trainer=couple_by_trainer)
+
+        for entry in coupling["entries"]:
+            names = " / ".join(self.names[i] for i in entry["horse_indices"])
+            for i in entry["horse_indices"]:
+                self.entry_id[i] = entry["entry_id"]
+                self.entry_name[i] = names
+
+        self.duplicate_of = coupling["duplicates"]
+        self.members = coupling["interests"]
+        self.interest_of = np.array([-1 if j is None else j for j in coupling["interest_of"]], dtype=np.int64)
+        interest_odds = []
+        for members in self.members:
+            combined = combine_entry_odds([odds[i] for i in members]) if len(members) > 1 else None
+            interest_odds.append(combined if combined is not None else odds[members[0]])
+        self.interest_odds = np.array(interest_odds, dtype=np.float64)
+        return coupling
+
+    def feature_inputs(self, ctx: Optional[Dict[str, Any]] = None) -> FieldInputs:
+        """Feature pipeline inputs per interest (the lead horse's ticket fields, interest odds)."""
+        rows = [
+            {"name": label, "program": self.programs[i], "trainer": self.trainers[i], "jockey": self.jockeys[i]}
+            for label, i in zip(self.labels, self.leads.tolist())
+        ]
+        return FieldInputs(rows, ctx, decimal=self.interest_odds)
+
+    def set_columns(self, **columns: np.ndarray) -> None:
+        """
+        Store interest columns (one value per betting interest).
+
+        Raises:
+            ValueError: If a column has the wrong length
+        """
+        for name, values in columns.items():
+            values = np.asarray(values)
+            if values.shape != (self.n_interests,):
+                raise ValueError(f"column {name} must have shape ({self.n_interests},)")
+            self.columns[name] = values
+
+    def rank(self) -> Dict[str, np.ndarray]:
+        """
+        Win, value and Kelly ranks of the interests (one argsort each).
+
+        Value and Kelly ranks cover only interests with positive ev_win /
+        kelly_win. Stores the rank columns and returns the orders.
+
+        Returns:
+            {"win", "value", "kelly": interest indices, best first}
+        """
+        cols = self.columns
+        rank_win, by_win = rank_column(cols["p_win"])
+        rank_value, by_value = rank_column(cols["ev_win"], cols["ev_win"] > 0)
+        rank_kelly, by_kelly = rank_column(cols["kelly_win"], cols["kelly_win"] > 0)
+        self.set_columns(rank_win=rank_win, rank_value=rank_value, rank_kelly=rank_kelly)
+        return {"win": by_win, "value": by_value, "kelly": by_kelly}
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        JSON horse dicts (response boundary).
+
+        Coupled horses repeat their interest's values and ranks; NaN values
+        become None.
+
+        Returns:
+            One dict per ticket row, in ticket order
+        """
+        cols = self.columns
+        values = {}
+        for name, digits in RECORD_COLUMNS:
+            col = cols[name].astype(np.float64)
+            col = np.round(col, digits) if digits is not None else col
+            values[name] = [None if v != v else v for v in col.tolist()]
+        ci = np.round(np.stack([cols["ci_low"], cols["ci_high"]], axis=1), 4).tolist()
+        best = [POOLS[b] if b >= 0 else None for b in cols["best_bet"].tolist()]
+        ranks = {name: cols[name].tolist() for name in RANK_COLUMNS if name in cols}
+
+        records = []
+        decimal = self.horse_odds()
+        for i, j in enumerate(self.interest_of.tolist()):
+            record = {
+                "index": i,
+                "name": self.names[i],
+                "program": self.programs[i],
+                "ml_odds_raw": self.odds_raw[i],
+                "ml_decimal": decimal[i],
+                "trainer": self.trainers[i],
+                "jockey": self.jockeys[i],
+                "owner": self.owners[i],
+                "parsed": bool(self.parsed[i]),
+                "scratched": bool(self.scratched[i])
+            }
+            if self.entry_id[i] is not None:
+                record["entry_id"] = self.entry_id[i]
+                record["entry_name"] = self.entry_name[i]
+            if i in self.duplicate_of:
+                record["duplicate_of"] = self.duplicate_of[i]
+            if j < 0:
+                record.update(SCRATCHED_RECORD)
+                records.append(record)
+                continue
+            for name, _ in RECORD_COLUMNS[:3]:
+                record[name] = values[name][j]
+            record["p_win_ci"] = ci[j]
+            for name, _ in RECORD_COLUMNS[3:]:
+                record[name] = values[name][j]
+            record["best_bet"] = best[j]
+            for name, rank in ranks.items():
+                if rank[j]:
+                    record[name] = rank[j]
+            records.append(record)
+        return records
+
+
+def pad_frames(frames: Sequence[RaceFrame]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pad the frames' interest odds into a races×interests matrix.
+
+    Args:
+        frames: One frame per race (coupled already)
+
+    Returns:
+        (odds, mask): (R, width) decimal odds (0 in padding) and validity mask
+    """
+    width = max(1, max(frame.n_interests for frame in frames))
+    odds = np.zeros((len(frames), width))
+    mask = np.zeros((len(frames), width), dtype=bool)
+    for r, frame in enumerate(frames):
+        n = frame.n_interests
+        odds[r, :n] = frame.interest_odds
+        mask[r, :n] = True
+    return odds, mask
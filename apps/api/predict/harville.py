@@ -1,23 +1,154 @@
 """
 Harville and Stern formulas for place and show probabilities.
 Based solely on win probabilities (ticket-only safe).
+
+The Stern adjustment discounts the lower places only: the winner is drawn
+from p_win itself, and 2nd and 3rd from the remaining field in proportion
+to σ = p_win^γ (renormalized). p_win is reported unchanged, so it stays the
+calibrated quantity; γ is fitted on the 2nd/3rd-place stages
+(fit_calibration.fit_stern).
 """
-from typing import List, Dict
+import heapq
+from functools import lru_cache
+from typing import List, Dict, Tuple, Any, Optional
+
+import numpy as np
+
+from .params import load_calibration_params
+
+
+# Numerical stability floor for Harville denominators
+DENOM_EPS = 1e-9
 
+# Exponent of the Stern lower-place weights
+STERN_EXPONENT = load_calibration_params()["params"]["stern_exponent"]
 
-def harville_place_show(p_win: List[float], use_stern: bool = True) -> List[Dict[str, float]]:
+
+def stern_adjust(p_win: np.ndarray, exponent: Optional[float] = None) -> np.ndarray:
     """
-    Compute place and show probabilities using Harville formulas.
+    Stern lower-place weights: σ = p^STERN_EXPONENT (0.95 prior), renormalized.
+    
+    Args:
+        p_win: Win probability vector, or (races, horses) matrix (per row)
+        exponent: Override for STERN_EXPONENT (e.g. from an artifact snapshot)
+    
+    Returns:
+        Weights summing to 1 per row (rows summing to zero are left unchanged)
+    """
+    p_adjusted = np.power(p_win, STERN_EXPONENT if exponent is None else exponent)
+    total = p_adjusted.sum(axis=-1, keepdims=True)
+    return np.where(total > 0, p_adjusted / np.where(total > 0, total, 1.0), p_win)
+
+
+@lru_cache(maxsize=32)
+def _distinct_triples_mask(n: int) -> np.ndarray:
+    """Boolean n×n×n mask that is True where i, j, k are all distinct."""
+    idx = np.arange(n)
+    i = idx[:, None, None]
+    j = idx[None, :, None]
+    k = idx[None, None, :]
+    mask = (i != j) & (k != i) & (k != j)
+    mask.setflags(write=False)
+    return mask
+
+
+# Available place/show evaluation strategies (see harville_arrays)
+HARVILLE_ALGORITHMS = ("closed_form", "broadcast")
+DEFAULT_ALGORITHM = "closed_form"
+
+
+def harville_arrays(
+    p_win,
+    use_stern: bool = True,
+    algorithm: str = DEFAULT_ALGORITHM,
+    stern_exponent: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized Harville place/show probabilities.
+    
+    Algorithms:
+    - "closed_form": O(n²). Collapses the inner k-sum of P(i 3rd) using
+      per-race row sums: Σ_{k∉{i,j}} w_jk = (Σ_{k≠j} w_jk) - w_ji.
+    - "broadcast": O(n³). Materializes the full (j, k, i) term tensor and
+      sums it under a distinct-triples mask.
+    
+    Both share the same 1e-9 denominator guards and final clamping.
+    
+    With use_stern, 2nd and 3rd place are chosen in proportion to
+    σ = stern_adjust(p_win) among the horses left; with γ = 1 (or
+    use_stern=False) this is plain Harville.
+    
+    Accepts a single race (n,) or a padded batch (races, n); padding
+    cells with p = 0 are neutral and come back as 0.0.
+    
+    Args:
+        p_win: Win probabilities (n >= 2), one race or a races×horses matrix
+        use_stern: Apply the Stern lower-place discount (default True)
+        algorithm: "closed_form" (default) or "broadcast"
+        stern_exponent: Override for STERN_EXPONENT
+    
+    Returns:
+        (p_win, p_place, p_show) float64 arrays shaped like the input;
+        p_win is the input, unchanged by the Stern discount
+    """
+    if algorithm not in HARVILLE_ALGORITHMS:
+        raise ValueError(f"Unknown Harville algorithm: {algorithm!r}")
+    
+    p = np.asarray(p_win, dtype=np.float64)
+    n = p.shape[-1]
+    
+    # Lower-place weights σ (σ = p without the Stern discount)
+    sigma = stern_adjust(p, stern_exponent) if use_stern else p
+    
+    # Precomputed denominators: (1 - σ_j) and (1 - σ_j - σ_k)
+    denom1 = np.maximum(1.0 - sigma, DENOM_EPS)
+    denom2 = np.maximum(1.0 - sigma[..., :, None] - sigma[..., None, :], DENOM_EPS)
+    off_diag = ~np.eye(n, dtype=bool)
+    
+    # q_j = p_j / (1 - σ_j): weight of j winning and handing 2nd to the rest
+    q = p / denom1
     
-    Harville formulas:
-    - P(place_i) = Σ_{j≠i} [p_i * p_j / (1 - p_i)]
-    - P(show_i) = Σ_{j≠i,k≠i,k≠j} [p_i * p_j * p_k / ((1-p_i)(1-p_i-p_j))]
+    # Place: P(i 1st) + P(i 2nd), P(i 2nd) = Σ_{j≠i} p_j * σ_i / (1 - σ_j)
+    # (masked row sums rather than Σq - q_i, which cancels badly when a
+    # single horse holds almost all of the mass)
+    p_place = p + sigma * np.where(off_diag, q[..., None, :], 0.0).sum(axis=-1)
+    
+    # Show: P(place) + P(i 3rd),
+    # P(i 3rd) = Σ_{j≠i,k∉{i,j}} p_j * σ_k * σ_i / ((1-σ_j)(1-σ_j-σ_k))
+    if algorithm == "closed_form":
+        # w[j, k] = σ_k / (1 - σ_j - σ_k); rest[j, i] = Σ_{k∉{i,j}} w[j, k]
+        w = np.where(off_diag, sigma[..., None, :] / denom2, 0.0)
+        rest = np.maximum(w.sum(axis=-1)[..., :, None] - w, 0.0)
+        third = sigma * np.where(off_diag, q[..., :, None] * rest, 0.0).sum(axis=-2)
+    else:
+        # terms[j, k, i] over all distinct (j, k, i)
+        pair = q[..., :, None] * sigma[..., None, :] / denom2
+        terms = pair[..., :, :, None] * sigma[..., None, None, :]
+        third = np.where(_distinct_triples_mask(n), terms, 0.0).sum(axis=(-3, -2))
+    p_show = p_place + third
+    
+    # Clamp to valid probability range
+    np.clip(p_place, 0.0, 1.0, out=p_place)
+    np.clip(p_show, 0.0, 1.0, out=p_show)
+    
+    return p, p_place, p_show
+
+
+def harville_place_show(
+    p_win: List[float],
+    use_stern: bool = True,
+    algorithm: str = DEFAULT_ALGORITHM
+) -> List[Dict[str, float]]:
+    """
+    Compute place and show probabilities using Harville formulas (NumPy engine).
     
-    Stern adjustment: Mild flattening for dense favorites (optional).
+    Output matches harville_place_show_py (the pure-Python reference)
+    to within floating-point rounding, for either algorithm.
     
     Args:
         p_win: List of win probabilities (must sum to ~1.0)
-        use_stern: Apply Stern adjustment (default True)
+        use_stern: Apply the Stern lower-place discount (default True)
+        algorithm: "closed_form" (O(n²), default) or "broadcast" (O(n³))
     
     Returns:
         List of {p_win, p_place, p_show} dicts
@@ -33,32 +164,154 @@ def harville_place_show(p_win: List[float], use_stern: bool = True) -> List[Dict
         # Edge case: only 1 horse
         return [{"p_win": 1.0, "p_place": 1.0, "p_show": 1.0}] if n == 1 else []
     
-    # Stern adjustment (optional mild flattening)
+    p, p_place, p_show = harville_arrays(p_win, use_stern=use_stern, algorithm=algorithm)
+    
+    return [
+        {"p_win": w, "p_place": pl, "p_show": sh}
+        for w, pl, sh in zip(p.tolist(), p_place.tolist(), p_show.tolist())
+    ]
+
+
+def harville_jacobian(p_win, use_stern: bool = True, stern_exponent: Optional[float] = None) -> np.ndarray:
+    """
+    Analytic Jacobian of harville_arrays with respect to the input p_win.
+    
+    Differentiates the closed form directly (O(n^2)); where a denominator
+    guard or the final [0, 1] clamp is active the term is constant, so its
+    derivative is 0.
+    
+    Args:
+        p_win: Win probabilities (1-D, n >= 2), same input as harville_arrays
+        use_stern: Include the Stern lower-place discount
+        stern_exponent: Override for STERN_EXPONENT
+    
+    Returns:
+        (3, n, n) array J with J[0, i, k] = ∂p_win_i/∂p_win_k (the identity),
+        J[1, i, k] = ∂p_place_i/∂p_win_k and J[2, i, k] = ∂p_show_i/∂p_win_k
+    """
+    p_in = np.asarray(p_win, dtype=np.float64)
+    n = p_in.shape[0]
+    eye = np.eye(n)
+    off_diag = ~np.eye(n, dtype=bool)
+    
+    p = p_in
+    if use_stern:
+        gamma = STERN_EXPONENT if stern_exponent is None else stern_exponent
+        sigma = stern_adjust(p_in, gamma)
+        # σ_i = p_i^γ / Σ p^γ  =>  ∂σ_i/∂p_k = γ (δ_ik - σ_i) σ_k / p_k
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(p_in > 0, gamma * sigma / p_in, 0.0)
+        d_sigma = (eye - sigma[:, None]) * scale[None, :]
+    else:
+        sigma = p_in
+        d_sigma = eye
+    
+    # Partials are taken in p (winner factor) and σ (lower places) separately,
+    # then chained: d/dp_win = ∂/∂p + ∂/∂σ @ d_sigma
+    
+    # q_j = p_j / (1 - σ_j) and its σ-partial (0 where the guard is active)
+    free1 = 1.0 - sigma > DENOM_EPS
+    inv1 = 1.0 / np.maximum(1.0 - sigma, DENOM_EPS)
+    q = p * inv1
+    dq = p * np.where(free1, inv1 ** 2, 0.0)
+    
+    # Place: p_i + σ_i Σ_{j≠i} q_j
+    q_rest = np.where(off_diag, q[None, :], 0.0).sum(axis=1)
+    dp_place = eye + np.where(off_diag, sigma[:, None] * inv1[None, :], 0.0)
+    ds_place = np.where(off_diag, sigma[:, None] * dq[None, :], 0.0) + np.diag(q_rest)
+    
+    # Third: σ_i T_i, T_i = Σ_{j≠i} Σ_{k∉{i,j}} q_j w_jk, w_jk = σ_k / (1 - σ_j - σ_k)
+    free2 = 1.0 - sigma[:, None] - sigma[None, :] > DENOM_EPS
+    d2 = 1.0 / np.maximum(1.0 - sigma[:, None] - sigma[None, :], DENOM_EPS)
+    dd2 = np.where(free2, d2 ** 2, 0.0)
+    w = np.where(off_diag, sigma[None, :] * d2, 0.0)
+    # a[m, k] = ∂w_mk/∂σ_m, b[j, m] = ∂w_jm/∂σ_m
+    a = np.where(off_diag, sigma[None, :] * dd2, 0.0)
+    b = np.where(off_diag, d2 + sigma[None, :] * dd2, 0.0)
+    
+    rest = np.maximum(w.sum(axis=1)[:, None] - w, 0.0)
+    t = np.where(off_diag, q[:, None] * rest, 0.0).sum(axis=0)
+    
+    # ∂T_i/∂p_m and ∂T_i/∂σ_m for m ≠ i (T_i depends on neither p_i nor σ_i)
+    rest_t = w.sum(axis=1)[None, :] - w.T
+    dp_t = np.where(off_diag, inv1[None, :] * rest_t, 0.0)
+    qb = (q[:, None] * b).sum(axis=0)
+    ds_t = (
+        dq[None, :] * rest_t
+        + q[None, :] * (a.sum(axis=1)[None, :] - a.T)
+        + qb[None, :] - q[:, None] * b
+    )
+    ds_t = np.where(off_diag, ds_t, 0.0)
+    dp_third = sigma[:, None] * dp_t
+    ds_third = np.diag(t) + sigma[:, None] * ds_t
+    
+    d_place = dp_place + ds_place @ d_sigma
+    d_show = d_place + dp_third + ds_third @ d_sigma
+    
+    # Rows clamped to 1.0 by harville_arrays are locally constant
+    place = p + sigma * q_rest
+    d_place = np.where((place > 1.0)[:, None], 0.0, d_place)
+    d_show = np.where((place + sigma * t > 1.0)[:, None], 0.0, d_show)
+    
+    return np.stack([eye, d_place, d_show])
+
+
+def harville_place_show_py(p_win: List[float], use_stern: bool = True) -> List[Dict[str, float]]:
+    """
+    Compute place and show probabilities using Harville formulas.
+    
+    Pure-Python reference implementation (O(n³) loops), kept for parity
+    testing of the NumPy engine.
+    
+    Harville formulas, with σ the lower-place weights (σ = p without Stern):
+    - P(place_i) = p_i + Σ_{j≠i} [p_j * σ_i / (1 - σ_j)]
+    - P(show_i) = P(place_i) + Σ_{j≠i,k∉{i,j}} [p_j * σ_k * σ_i / ((1-σ_j)(1-σ_j-σ_k))]
+    
+    Stern adjustment: σ = p^0.95 renormalized, discounting favorites in the
+    lower places only (optional).
+    
+    Args:
+        p_win: List of win probabilities (must sum to ~1.0)
+        use_stern: Apply the Stern lower-place discount (default True)
+    
+    Returns:
+        List of {p_win, p_place, p_show} dicts
+    
+    Examples:
+    >>> probs = [0.40, 0.30, 0.20, 0.10]
+    >>> results = harville_place_show_py(probs)
+    >>> results[0]['p_place'] > results[0]['p_win']  # Place > Win
+    True
+    """
+    n = len(p_win)
+    if n < 2:
+        # Edge case: only 1 horse
+        return [{"p_win": 1.0, "p_place": 1.0, "p_show": 1.0}] if n == 1 else []
+    
+    # Lower-place weights (Stern: p^0.95, renormalized)
+    sigma = list(p_win)
     if use_stern:
-        # Stern factor: slightly reduce extreme probabilities
-        # Formula: p' = p^0.95 (gentle exponent)
         p_adjusted = [p ** 0.95 for p in p_win]
-        # Renormalize
         total = sum(p_adjusted)
         if total > 0:
-            p_win = [p / total for p in p_adjusted]
+            sigma = [p / total for p in p_adjusted]
     
     results = []
     
     for i in range(n):
         p_i = p_win[i]
         
-        # Place probability
-        p_place = 0.0
+        # Place probability: P(i 1st) + P(i 2nd)
+        p_place = p_i
         for j in range(n):
             if j != i:
-                denom = 1.0 - p_i
+                denom = 1.0 - sigma[j]
                 if denom < 1e-9:
                     denom = 1e-9  # Numerical stability
-                p_place += (p_i * p_win[j]) / denom
+                p_place += (p_win[j] * sigma[i]) / denom
         
-        # Show probability
-        p_show = 0.0
+        # Show probability: P(place) + P(i 3rd)
+        p_show = p_place
         for j in range(n):
             if j == i:
                 continue
@@ -66,8 +319,8 @@ def harville_place_show(p_win: List[float], use_stern: bool = True) -> List[Dict
                 if k == i or k == j:
                     continue
                 
-                denom1 = 1.0 - p_i
-                denom2 = 1.0 - p_i - p_win[j]
+                denom1 = 1.0 - sigma[j]
+                denom2 = 1.0 - sigma[j] - sigma[k]
                 
                 # Numerical stability
                 if denom1 < 1e-9:
@@ -75,7 +328,7 @@ def harville_place_show(p_win: List[float], use_stern: bool = True) -> List[Dict
                 if denom2 < 1e-9:
                     denom2 = 1e-9
                 
-                p_show += (p_i * p_win[j] * p_win[k]) / (denom1 * denom2)
+                p_show += (p_win[j] * sigma[k] * sigma[i]) / (denom1 * denom2)
         
         # Clamp to valid probability range
         p_place = max(0.0, min(1.0, p_place))
@@ -107,3 +360,173 @@ def compute_exacta_prob(p_win: List[float], i: int, j: int) -> float:
     
     return (p_i * p_j) / denom
 
+
+
+def exacta_matrix(p_win) -> np.ndarray:
+    """
+    Full n×n exacta table in one vectorized pass.
+    
+    E[i, j] = p_i * p_j / (1 - p_i), zero on the diagonal.
+    Same convention as compute_exacta_prob: cells whose denominator falls
+    below 1e-9 are 0.0.
+    
+    Args:
+        p_win: Win probabilities (already Stern-adjusted if desired)
+    
+    Returns:
+        (n, n) float64 array
+    """
+    p = np.asarray(p_win, dtype=np.float64)
+    n = p.shape[0]
+    
+    denom1 = 1.0 - p
+    valid1 = denom1 >= DENOM_EPS
+    first = np.where(valid1, p / np.where(valid1, denom1, 1.0), 0.0)
+    
+    exacta = first[:, None] * p[None, :]
+    exacta[np.eye(n, dtype=bool)] = 0.0
+    return exacta
+
+
+def trifecta_tensor(p_win) -> np.ndarray:
+    """
+    Full n×n×n trifecta table in one vectorized pass.
+    
+    T[i, j, k] = p_i * p_j * p_k / ((1 - p_i)(1 - p_i - p_j)), zero unless
+    i, j, k are distinct. Cells with a denominator below 1e-9 are 0.0.
+    
+    Args:
+        p_win: Win probabilities (already Stern-adjusted if desired)
+    
+    Returns:
+        (n, n, n) float64 array
+    """
+    p = np.asarray(p_win, dtype=np.float64)
+    n = p.shape[0]
+    
+    denom2 = 1.0 - p[:, None] - p[None, :]
+    valid2 = denom2 >= DENOM_EPS
+    second = np.where(valid2, exacta_matrix(p) / np.where(valid2, denom2, 1.0), 0.0)
+    
+    trifecta = second[:, :, None] * p[None, None, :]
+    return np.where(_distinct_triples_mask(n), trifecta, 0.0)
+
+
+def top_k_finish_orders(p_win, k: int = 10, depth: int = 4) -> List[Dict[str, Any]]:
+    """
+    Most likely finishing orders of a given depth, best first.
+    
+    Pruned best-first enumeration over the Harville prefix tree: extending
+    a prefix multiplies its probability by p_h / (1 - Σ prefix) <= 1, so
+    prefixes come off the heap in descending order and the first k
+    complete orders popped are exactly the top k. Children are pushed
+    lazily (best remaining horse first, then its next sibling), so only
+    O(k * depth) nodes are expanded instead of all n^depth cells.
+    
+    Args:
+        p_win: Win probabilities (already Stern-adjusted if desired)
+        k: Number of orders to return
+        depth: Positions per order (4 = superfecta)
+    
+    Returns:
+        List of {order: [i, j, ...], prob} dicts, highest prob first
+    """
+    p = [float(x) for x in p_win]
+    n = len(p)
+    if k <= 0 or depth <= 0 or n < depth:
+        return []
+    
+    # Horses by descending win probability; for a fixed prefix the
+    # conditional p_h / (1 - Σ prefix) preserves this order.
+    ranked = sorted(range(n), key=lambda h: -p[h])
+    
+    def next_child(prefix: Tuple[int, ...], start: int):
+        """First unused horse at or after rank position `start`."""
+        for pos in range(start, n):
+            if ranked[pos] not in prefix:
+                return pos
+        return None
+    
+    def extend(prefix: Tuple[int, ...], prob: float, pos: int):
+        h = ranked[pos]
+        denom = 1.0 - sum(p[x] for x in prefix)
+        if denom < DENOM_EPS:
+            return None
+        return prob * p[h] / denom
+    
+    # Heap entries: (-prob, prefix, parent_prefix, parent_prob, rank_pos)
+    heap = []
+    
+    def push_child(parent: Tuple[int, ...], parent_prob: float, start: int):
+        pos = next_child(parent, start)
+        if pos is None:
+            return
+        prob = extend(parent, parent_prob, pos)
+        if prob is None or prob <= 0.0:
+            return
+        heapq.heappush(heap, (-prob, parent + (ranked[pos],), parent, parent_prob, pos))
+    
+    push_child((), 1.0, 0)
+    results = []
+    
+    while heap and len(results) < k:
+        neg_prob, prefix, parent, parent_prob, pos = heapq.heappop(heap)
+        prob = -neg_prob
+        
+        # Next sibling under the same parent (never more likely than this node)
+        push_child(parent, parent_prob, pos + 1)
+        
+        if len(prefix) == depth:
+            results.append({"order": list(prefix), "prob": prob})
+        else:
+            push_child(prefix, prob, 0)
+    
+    return results
+
+
+def finish_order_tables(p_win, top_k: int = 10) -> Dict[str, Any]:
+    """
+    Batch exotic probabilities for a race.
+    
+    Args:
+        p_win: Win probabilities (already Stern-adjusted if desired)
+        top_k: Number of superfecta combinations to return
+    
+    Returns:
+        {
+          exacta: (n, n) array,
+          trifecta: (n, n, n) array,
+          superfecta: [{order: [i, j, k, l], prob}, ...] (top_k, best first)
+        }
+    """
+    return {
+        "exacta": exacta_matrix(p_win),
+        "trifecta": trifecta_tensor(p_win),
+        "superfecta": top_k_finish_orders(p_win, k=top_k, depth=4),
+    }
+
+
+def top_k_cells(table: np.ndarray, k: int) -> List[Dict[str, Any]]:
+    """
+    Highest-probability cells of an exacta/trifecta table.
+    
+    Args:
+        table: Array from exacta_matrix or trifecta_tensor
+        k: Number of cells to return
+    
+    Returns:
+        List of {order: [i, j, ...], prob} dicts (non-zero cells only)
+    """
+    flat = table.ravel()
+    k = min(k, flat.size)
+    if k <= 0:
+        return []
+    
+    idx = np.argpartition(-flat, k - 1)[:k]
+    idx = idx[np.argsort(-flat[idx], kind="stable")]
+    
+    return [
+        {"order": [int(x) for x in np.unravel_index(i, table.shape)], "prob": float(flat[i])}
+        for i in idx
+        if flat[i] > 0.0
+    ]
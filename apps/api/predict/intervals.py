@@ -0,0 +1,215 @@
+"""
+Empirical confidence intervals for calibrated win probabilities.
+
+The interval around a horse's p_win is read from a precomputed table of
+bootstrap bands per (field size, probability bucket). Offline, result
+history is resampled by race (Poisson bootstrap); in each cell the
+observed win rate of every resample is compared with the cell's mean
+predicted probability, and the band is the spread of that comparison on
+the logit scale:
+
+    low  = σ(logit(p) + logit_low[cell])
+    high = σ(logit(p) + logit_high[cell])
+
+so a cell where the model is biased gets a band that is off-center, and a
+sparse cell gets a wide one. At request time the lookup is two
+searchsorted calls and a gather.
+
+Without a fitted table calibration falls back to its Wilson interval.
+"""
+from pathlib import Path
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .calibration import MIN_PROB, MAX_PROB
+
+
+# Table location (loaded by the artifact registry as "ci_table")
+DEFAULT_CI_TABLE_PATH = Path(__file__).resolve().parents[3] / "data" / "ci_table_v1.json"
+
+# Bucket lower edges: live horses per race, calibrated p_win
+DEFAULT_FIELD_EDGES = (2, 6, 8, 10, 12, 14)
+DEFAULT_PROB_EDGES = (0.0, 0.02, 0.04, 0.06, 0.08, 0.10, 0.125, 0.15, 0.20, 0.25, 0.30, 0.40, 0.50)
+
+# Bootstrap settings
+DEFAULT_LEVEL = 0.95
+DEFAULT_RESAMPLES = 200
+MIN_CELL_RUNNERS = 200  # Sparser cells borrow the band pooled over field sizes
+
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    p = np.minimum(np.maximum(p, MIN_PROB), 1 - MIN_PROB)
+    return np.log(p / (1 - p))
+
+
+class CITable:
+    """Precomputed logit-offset CI bands per (field size, probability) bucket."""
+
+    __slots__ = ("version", "level", "field_edges", "prob_edges", "logit_low", "logit_high", "count")
+
+    def __init__(
+        self,
+        field_edges: Sequence[float],
+        prob_edges: Sequence[float],
+        logit_low: Sequence[Sequence[float]],
+        logit_high: Sequence[Sequence[float]],
+        count: Optional[Sequence[Sequence[int]]] = None,
+        level: float = DEFAULT_LEVEL,
+        version: str = "unversioned"
+    ):
+        """
+        Args:
+            field_edges: Field-size bucket lower edges (ascending)
+            prob_edges: Probability bucket lower edges (ascending)
+            logit_low: (fields, probs) lower offsets
+            logit_high: (fields, probs) upper offsets
+            count: (fields, probs) runners per cell (reporting only)
+            level: Nominal coverage
+            version: Table version
+
+        Raises:
+            ValueError: If the shapes disagree or a band is not finite
+        """
+        self.version = str(version)
+        self.level = float(level)
+        self.field_edges = np.asarray(field_edges, dtype=np.float64)
+        self.prob_edges = np.asarray(prob_edges, dtype=np.float64)
+        self.logit_low = np.asarray(logit_low, dtype=np.float64)
+        self.logit_high = np.asarray(logit_high, dtype=np.float64)
+        shape = (self.field_edges.shape[0], self.prob_edges.shape[0])
+        self.count = np.zeros(shape, dtype=np.int64) if count is None else np.asarray(count, dtype=np.int64)
+        if self.logit_low.shape != shape or self.logit_high.shape != shape or self.count.shape != shape:
+            raise ValueError(f"CI table bands must be {shape}")
+        if not (np.isfinite(self.logit_low).all() and np.isfinite(self.logit_high).all()):
+            raise ValueError("CI table bands must be finite")
+        for arr in (self.field_edges, self.prob_edges, self.logit_low, self.logit_high, self.count):
+            arr.flags.writeable = False
+
+    @classmethod
+    def from_artifact(cls, doc: Dict[str, Any]) -> "CITable":
+        """
+        Build from a parsed ci_table_v1.json.
+
+        Raises:
+            KeyError, TypeError, ValueError: If the artifact is malformed
+        """
+        return cls(
+            doc["field_edges"], doc["prob_edges"], doc["logit_low"], doc["logit_high"],
+            count=doc.get("count"), level=doc.get("level", DEFAULT_LEVEL), version=doc.get("version", "unversioned")
+        )
+
+    def interval(self, p_win: np.ndarray, n_live: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        CI bounds for every cell of a races×horses matrix.
+
+        Args:
+            p_win: (races, horses) calibrated win probabilities
+            n_live: (races, 1) live horses per race
+
+        Returns:
+            (ci_low, ci_high), clamped to [MIN_PROB, MAX_PROB] (padding is the caller's to mask)
+        """
+        fi = np.maximum(np.searchsorted(self.field_edges, n_live, side="right") - 1, 0)
+        pi = np.maximum(np.searchsorted(self.prob_edges, p_win, side="right") - 1, 0)
+        x = _logit(p_win)
+        low = 1.0 / (1.0 + np.exp(-(x + self.logit_low[fi, pi])))
+        high = 1.0 / (1.0 + np.exp(-(x + self.logit_high[fi, pi])))
+        return np.maximum(low, MIN_PROB), np.minimum(high, MAX_PROB)
+
+
+def _fill_sparse(offsets: np.ndarray, pooled: np.ndarray, count: np.ndarray, pooled_count: np.ndarray) -> np.ndarray:
+    """Sparse cells take the pooled band; sparse pooled buckets take their nearest populated neighbor."""
+    pooled = pooled.copy()
+    ok = pooled_count >= MIN_CELL_RUNNERS
+    if ok.any():
+        idx = np.flatnonzero(ok)
+        nearest = idx[np.abs(np.arange(pooled.shape[0])[:, None] - idx[None, :]).argmin(axis=1)]
+        pooled = pooled[nearest]
+    return np.where(count >= MIN_CELL_RUNNERS, offsets, pooled[None, :])
+
+
+def bootstrap_ci_table(
+    race: np.ndarray,
+    field_size: np.ndarray,
+    p_win: np.ndarray,
+    won: np.ndarray,
+    n_resamples: int = DEFAULT_RESAMPLES,
+    level: float = DEFAULT_LEVEL,
+    field_edges: Sequence[float] = DEFAULT_FIELD_EDGES,
+    prob_edges: Sequence[float] = DEFAULT_PROB_EDGES,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Bootstrap CI bands from flat runner vectors.
+
+    Races are resampled with Poisson(1) weights, so runners of one race
+    stay together (their outcomes are dependent). Per resample and cell
+    the offset is logit(observed win rate) - logit(mean predicted p), with
+    half a win of continuity correction; the band is the (1 ± level)/2
+    quantiles of the offsets.
+
+    Args:
+        race: (m,) race index per runner (0..R-1)
+        field_size: (m,) live horses in the runner's race
+        p_win: (m,) calibrated win probability the API would report
+        won: (m,) True for winners
+        n_resamples: Bootstrap resamples
+        level: Nominal coverage
+        field_edges: Field-size bucket lower edges
+        prob_edges: Probability bucket lower edges
+        seed: RNG seed
+
+    Returns:
+        Artifact dict for CITable.from_artifact (plus n_races/n_runners)
+
+    Raises:
+        ValueError: If there are no runners
+    """
+    race = np.asarray(race, dtype=np.int64)
+    if race.shape[0] == 0:
+        raise ValueError("no runners to bootstrap")
+    p_win = np.asarray(p_win, dtype=np.float64)
+    won = np.asarray(won, dtype=np.float64)
+    f_edges = np.asarray(field_edges, dtype=np.float64)
+    p_edges = np.asarray(prob_edges, dtype=np.float64)
+    n_f, n_p = f_edges.shape[0], p_edges.shape[0]
+
+    fi = np.maximum(np.searchsorted(f_edges, field_size, side="right") - 1, 0)
+    pi = np.maximum(np.searchsorted(p_edges, p_win, side="right") - 1, 0)
+    cell = fi * n_p + pi
+    n_races = int(race.max()) + 1
+
+    rng = np.random.default_rng(seed)
+    offsets = np.empty((n_resamples, n_f * n_p))
+    pooled = np.empty((n_resamples, n_p))
+    for b in range(n_resamples):
+        w = rng.poisson(1.0, size=n_races).astype(np.float64)[race]
+        sums = np.stack([
+            np.bincount(cell, weights=w, minlength=n_f * n_p),
+            np.bincount(cell, weights=w * won, minlength=n_f * n_p),
+            np.bincount(cell, weights=w * p_win, minlength=n_f * n_p)
+        ]).reshape(3, n_f, n_p)
+        for out, (n, wins, predicted) in ((offsets, sums.reshape(3, -1)), (pooled, sums.sum(axis=1))):
+            n_safe = np.maximum(n, 1.0)
+            rate = (wins + 0.5) / (n_safe + 1.0)
+            out[b] = _logit(rate) - _logit(predicted / n_safe)
+
+    tail = (1.0 - level) / 2.0
+    count = np.bincount(cell, minlength=n_f * n_p).reshape(n_f, n_p)
+    pooled_count = np.bincount(pi, minlength=n_p)
+    low = _fill_sparse(np.quantile(offsets, tail, axis=0).reshape(n_f, n_p),
+                       np.quantile(pooled, tail, axis=0), count, pooled_count)
+    high = _fill_sparse(np.quantile(offsets, 1 - tail, axis=0).reshape(n_f, n_p),
+                        np.quantile(pooled, 1 - tail, axis=0), count, pooled_count)
+    return {
+        "level": level,
+        "n_resamples": n_resamples,
+        "field_edges": [float(e) for e in f_edges],
+        "prob_edges": [float(e) for e in p_edges],
+        "logit_low": np.round(low, 5).tolist(),
+        "logit_high": np.round(high, 5).tolist(),
+        "count": count.tolist(),
+        "n_races": n_races,
+        "n_runners": int(race.shape[0])
+    }
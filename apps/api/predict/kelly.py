@@ -0,0 +1,409 @@
+"""
+Simultaneous (multi-outcome) Kelly staking across a whole field.
+
+Per-horse Kelly (ev.kelly_fraction) sizes every bet as if it were the only
+one, which overbets a race where several horses or pools show an edge: the
+bets share outcomes. Here all win/place/show bets of a race are sized
+together by maximizing expected log-growth over the race's finish-order
+distribution:
+
+    max_f  Σ_s π_s · log(1 + Σ_j f_j · r_sj)
+    s.t.   0 <= f_j <= max_kelly,  Σ_j f_j <= bankroll_cap
+
+where s runs over the Harville top-k orders (k = deepest pool offered) and
+r_sj is bet j's net return in outcome s (odds - 1 if it cashes, else -1).
+The solver is a projected Newton method on the box, with the bankroll cap
+handled by a Newton search on its Lagrange multiplier.
+
+A card of parallel races is sized the same way over the joint outcome
+space (exact product when small, otherwise sampled scenarios).
+"""
+from functools import lru_cache
+from typing import Dict, Any, List, Sequence, Tuple
+
+import numpy as np
+
+from .harville import exacta_matrix, trifecta_tensor
+
+
+# Pools and how many finishing places each one pays on
+POOLS = ("win", "place", "show")
+POOL_PLACES = {"win": 1, "place": 2, "show": 3}
+
+# Joint card outcomes enumerated exactly up to this size, sampled beyond it
+MAX_JOINT_OUTCOMES = 50_000
+DEFAULT_SCENARIOS = 20_000
+
+# Newton solver settings
+TOLERANCE = 1e-10
+MAX_ITER = 60
+RIDGE = 1e-12
+
+
+@lru_cache(maxsize=64)
+def _finish_orders(n: int, depth: int) -> np.ndarray:
+    """All ordered top-`depth` tuples of distinct horses, as (S, depth) int rows."""
+    idx = np.arange(n)
+    if depth == 1:
+        orders = idx[:, None]
+    elif depth == 2:
+        i, j = np.nonzero(idx[:, None] != idx[None, :])
+        orders = np.stack([i, j], axis=1)
+    else:
+        i, j, k = np.nonzero(
+            (idx[:, None, None] != idx[None, :, None])
+            & (idx[:, None, None] != idx[None, None, :])
+            & (idx[None, :, None] != idx[None, None, :])
+        )
+        orders = np.stack([i, j, k], axis=1)
+    orders.setflags(write=False)
+    return orders
+
+
+def finish_outcomes(p_win, depth: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Harville distribution over the first `depth` finishers.
+
+    Args:
+        p_win: Win probabilities (already Stern-adjusted if desired)
+        depth: 1 (winner), 2 (exacta) or 3 (trifecta)
+
+    Returns:
+        (orders (S, depth) horse indices, probs (S,) summing to 1)
+    """
+    p = np.asarray(p_win, dtype=np.float64)
+    n = p.shape[0]
+    depth = max(1, min(depth, 3, n))
+    orders = _finish_orders(n, depth)
+    if depth == 1:
+        probs = p.copy()
+    elif depth == 2:
+        probs = exacta_matrix(p)[orders[:, 0], orders[:, 1]]
+    else:
+        probs = trifecta_tensor(p)[orders[:, 0], orders[:, 1], orders[:, 2]]
+    total = probs.sum()
+    return orders, probs / total if total > 0 else probs
+
+
+def bet_returns(
+    orders: np.ndarray,
+    horses: np.ndarray,
+    places: np.ndarray,
+    decimal_odds: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Net return of each bet in each outcome.
+
+    Args:
+        orders: (S, depth) finishing orders
+        horses: (m,) horse index per bet
+        places: (m,) places paid per bet (1 win, 2 place, 3 show)
+        decimal_odds: (m,) decimal odds per bet
+
+    Returns:
+        (returns (S, m): odds - 1 if the bet cashes else -1, hits (S, m) bool)
+    """
+    position = np.arange(orders.shape[1])
+    hits = ((orders[:, None, :] == horses[None, :, None]) & (position[None, None, :] < places[None, :, None])).any(axis=-1)
+    return np.where(hits, decimal_odds[None, :] - 1.0, -1.0), hits
+
+
+def _growth(returns: np.ndarray, probs: np.ndarray, f: np.ndarray) -> float:
+    wealth = 1.0 + returns @ f
+    if wealth.min() <= 0:
+        return -np.inf
+    return float(probs @ np.log(wealth))
+
+
+def _box_newton(
+    returns: np.ndarray,
+    probs: np.ndarray,
+    upper: np.ndarray,
+    lam: float,
+    f: np.ndarray
+) -> Tuple[np.ndarray, int]:
+    """
+    Projected Newton for max G(f) - lam·Σf on the box 0 <= f <= upper.
+
+    Returns:
+        (f, iterations)
+    """
+    m = f.shape[0]
+    value = _growth(returns, probs, f) - lam * f.sum()
+    it = 0
+    for it in range(1, MAX_ITER + 1):
+        wealth = 1.0 + returns @ f
+        a = probs / wealth
+        grad = returns.T @ a - lam
+
+        # Bounds that the gradient pushes against stay fixed this step
+        eps = min(1e-9, float(np.abs(np.clip(f + grad, 0.0, upper) - f).max()))
+        free = ~(((f <= eps) & (grad <= 0)) | ((f >= upper - eps) & (grad >= 0)))
+        if not free.any() or np.abs(grad[free]).max() < TOLERANCE:
+            break
+
+        r_free = returns[:, free]
+        hessian = (r_free * (a / wealth)[:, None]).T @ r_free
+        hessian[np.diag_indices_from(hessian)] += RIDGE
+        step = np.zeros(m)
+        step[free] = np.linalg.solve(hessian, grad[free])
+
+        # Backtracking on the projected arc (Armijo)
+        t = 1.0
+        while True:
+            candidate = np.clip(f + t * step, 0.0, upper)
+            new_value = _growth(returns, probs, candidate) - lam * candidate.sum()
+            if new_value >= value + 1e-4 * float(grad @ (candidate - f)) or t < 1e-10:
+                break
+            t *= 0.5
+        if t < 1e-10:
+            break
+        moved = np.abs(candidate - f).max()
+        f, value = candidate, new_value
+        if moved < TOLERANCE:
+            break
+    return f, it
+
+
+def _budget_slope(returns: np.ndarray, probs: np.ndarray, f: np.ndarray, upper: np.ndarray) -> float:
+    """-dΣf/dλ at an inner optimum: 1ᵀH⁻¹1 over the bets strictly inside their bounds."""
+    inside = (f > 1e-12) & (f < upper - 1e-12)
+    if not inside.any():
+        return 0.0
+    wealth = 1.0 + returns @ f
+    r_in = returns[:, inside]
+    hessian = (r_in * (probs / wealth ** 2)[:, None]).T @ r_in
+    hessian[np.diag_indices_from(hessian)] += RIDGE
+    return float(np.linalg.solve(hessian, np.ones(hessian.shape[0])).sum())
+
+
+def solve_log_growth(
+    returns: np.ndarray,
+    probs: np.ndarray,
+    max_kelly: float = 0.25,
+    bankroll_cap: float = 1.0
+) -> Dict[str, Any]:
+    """
+    Joint Kelly fractions for bets sharing one outcome distribution.
+
+    Args:
+        returns: (S, m) net return per outcome and bet
+        probs: (S,) outcome probabilities (or scenario weights summing to 1)
+        max_kelly: Cap per bet
+        bankroll_cap: Cap on the total fraction staked
+
+    Returns:
+        {fractions (m,), growth, iterations, cap_binding}
+    """
+    m = returns.shape[1]
+    if m == 0:
+        return {"fractions": np.zeros(0), "growth": 0.0, "iterations": 0, "cap_binding": False}
+    upper = np.full(m, float(max_kelly))
+
+    f, iterations = _box_newton(returns, probs, upper, 0.0, np.zeros(m))
+    cap_binding = f.sum() > bankroll_cap + 1e-12
+
+    # Newton on the multiplier of Σf <= cap: dΣf/dλ = -1ᵀH⁻¹1 on the free set
+    lo, hi, lam = 0.0, np.inf, 0.0
+    for _ in range(MAX_ITER if cap_binding else 0):
+        excess = f.sum() - bankroll_cap
+        if abs(excess) < 1e-9:
+            break
+        if excess > 0:
+            lo = lam
+        else:
+            hi = lam
+        slope = _budget_slope(returns, probs, f, upper)
+        lam_next = lam + excess / slope if slope > 0 else np.inf
+        if not lo < lam_next < hi:
+            lam_next = 0.5 * (lo + hi) if np.isfinite(hi) else max(2.0 * lam, 1e-3)
+        lam = lam_next
+        f, its = _box_newton(returns, probs, upper, lam, f)
+        iterations += its
+    if cap_binding and f.sum() > bankroll_cap:
+        f = f * (bankroll_cap / f.sum())
+
+    return {
+        "fractions": f,
+        "growth": _growth(returns, probs, f),
+        "iterations": iterations,
+        "cap_binding": bool(cap_binding)
+    }
+
+
+def _race_bets(
+    p_win,
+    win_odds,
+    place_odds=None,
+    show_odds=None,
+    min_edge: float = 0.01
+) -> Dict[str, Any]:
+    """
+    Candidate bets of one race and their outcome returns.
+
+    A bet is a candidate when its odds are valid (> 1) and its model
+    probability beats the implied one by min_edge (the kelly_fraction rule).
+    Outcomes in which no candidate cashes are merged into one row.
+    """
+    p = np.asarray(p_win, dtype=np.float64)
+    n = p.shape[0]
+    odds_by_pool = {"win": win_odds, "place": place_odds, "show": show_odds}
+    offered = {
+        pool: np.asarray(o, dtype=np.float64) for pool, o in odds_by_pool.items()
+        if o is not None and n >= POOL_PLACES[pool]
+    }
+    if not offered:
+        # Fully scratched field (or no pool offered): no bets, one no-cash outcome
+        none = np.zeros(0, dtype=np.int64)
+        return {
+            "n": n, "horses": none, "pools": none, "odds": np.zeros(0), "p_hit": np.zeros(0),
+            "returns": np.zeros((1, 0)), "probs": np.ones(1)
+        }
+    depth = max([POOL_PLACES[pool] for pool in offered] or [1])
+    orders, probs = finish_outcomes(p, depth)
+
+    horses = np.concatenate([np.arange(n) for _ in offered]).astype(np.int64)
+    places = np.concatenate([np.full(n, POOL_PLACES[pool]) for pool in offered]).astype(np.int64)
+    pools = np.concatenate([np.full(n, POOLS.index(pool)) for pool in offered]).astype(np.int64)
+    odds = np.concatenate([offered[pool] for pool in offered]) if offered else np.zeros(0)
+    odds = np.where(np.isfinite(odds), odds, 0.0)
+
+    # Marginal cash probability per bet: P(horse finishes within its pool's places)
+    by_position = np.stack([
+        np.bincount(orders[:, k], weights=probs, minlength=n) for k in range(orders.shape[1])
+    ])
+    p_hit = np.cumsum(by_position, axis=0)[places - 1, horses] if horses.shape[0] else np.zeros(0)
+    valid = odds > 1.0
+    edge = p_hit - 1.0 / np.where(valid, odds, 1.0)
+    keep = valid & (edge >= min_edge)
+
+    returns, hits = bet_returns(orders, horses[keep], places[keep], odds[keep])
+    cashing = hits.any(axis=1)
+    if not cashing.all():
+        returns = np.vstack([returns[cashing], -np.ones((1, returns.shape[1]))])
+        probs = np.concatenate([probs[cashing], [probs[~cashing].sum()]])
+    return {
+        "n": n,
+        "horses": horses[keep],
+        "pools": pools[keep],
+        "odds": odds[keep],
+        "p_hit": p_hit[keep],
+        "returns": returns,
+        "probs": probs
+    }
+
+
+def _fractions_by_pool(bets: Dict[str, Any], fractions: np.ndarray) -> Dict[str, np.ndarray]:
+    out = {pool: np.zeros(bets["n"]) for pool in POOLS}
+    for horse, pool, f in zip(bets["horses"], bets["pools"], fractions):
+        out[POOLS[pool]][horse] = f
+    return out
+
+
+def race_kelly(
+    p_win,
+    win_odds,
+    place_odds=None,
+    show_odds=None,
+    max_kelly: float = 0.25,
+    bankroll_cap: float = 1.0,
+    min_edge: float = 0.01
+) -> Dict[str, Any]:
+    """
+    Jointly optimal win/place/show stakes for one race.
+
+    Args:
+        p_win: Win probabilities (already Stern-adjusted if desired)
+        win_odds: Decimal win odds per horse
+        place_odds: Decimal place odds per horse (None if not offered; NaN/<=1 skips a horse)
+        show_odds: Decimal show odds per horse (same convention)
+        max_kelly: Cap per bet
+        bankroll_cap: Cap on the race's total stake
+        min_edge: Minimum edge for a bet to be considered
+
+    Returns:
+        {win, place, show: (n,) fractions, total, growth, iterations, cap_binding}
+    """
+    bets = _race_bets(p_win, win_odds, place_odds, show_odds, min_edge)
+    solved = solve_log_growth(bets["returns"], bets["probs"], max_kelly, bankroll_cap)
+    return {
+        **_fractions_by_pool(bets, solved["fractions"]),
+        "total": float(solved["fractions"].sum()),
+        "growth": solved["growth"],
+        "iterations": solved["iterations"],
+        "cap_binding": solved["cap_binding"]
+    }
+
+
+def _joint_outcomes(
+    races: List[Dict[str, Any]],
+    n_scenarios: int,
+    seed: int
+) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """Returns/probabilities over the product of independent races (exact or sampled)."""
+    sizes = [b["probs"].shape[0] for b in races]
+    if float(np.prod(sizes, dtype=np.float64)) <= MAX_JOINT_OUTCOMES:
+        returns, probs = np.zeros((1, 0)), np.ones(1)
+        for b in races:
+            s_a, s_b = probs.shape[0], b["probs"].shape[0]
+            returns = np.hstack([np.repeat(returns, s_b, axis=0), np.tile(b["returns"], (s_a, 1))])
+            probs = np.outer(probs, b["probs"]).ravel()
+        return returns, probs, True
+
+    rng = np.random.default_rng(seed)
+    blocks = []
+    for b in races:
+        cdf = np.cumsum(b["probs"])
+        draws = np.minimum(np.searchsorted(cdf, rng.random(n_scenarios) * cdf[-1], side="right"), cdf.shape[0] - 1)
+        blocks.append(b["returns"][draws])
+    return np.hstack(blocks), np.full(n_scenarios, 1.0 / n_scenarios), False
+
+
+def card_kelly(
+    races: Sequence[Dict[str, Any]],
+    max_kelly: float = 0.25,
+    bankroll_cap: float = 1.0,
+    min_edge: float = 0.01,
+    n_scenarios: int = DEFAULT_SCENARIOS,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Jointly optimal stakes for parallel (simultaneously bet) races.
+
+    Races are independent and share one bankroll, so the growth is taken
+    over the product of their outcome spaces: enumerated exactly while it
+    has at most MAX_JOINT_OUTCOMES cells, otherwise over n_scenarios draws.
+
+    Args:
+        races: One dict per race with p_win, win_odds and optional
+            place_odds / show_odds (as for race_kelly)
+        max_kelly: Cap per bet
+        bankroll_cap: Cap on the card's total stake
+        min_edge: Minimum edge for a bet to be considered
+        n_scenarios: Scenario count when sampling
+        seed: Sampling seed
+
+    Returns:
+        {races: [{win, place, show, total}], total, growth, exact, iterations, cap_binding}
+    """
+    bets = [
+        _race_bets(r["p_win"], r["win_odds"], r.get("place_odds"), r.get("show_odds"), min_edge)
+        for r in races
+    ]
+    returns, probs, exact = _joint_outcomes(bets, n_scenarios, seed)
+    solved = solve_log_growth(returns, probs, max_kelly, bankroll_cap)
+
+    per_race, start = [], 0
+    for b in bets:
+        stop = start + b["returns"].shape[1]
+        fractions = solved["fractions"][start:stop]
+        per_race.append({**_fractions_by_pool(b, fractions), "total": float(fractions.sum())})
+        start = stop
+    return {
+        "races": per_race,
+        "total": float(solved["fractions"].sum()),
+        "growth": solved["growth"],
+        "exact": exact,
+        "iterations": solved["iterations"],
+        "cap_binding": solved["cap_binding"]
+    }
@@ -1,21 +1,151 @@
 """
 ML Odds parsing and normalization for ticket-only predictions.
 Handles fractional, decimal, moneyline, and integer odds formats.
+
+This is the single odds parser of the API (apps/api/odds.py, scoring and
+the research stub all route through it). Common morning-line strings are
+resolved from a prebuilt table of shared records, anything else goes
+through a memoized parser, and parse_odds_column converts a whole column
+of raw strings to a float64 array in one call.
 """
+import math
 import re
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Iterable
+
+import numpy as np
+
+
+# Odds strings that mean the horse is out of the race
+SCRATCH_TOKENS = ("", "—", "SCR", "SCRATCHED", "WD", "WITHDRAWN")
+
+# Program numbers: "1", "1A", "1X", "01B" (entries share the numeric part)
+PROGRAM_PATTERN = re.compile(r'^0*(\d+)\s*([A-Z]?)$')
+
+# Odds grammars (matched against the stripped, upper-cased string)
+EVEN_TOKENS = ("EVEN", "EVN", "EVS")
+FRACTION_PATTERN = re.compile(r'^(\d+)(?:[\s/\-:–—]+|\s*TO\s*)(\d+)$')  # 7/2, 7-2, 7:2, 7 2, 7–2, 7 TO 2
+MONEYLINE_PATTERN = re.compile(r'^[+\-]\d+$')                                     # +350, -200
+DECIMAL_PATTERN = re.compile(r'^(?:\d+\.\d*|\.\d+)$')                              # 3.50, 4.
+
+# Morning-line ladder (US tote fractions plus common UK prices); whole
+# numbers up to 99/1 are added when the table is built
+COMMON_FRACTIONS = (
+    (1, 9), (1, 5), (1, 4), (2, 7), (1, 3), (2, 5), (4, 9), (1, 2), (4, 7), (8, 13), (3, 5),
+    (4, 6), (8, 11), (4, 5), (5, 6), (10, 11), (11, 10), (6, 5), (5, 4), (11, 8), (7, 5),
+    (3, 2), (8, 5), (13, 8), (7, 4), (9, 5), (15, 8), (9, 4), (5, 2), (11, 4), (10, 3),
+    (7, 2), (9, 2), (11, 2), (13, 2), (15, 2), (17, 2), (19, 2)
+)
+MAX_COMMON_WHOLE = 99
+
+# Memoized fallback size (distinct uncommon strings kept)
+PARSE_CACHE_SIZE = 4096
 
 
-@dataclass
 class Odds:
-    """Parsed and normalized odds representation."""
-    kind: str  # "fractional", "decimal", "moneyline", "even"
-    raw: str
-    frac_num: Optional[int]
-    frac_den: Optional[int]
-    decimal: float
-    implied_win: float  # 1/decimal
+    """
+    Parsed and normalized odds representation.
+
+    Records are shared between callers (interned), so they are read-only;
+    `raw` is the normalized string the record was parsed from.
+    """
+    __slots__ = ("kind", "raw", "frac_num", "frac_den", "decimal", "implied_win")
+
+    def __init__(
+        self,
+        kind: str,  # "fractional", "decimal", "moneyline", "even"
+        raw: str,
+        frac_num: Optional[int],
+        frac_den: Optional[int],
+        decimal: float,
+        implied_win: float  # 1/decimal
+    ):
+        for name, value in zip(self.__slots__, (kind, raw, frac_num, frac_den, decimal, implied_win)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Odds records are read-only")
+
+    def _key(self):
+        return (self.kind, self.raw, self.frac_num, self.frac_den, self.decimal, self.implied_win)
+
+    def __eq__(self, other):
+        return isinstance(other, Odds) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return (f"Odds(kind={self.kind!r}, raw={self.raw!r}, frac_num={self.frac_num!r}, "
+                f"frac_den={self.frac_den!r}, decimal={self.decimal!r}, implied_win={self.implied_win!r})")
+
+
+def _fraction(s: str, num: int, den: int, kind: str = "fractional") -> Optional[Odds]:
+    if den == 0:
+        return None
+    decimal = (num / den) + 1.0  # profit/stake + 1
+    return Odds(kind=kind, raw=s, frac_num=num, frac_den=den, decimal=decimal, implied_win=1.0 / decimal)
+
+
+def _build_common() -> Dict[str, Odds]:
+    table: Dict[str, Odds] = {}
+    even = _fraction("EVEN", 1, 1, kind="even")
+    for token in EVEN_TOKENS + ("1-1", "1/1"):
+        table[token] = even
+    pairs = list(COMMON_FRACTIONS) + [(n, 1) for n in range(2, MAX_COMMON_WHOLE + 1)]
+    for num, den in pairs:
+        record = _fraction(f"{num}/{den}", num, den)
+        for sep in ("/", "-"):
+            table[f"{num}{sep}{den}"] = record
+        if den == 1:
+            table[str(num)] = record  # "15" means 15/1
+    table["1"] = even
+    return table
+
+
+# Prebuilt records for the common strings (a dict hit, no parsing)
+COMMON_ODDS: Dict[str, Odds] = _build_common()
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_normalized(s: str) -> Optional[Odds]:
+    """Parse a stripped, upper-cased odds string missing from COMMON_ODDS."""
+    if s in SCRATCH_TOKENS:
+        return None
+    if s in EVEN_TOKENS:
+        return COMMON_ODDS["EVEN"]
+
+    m = FRACTION_PATTERN.match(s)
+    if m:
+        num, den = int(m.group(1)), int(m.group(2))
+        if num == den:
+            return COMMON_ODDS["EVEN"]
+        return _fraction(s, num, den)
+
+    # Integer shorthand: "15" means 15/1
+    if s.isdigit():
+        num = int(s)
+        return _fraction(s, num, 1) if num > 0 else None
+
+    # Moneyline: "+350", "-200"
+    if MONEYLINE_PATTERN.match(s):
+        ml = int(s)
+        if ml == 0:
+            return None
+        # Positive: profit on $100 bet; negative: need to bet |ml| to win $100
+        decimal = (ml / 100.0) + 1.0 if ml > 0 else (100.0 / -ml) + 1.0
+        return Odds(kind="moneyline", raw=s, frac_num=None, frac_den=None, decimal=decimal,
+                    implied_win=1.0 / decimal)
+
+    # Decimal: "3.50", "4.5"
+    if DECIMAL_PATTERN.match(s):
+        dec = float(s)
+        if dec > 1.0:
+            return Odds(kind="decimal", raw=s, frac_num=None, frac_den=None, decimal=dec,
+                        implied_win=1.0 / dec)
+
+    # Could not parse
+    return None
 
 
 def parse_odds(raw: str) -> Optional[Odds]:
@@ -23,13 +153,16 @@ def parse_odds(raw: str) -> Optional[Odds]:
     Parse ML odds from various formats.
     
     Formats supported:
-    - Fractional: "7/2", "5-2", "7-2", "6/1"
+    - Fractional: "7/2", "5-2", "7-2", "6/1", "7:2", "7 TO 2"
     - Integer: "15" (means 15/1)
     - Decimal: "3.50", "4.5"
     - Moneyline: "+350", "-200"
     - Even: "EVEN", "1-1", "1/1"
     - Scratch/Missing: "SCR", "—", "", None
     
+    The returned record is shared with every other caller that parsed the
+    same string; do not modify it.
+    
     Examples:
     >>> parse_odds("7/2").decimal
     4.5
@@ -46,95 +179,49 @@ def parse_odds(raw: str) -> Optional[Odds]:
     """
     if not raw:
         return None
-    
     s = str(raw).strip().upper()
-    
-    # Scratched/missing
-    if s in ("", "—", "SCR", "SCRATCHED", "WD", "WITHDRAWN"):
-        return None
-    
-    # Even money
-    if s in ("EVEN", "EVN", "1-1", "1/1"):
-        return Odds(
-            kind="even",
-            raw=raw,
-            frac_num=1,
-            frac_den=1,
-            decimal=2.0,
-            implied_win=0.5
-        )
-    
-    # Fractional: "7/2", "7-2", "7 2"
-    frac_pattern = re.compile(r'^(\d+)[\s/\-:]+(\d+)$')
-    m = frac_pattern.match(s)
-    if m:
-        num, den = int(m.group(1)), int(m.group(2))
-        if den == 0:
-            return None
-        decimal = (num / den) + 1.0  # profit/stake + 1
-        return Odds(
-            kind="fractional",
-            raw=raw,
-            frac_num=num,
-            frac_den=den,
-            decimal=decimal,
-            implied_win=1.0 / decimal
-        )
-    
-    # Decimal: "3.50", "4.5"
+    record = COMMON_ODDS.get(s)
+    return record if record is not None else _parse_normalized(s)
+
+
+def _plain_decimal(s: str) -> float:
     try:
-        dec = float(s)
-        if dec >= 1.0:
-            return Odds(
-                kind="decimal",
-                raw=raw,
-                frac_num=None,
-                frac_den=None,
-                decimal=dec,
-                implied_win=1.0 / dec
-            )
+        value = float(s)
     except ValueError:
-        pass
+        return math.nan
+    return value if value > 1.0 else math.nan
+
+
+def parse_odds_column(raws: Iterable[Optional[str]], decimal: bool = False) -> np.ndarray:
+    """
+    Convert a column of raw odds strings to decimal odds in one pass.
     
-    # Moneyline: "+350", "-200"
-    if s.startswith(('+', '-')):
-        try:
-            ml = int(s)
-            if ml > 0:
-                # Positive: profit on $100 bet
-                decimal = (ml / 100.0) + 1.0
-            else:
-                # Negative: need to bet |ml| to win $100
-                decimal = (100.0 / abs(ml)) + 1.0
-            return Odds(
-                kind="moneyline",
-                raw=raw,
-                frac_num=None,
-                frac_den=None,
-                decimal=decimal,
-                implied_win=1.0 / decimal
-            )
-        except ValueError:
-            pass
+    Each distinct string is parsed once per call; repeated prices (most of
+    a morning-line column) cost a dict lookup.
     
-    # Integer shorthand: "15" means 15/1
-    try:
-        num = int(s)
-        if num > 0:
-            decimal = num + 1.0
-            return Odds(
-                kind="fractional",
-                raw=raw,
-                frac_num=num,
-                frac_den=1,
-                decimal=decimal,
-                implied_win=1.0 / decimal
-            )
-    except ValueError:
-        pass
+    Args:
+        raws: Raw odds strings (None allowed)
+        decimal: Values are decimal odds already ("6" means 6.0, not 6/1)
     
-    # Could not parse
-    return None
+    Returns:
+        float64 array of decimal odds, NaN where missing, scratched or unparsable
+    """
+    seen: Dict[Any, float] = {}
+
+    def convert(raw) -> float:
+        value = seen.get(raw)
+        if value is None:
+            if not raw:
+                value = math.nan
+            elif decimal:
+                value = _plain_decimal(str(raw).strip())
+            else:
+                parsed = parse_odds(raw)
+                value = parsed.decimal if parsed else math.nan
+            seen[raw] = value
+        return value
+
+    return np.fromiter((convert(raw) for raw in raws), dtype=np.float64)
 
 
 def field_size_adjust(win_probs: list[float], n_horses: int, alpha: float = 0.6) -> list[float]:
@@ -169,23 +256,154 @@ def field_size_adjust(win_probs: list[float], n_horses: int, alpha: float = 0.6)
     return [p / total for p in smoothed]
 
 
-def detect_coupled_entries(horses: list[Dict[str, Any]]) -> Dict[str, Any]:
+def is_scratch(raw: Optional[str]) -> bool:
+    """True for explicit scratch markers ("SCR", "WD", ...), not for blank odds."""
+    if raw is None:
+        return False
+    s = str(raw).strip().upper()
+    return s != "" and s in SCRATCH_TOKENS
+
+
+def program_base(program: Optional[str]) -> Optional[str]:
+    """
+    Betting-interest number of a program number.
+    
+    Examples:
+    >>> program_base("1A")
+    '1'
+    >>> program_base("01x")
+    '1'
+    >>> program_base("")
+    None
+    """
+    if not program:
+        return None
+    m = PROGRAM_PATTERN.match(str(program).strip().upper())
+    return m.group(1) if m else None
+
+
+def combine_entry_odds(decimals: List[Optional[float]]) -> Optional[float]:
+    """
+    Decimal odds of a coupled entry from its members' odds.
+    
+    Entries normally carry one price on the program; if the members were
+    quoted separately, the entry's implied probability is their sum.
+    
+    Args:
+        decimals: Members' decimal odds (None for unknown)
+    
+    Returns:
+        Entry decimal odds, or None if no member has odds
+    """
+    known = [d for d in decimals if d is not None and d > 1.0]
+    if not known:
+        return None
+    if max(known) - min(known) <= 1e-9:
+        return known[0]
+    return max(1.0 / sum(1.0 / d for d in known), 1.0 + 1e-6)
+
+
+def _norm_connection(value: Optional[str]) -> str:
+    return re.sub(r'[^a-z0-9]+', ' ', str(value or '').lower()).strip()
+
+
+def detect_coupled_entries(
+    horses: list[Dict[str, Any]],
+    couple_by_trainer: bool = False
+) -> Dict[str, Any]:
     """
-    Detect coupled entries (1A/1B or duplicate names).
+    Detect coupled entries and build the horse → betting-interest index.
+    
+    Horses are coupled when they share a program number base (1/1A/1X)
+    or an owner; trainer coupling is optional because most jurisdictions
+    no longer require it. Horses with "scratched": True belong to no
+    interest. A row repeating an earlier live row's name is a duplicate
+    of that row (e.g. a horse read twice off the program), not a second
+    horse: it belongs to no interest and is reported in "duplicates".
+    
+    Args:
+        horses: Horse dicts (name, program, owner, trainer, ml_decimal, scratched)
+        couple_by_trainer: Also couple horses with the same trainer
     
     Returns:
         {
           "has_coupled": bool,
           "entries": [{entry_id, horse_indices, combined_odds}],
-          "index_to_entry": {horse_idx: entry_id}
+          "index_to_entry": {horse_idx: entry_id},
+          "interest_of": [interest index or None per horse],
+          "interests": [[horse indices] per interest, in program order],
+          "duplicates": {duplicate horse_idx: horse_idx of the row it repeats}
         }
     """
-    # For ticket-only mode, we'll keep this simple for now
-    # Advanced: detect "1A", "1B" patterns or exact name duplicates
-    # For MVP, return no coupling
+    n = len(horses)
+    parent = list(range(n))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    first_with_key: Dict[tuple, int] = {}
+    first_with_name: Dict[str, int] = {}
+    duplicates: Dict[int, int] = {}
+    for i, h in enumerate(horses):
+        if h.get("scratched"):
+            continue
+        name = _norm_connection(h.get("name"))
+        if name and name in first_with_name:
+            duplicates[i] = first_with_name[name]
+            continue
+        if name:
+            first_with_name[name] = i
+        keys = [
+            ("program", program_base(h.get("program"))),
+            ("owner", _norm_connection(h.get("owner"))),
+        ]
+        if couple_by_trainer:
+            keys.append(("trainer", _norm_connection(h.get("trainer"))))
+        for key in keys:
+            if not key[1]:
+                continue
+            if key in first_with_key:
+                parent[find(i)] = find(first_with_key[key])
+            else:
+                first_with_key[key] = i
+    
+    # Interests in order of their first live horse
+    interests: List[List[int]] = []
+    root_to_interest: Dict[int, int] = {}
+    interest_of: List[Optional[int]] = [None] * n
+    for i, h in enumerate(horses):
+        if h.get("scratched") or i in duplicates:
+            continue
+        root = find(i)
+        if root not in root_to_interest:
+            root_to_interest[root] = len(interests)
+            interests.append([])
+        interest_of[i] = root_to_interest[root]
+        interests[interest_of[i]].append(i)
+    
+    entries = []
+    index_to_entry = {}
+    for members in interests:
+        if len(members) < 2:
+            continue
+        lead = horses[members[0]]
+        entry_id = program_base(lead.get("program")) or f"E{len(entries) + 1}"
+        entries.append({
+            "entry_id": entry_id,
+            "horse_indices": members,
+            "combined_odds": combine_entry_odds([horses[i].get("ml_decimal") for i in members])
+        })
+        for i in members:
+            index_to_entry[i] = entry_id
+    
     return {
-        "has_coupled": False,
-        "entries": [],
-        "index_to_entry": {}
+        "has_coupled": bool(entries),
+        "entries": entries,
+        "index_to_entry": index_to_entry,
+        "interest_of": interest_of,
+        "interests": interests,
+        "duplicates": duplicates
     }
-
@@ -0,0 +1,403 @@
+"""
+Henery (normal) and Stern (gamma) ordering models for place/show probabilities.
+
+Both models treat each horse's performance as an independent random
+variable with a horse-specific location (Henery) or rate (Stern). Turning a
+win-probability vector into place/show probabilities requires order-statistic
+integrals, which are precomputed offline into a compact lookup table:
+
+    table[model, n, :, g] = (log P(win), P(top 2)/P(win), P(top 3)/P(win))
+
+for a horse of strength grid[g] racing n-1 average rivals. At request time
+each horse's place/show ratio is interpolated from its own win probability,
+then the field is renormalized so place mass sums to 2 and show mass to 3.
+
+The average-rival approximation only holds for fairly even fields. Short
+fields and fields with a dominant favourite are evaluated exactly instead:
+each horse's strength is solved so the model reproduces its win probability,
+and the top-2/top-3 integrals are taken over the actual rivals.
+
+Build the table with:
+    python -m apps.api.predict.ordering --out data/ordering_tables_v1.npy
+"""
+import logging
+import math
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+ORDERING_MODELS = ("henery", "stern")
+
+# Largest field size with its own table row (bigger fields reuse the last row)
+MAX_FIELD = 24
+
+# Strength grid points per (model, field size)
+GRID_POINTS = 400
+
+# Stern gamma shape r (r = 1 reduces to Harville)
+STERN_SHAPE = 4
+
+# Table location (override with FINISHLINE_ORDERING_TABLES)
+DEFAULT_TABLE_PATH = Path(__file__).resolve().parents[3] / "data" / "ordering_tables_v1.npy"
+
+# Floor for log(p) on input probabilities
+_MIN_P = 1e-12
+
+# The table is used only for fields of at least TABLE_MIN_FIELD runners whose
+# favourite has at most TABLE_MAX_DISPERSION times the average share (max p · n);
+# within that range it is accurate to ~0.005, outside it errors reach 0.1+
+TABLE_MIN_FIELD = 7
+TABLE_MAX_DISPERSION = 1.75
+
+# Exact evaluation: integration grid, strength-solver step and tolerance (on log p)
+_EXACT_GRID_POINTS = 2001
+_SOLVER_STEP = {"henery": 0.5, "stern": 0.3}
+_SOLVER_TOL = 1e-5
+_SOLVER_MAX_ITER = 200
+
+
+# ---- Offline table construction ----
+
+def _rank_weights(rival_beats: np.ndarray, m: int) -> np.ndarray:
+    """
+    P(at most k-1 of m iid rivals beat the horse), k = 1, 2, 3.
+
+    Args:
+        rival_beats: Per-grid-point probability that one rival beats the horse
+        m: Number of rivals
+
+    Returns:
+        (3, len(rival_beats)) array
+    """
+    b = np.clip(rival_beats, 0.0, 1.0)
+    out = np.zeros((3, b.shape[0]))
+    cumulative = np.zeros(b.shape[0])
+    for c in range(3):
+        if c <= m:
+            cumulative = cumulative + math.comb(m, c) * b ** c * (1.0 - b) ** (m - c)
+        out[c] = cumulative
+    return out
+
+
+def _normal_cdf(x: np.ndarray) -> np.ndarray:
+    erf = np.frompyfunc(math.erf, 1, 1)
+    return 0.5 * (1.0 + erf(x / math.sqrt(2.0)).astype(np.float64))
+
+
+def _gamma_cdf_integer_shape(t: np.ndarray, r: int) -> np.ndarray:
+    """Regularized lower incomplete gamma P(r, t) for integer r."""
+    # Series e^{-t} Σ_{k>=r} t^k / k! for small t (avoids 1 - (1 - tiny))
+    series = np.zeros_like(t)
+    term = np.exp(-t) * t ** r / math.factorial(r)
+    for k in range(r, r + 40):
+        series += term
+        term = term * t / (k + 1)
+    # Closed form 1 - e^{-t} Σ_{k<r} t^k / k! elsewhere
+    head = np.zeros_like(t)
+    term = np.exp(-t)
+    for k in range(r):
+        head += term
+        term = term * t / (k + 1)
+    return np.clip(np.where(t < 1.0, series, 1.0 - head), 0.0, 1.0)
+
+
+def _henery_rows(n: int) -> np.ndarray:
+    """Henery model: X_i = θ_i + Z_i, highest X wins; rivals at θ = 0."""
+    x = np.linspace(-14.0, 14.0, 8001)
+    dx = x[1] - x[0]
+    theta = np.linspace(-7.0, 7.0, GRID_POINTS)
+
+    weights = _rank_weights(1.0 - _normal_cdf(x), n - 1)
+    density = np.exp(-0.5 * (x[None, :] - theta[:, None]) ** 2) / math.sqrt(2.0 * math.pi)
+    return density @ weights.T * dx  # (G, 3)
+
+
+def _stern_rows(n: int, r: int = STERN_SHAPE) -> np.ndarray:
+    """Stern model: T_i ~ Gamma(r, rate λ_i), lowest T wins; rivals at λ = 1."""
+    u = np.linspace(-18.0, 5.0, 8001)
+    du = u[1] - u[0]
+    t = np.exp(u)
+    log_rate = np.linspace(-4.0, 6.0, GRID_POINTS)
+
+    weights = _rank_weights(_gamma_cdf_integer_shape(t, r), n - 1)
+    # Density in u = log t: λ^r t^r e^{-λ t} / Γ(r)
+    lam = np.exp(log_rate)[:, None]
+    log_density = r * np.log(lam) + r * u[None, :] - lam * t[None, :] - math.lgamma(r)
+    return np.exp(log_density) @ weights.T * du  # (G, 3)
+
+
+def build_ordering_tables() -> np.ndarray:
+    """
+    Integrate place/show ratios for every model and field size.
+
+    Returns:
+        (len(ORDERING_MODELS), MAX_FIELD + 1, 3, GRID_POINTS) float64 array
+        (rows for n < 2 are unused and left at zero)
+    """
+    table = np.zeros((len(ORDERING_MODELS), MAX_FIELD + 1, 3, GRID_POINTS))
+    builders = {"henery": _henery_rows, "stern": _stern_rows}
+
+    for mi, model in enumerate(ORDERING_MODELS):
+        for n in range(2, MAX_FIELD + 1):
+            probs = builders[model](n)
+            p_win = np.clip(probs[:, 0], 1e-300, 1.0)
+
+            # Strictly increasing x-axis for np.interp
+            log_win = np.maximum.accumulate(np.log(p_win))
+            log_win = log_win + np.arange(GRID_POINTS) * 1e-12
+
+            table[mi, n, 0] = log_win
+            table[mi, n, 1] = np.clip(probs[:, 1], 0.0, 1.0) / p_win
+            table[mi, n, 2] = np.clip(probs[:, 2], 0.0, 1.0) / p_win
+
+    return table
+
+
+# ---- Exact evaluation for fields outside the table's range ----
+
+@lru_cache(maxsize=1)
+def _cdf_lookups():
+    """Fine lookup grids for the normal survival and gamma CDF (built once)."""
+    z = np.linspace(-40.0, 40.0, 16001)
+    log_t = np.linspace(-14.0, 4.0, 18001)
+    return z, 1.0 - _normal_cdf(z), log_t, _gamma_cdf_integer_shape(np.exp(log_t), STERN_SHAPE)
+
+
+def _field_densities(strength: np.ndarray, model: str):
+    """
+    Per-horse performance density and P(horse beats a performance x) on a shared grid.
+
+    Strength is θ (Henery location) or log λ (Stern log rate).
+
+    Returns:
+        (density (n, G), beats (n, G), grid step)
+    """
+    z_grid, normal_surv, log_t_grid, gamma_cdf = _cdf_lookups()
+
+    if model == "henery":
+        x = np.linspace(strength.min() - 8.0, strength.max() + 8.0, _EXACT_GRID_POINTS)
+        z = x[None, :] - strength[:, None]
+        density = np.exp(-0.5 * z ** 2) / math.sqrt(2.0 * math.pi)
+        beats = np.interp(z, z_grid, normal_surv)
+    else:
+        # u = log t; density of u is λ^r t^r e^{-λ t} / Γ(r)
+        x = np.linspace(-strength.max() - 8.0, -strength.min() + 3.5, _EXACT_GRID_POINTS)
+        log_t = x[None, :] + strength[:, None]
+        density = np.exp(STERN_SHAPE * log_t - np.exp(log_t) - math.lgamma(STERN_SHAPE))
+        beats = np.interp(log_t, log_t_grid, gamma_cdf)
+
+    return density, np.clip(beats, 0.0, 1.0), x[1] - x[0]
+
+
+def _exact_win(strength: np.ndarray, model: str) -> np.ndarray:
+    """P(win) for each horse given strengths (one pass over the field)."""
+    density, beats, dx = _field_densities(strength, model)
+    log_lose = np.log1p(-np.minimum(beats, 1.0 - 1e-16))
+    others = log_lose.sum(axis=0)[None, :] - log_lose
+    return (density * np.exp(others)).sum(axis=1) * dx
+
+
+def _exact_top3(strength: np.ndarray, model: str) -> np.ndarray:
+    """
+    P(top 1), P(top 2), P(top 3) for each horse given strengths.
+
+    Returns:
+        (3, n) array
+    """
+    density, beats, dx = _field_densities(strength, model)
+    n = density.shape[0]
+
+    # Distribution of the number of rivals beating each horse, truncated at 2
+    count = np.zeros((3,) + beats.shape)
+    count[0] = 1.0
+    for j in range(n):
+        b = beats[j]
+        rivals = (np.arange(n) != j)[:, None]
+        shifted = np.stack([
+            count[0] * (1.0 - b),
+            count[1] * (1.0 - b) + count[0] * b,
+            count[2] * (1.0 - b) + count[1] * b,
+        ])
+        count = np.where(rivals[None], shifted, count)
+
+    return (density[None] * np.cumsum(count, axis=0)).sum(axis=-1) * dx
+
+
+def _solve_strengths(p: np.ndarray, model: str) -> np.ndarray:
+    """Strengths whose model win probabilities reproduce p (damped fixed point on log p)."""
+    log_p = np.log(p)
+    strength = log_p - log_p.mean()
+    step = _SOLVER_STEP[model]
+
+    for _ in range(_SOLVER_MAX_ITER):
+        err = log_p - np.log(np.maximum(_exact_win(strength, model), 1e-300))
+        if np.abs(err).max() < _SOLVER_TOL:
+            break
+        strength = strength + step * err
+        strength -= strength.mean()
+
+    return strength
+
+
+def exact_ordering_arrays(p_win, model: str = "stern"):
+    """
+    Place/show probabilities by direct integration of the Henery/Stern model.
+
+    Exact for any field shape but ~10-50 ms per race, so ordering_arrays only
+    uses it where the lookup table is inaccurate. Horses with p = 0 are
+    non-runners for the integration and get zero place/show.
+
+    Args:
+        p_win: Win probabilities (should sum to ~1.0)
+        model: "henery" or "stern"
+
+    Returns:
+        (p_win, p_place, p_show) float64 arrays
+    """
+    if model not in ORDERING_MODELS:
+        raise ValueError(f"Unknown ordering model: {model!r}")
+
+    p = np.asarray(p_win, dtype=np.float64)
+    live = p > 0
+    total = p.sum()
+    top2 = p.copy()
+    top3 = p.copy()
+
+    if live.sum() >= 2:
+        q = p[live] / total
+        probs = _exact_top3(_solve_strengths(q, model), model)
+        top2[live] = probs[1] * total
+        top3[live] = probs[2] * total
+
+    n = int(live.sum())
+    p_place = _renormalize(p, np.minimum(top2, 1.0), min(2.0, n) * total)
+    p_show = _renormalize(p_place, np.minimum(top3, 1.0), min(3.0, n) * total)
+    return p, p_place, p_show
+
+
+def in_table_range(p_win) -> bool:
+    """True if the field is even enough for the average-rival lookup table."""
+    p = np.asarray(p_win, dtype=np.float64)
+    n = p.shape[0]
+    total = p.sum()
+    return n >= TABLE_MIN_FIELD and total > 0 and p.max() / total * n <= TABLE_MAX_DISPERSION
+
+
+# ---- Request-time evaluation ----
+
+@lru_cache(maxsize=1)
+def load_ordering_tables(path: Optional[str] = None) -> Optional[np.ndarray]:
+    """
+    Memory-map the precomputed table (once per process).
+
+    Args:
+        path: Table file (default FINISHLINE_ORDERING_TABLES or DEFAULT_TABLE_PATH)
+
+    Returns:
+        Read-only table array, or None if the file is missing/invalid
+    """
+    path = path or os.getenv("FINISHLINE_ORDERING_TABLES") or str(DEFAULT_TABLE_PATH)
+    try:
+        table = np.load(path, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        log.warning(f"Ordering tables unavailable at {path}: {e}")
+        return None
+
+    expected = (len(ORDERING_MODELS), MAX_FIELD + 1, 3, GRID_POINTS)
+    if table.shape != expected:
+        log.warning(f"Ordering tables at {path} have shape {table.shape}, expected {expected}")
+        return None
+    return table
+
+
+def _renormalize(base: np.ndarray, upper: np.ndarray, target: float) -> np.ndarray:
+    """Scale (upper - base) so that Σ upper = target, keeping upper >= base."""
+    extra = np.maximum(upper - base, 0.0)
+    total = extra.sum()
+    missing = target - base.sum()
+    if total <= 0 or missing <= 0:
+        return np.clip(base, 0.0, 1.0)
+    return np.clip(base + extra * (missing / total), 0.0, 1.0)
+
+
+def ordering_arrays(p_win, model: str = "stern", table: Optional[np.ndarray] = None):
+    """
+    Place/show probabilities under the Henery or Stern model.
+
+    Even fields are read from the lookup table; short or lopsided fields
+    (see in_table_range) are integrated exactly.
+
+    Args:
+        p_win: Win probabilities (n >= 2, should sum to ~1.0)
+        model: "henery" or "stern"
+        table: Preloaded table (default: load_ordering_tables())
+
+    Returns:
+        (p_win, p_place, p_show) float64 arrays, or None if tables are unavailable
+    """
+    if model not in ORDERING_MODELS:
+        raise ValueError(f"Unknown ordering model: {model!r}")
+
+    if table is None:
+        table = load_ordering_tables()
+    if table is None:
+        return None
+
+    p = np.asarray(p_win, dtype=np.float64)
+    if not in_table_range(p):
+        return exact_ordering_arrays(p, model=model)
+
+    n = p.shape[0]
+    rows = table[ORDERING_MODELS.index(model), min(n, MAX_FIELD)]
+
+    log_p = np.log(np.maximum(p, _MIN_P))
+    ratio_place = np.interp(log_p, rows[0], rows[1])
+    ratio_show = np.interp(log_p, rows[0], rows[2])
+
+    p_place = _renormalize(p, np.minimum(p * ratio_place, 1.0), min(2.0, n) * p.sum())
+    p_show = _renormalize(p_place, np.minimum(p * ratio_show, 1.0), min(3.0, n) * p.sum())
+
+    return p, p_place, p_show
+
+
+def ordering_place_show(p_win: List[float], model: str = "stern") -> Optional[List[Dict[str, float]]]:
+    """
+    Same output contract as harville_place_show, under the Henery/Stern model.
+
+    Args:
+        p_win: List of win probabilities
+        model: "henery" or "stern"
+
+    Returns:
+        List of {p_win, p_place, p_show} dicts, or None if tables are unavailable
+    """
+    n = len(p_win)
+    if n < 2:
+        return [{"p_win": 1.0, "p_place": 1.0, "p_show": 1.0}] if n == 1 else []
+
+    arrays = ordering_arrays(p_win, model=model)
+    if arrays is None:
+        return None
+
+    p, p_place, p_show = arrays
+    return [
+        {"p_win": w, "p_place": pl, "p_show": sh}
+        for w, pl, sh in zip(p.tolist(), p_place.tolist(), p_show.tolist())
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build Henery/Stern ordering lookup tables")
+    parser.add_argument("--out", default=str(DEFAULT_TABLE_PATH))
+    args = parser.parse_args()
+
+    np.save(args.out, build_ordering_tables())
+    print(f"Wrote {args.out}")
@@ -0,0 +1,98 @@
+"""
+Fitted model parameters for the ticket-only pipeline.
+
+The calibration constants (logit intercept/slope), the field-size smoothing
+alpha and the Stern exponent are fitted offline from result history by
+apps.api.predict.fit_calibration and written to a versioned JSON artifact.
+The API reads the artifact once at import; without one it falls back to
+the generic priors below.
+"""
+import json
+import logging
+import math
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+log = logging.getLogger(__name__)
+
+
+# Generic priors (used when no fitted artifact is available)
+DEFAULT_PARAMS = {
+    "calibration_a": 0.04,     # Logit intercept
+    "calibration_b": 0.92,     # Logit slope
+    "field_size_alpha": 0.6,   # Field-size smoothing
+    "stern_exponent": 0.95,    # Stern lower-place exponent
+}
+
+# Version reported for the priors
+DEFAULT_VERSION = "priors"
+
+# Artifact location (override with FINISHLINE_CALIBRATION_PARAMS)
+DEFAULT_PARAMS_PATH = Path(__file__).resolve().parents[3] / "data" / "calibration_params_v1.json"
+
+# Accepted ranges per parameter (an artifact outside them is rejected)
+PARAM_BOUNDS = {
+    "calibration_a": (-5.0, 5.0),
+    "calibration_b": (0.05, 5.0),
+    "field_size_alpha": (0.0, 50.0),
+    "stern_exponent": (0.05, 3.0),
+}
+
+
+def validate_params(params: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Check a parameter dict against PARAM_BOUNDS.
+
+    Args:
+        params: Mapping with every key of DEFAULT_PARAMS
+
+    Returns:
+        {name: float} with exactly the DEFAULT_PARAMS keys
+
+    Raises:
+        ValueError: If a parameter is missing, non-finite or out of range
+    """
+    out = {}
+    for name, (low, high) in PARAM_BOUNDS.items():
+        if name not in params:
+            raise ValueError(f"missing parameter {name}")
+        value = float(params[name])
+        if not math.isfinite(value) or not low <= value <= high:
+            raise ValueError(f"{name}={value} outside [{low}, {high}]")
+        out[name] = value
+    return out
+
+
+def params_from_artifact(artifact: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Version and validated parameters from a parsed artifact.
+
+    Raises:
+        KeyError, TypeError, ValueError: If the artifact is malformed
+    """
+    return {"version": str(artifact["version"]), "params": validate_params(artifact["params"])}
+
+
+@lru_cache(maxsize=1)
+def load_calibration_params(path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Read the fitted parameter artifact (once per process).
+
+    Args:
+        path: Artifact file (default FINISHLINE_CALIBRATION_PARAMS or DEFAULT_PARAMS_PATH)
+
+    Returns:
+        {"version": str, "params": {name: float}}; the priors if the file
+        is missing or invalid
+    """
+    path = path or os.getenv("FINISHLINE_CALIBRATION_PARAMS") or str(DEFAULT_PARAMS_PATH)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return params_from_artifact(json.load(f))
+    except FileNotFoundError:
+        return {"version": DEFAULT_VERSION, "params": dict(DEFAULT_PARAMS)}
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        log.warning(f"Calibration params at {path} unusable, using priors: {e}")
+        return {"version": DEFAULT_VERSION, "params": dict(DEFAULT_PARAMS)}
@@ -0,0 +1,145 @@
+"""
+Pari-mutuel place/show payout estimation (ticket-only safe).
+
+A ticket carries win odds only, so place/show prices are estimated from a
+pool model:
+
+- Public money: each horse's share of the place and show pools is taken
+  equal to its share of the win pool, i.e. the normalized implied
+  probability of its win odds (the Hausch–Ziemba–Rubinstein assumption).
+- Split rules: the net pool (total × (1 - takeout)) first returns every
+  cashing horse's stake, then the profit is split equally between the 2
+  placing (3 showing) horses and shared pro rata by the tickets on each.
+  Payouts are floored to the breakage step and never below the minimum
+  payout ($2.10 per $2).
+
+Expected payouts are taken over every (first, second, third) finish
+combination of the model's Harville distribution.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+from .harville import exacta_matrix, trifecta_tensor
+
+
+# Place/show takeout (typical North American WPS rate)
+DEFAULT_TAKEOUT = 0.17
+
+# Per-$1 payout floor ($2.10 on a $2 ticket) and breakage step (dime per $2)
+MIN_PAYOUT = 1.05
+BREAKAGE = 0.05
+
+# Floor on a horse's pool share (horses without a valid price)
+MIN_SHARE = 1e-6
+
+
+def public_shares(win_odds) -> np.ndarray:
+    """
+    Public's share of the pool per horse from decimal win odds.
+
+    Args:
+        win_odds: Decimal win odds (<= 1 means no price)
+
+    Returns:
+        Shares summing to 1 (floored at MIN_SHARE)
+    """
+    odds = np.asarray(win_odds, dtype=np.float64)
+    implied = np.where(odds > 1.0, 1.0 / np.where(odds > 1.0, odds, 1.0), 0.0)
+    shares = np.maximum(implied, MIN_SHARE)
+    return shares / shares.sum()
+
+
+def split_payout(bet_on_horse, bet_on_cashers, net_pool, n_cashers: int) -> np.ndarray:
+    """
+    Per-$1 payout under the equal-split rule, with breakage and the minimum.
+
+    Args:
+        bet_on_horse: Money on the horse being paid
+        bet_on_cashers: Money on all cashing horses together
+        net_pool: Pool after takeout
+        n_cashers: Number of cashing horses (2 place, 3 show)
+
+    Returns:
+        Decimal payout per $1 (>= MIN_PAYOUT)
+    """
+    profit = np.maximum(net_pool - bet_on_cashers, 0.0) / n_cashers
+    payout = 1.0 + profit / bet_on_horse
+    payout = np.floor(payout / BREAKAGE + 1e-9) * BREAKAGE
+    return np.maximum(payout, MIN_PAYOUT)
+
+
+def place_show_payouts(
+    p_win,
+    win_odds,
+    takeout: float = DEFAULT_TAKEOUT,
+    place_total: Optional[float] = None,
+    show_total: Optional[float] = None,
+    stake: float = 0.0
+) -> Dict[str, np.ndarray]:
+    """
+    Expected place and show payouts for every horse in one race.
+
+    Without pool totals the pools are normalized to 1 and payouts depend on
+    the shares only. With a total, `stake` (same units) is added to the
+    horse being priced, so the estimate includes the bet's own effect on
+    the price.
+
+    Args:
+        p_win: Model win probabilities (already Stern-adjusted if desired)
+        win_odds: Decimal win odds (source of the public's pool shares)
+        takeout: Place/show takeout rate
+        place_total: Place pool total (optional)
+        show_total: Show pool total (optional)
+        stake: Own bet size per horse (used only with a pool total)
+
+    Returns:
+        {
+          place_odds, show_odds: expected decimal payout given the bet cashes
+              (NaN when the field is smaller than the places paid),
+          place_return, show_return: expected return per $1 (P(cash) × payout, NaN likewise),
+          p_place, p_show: model probability of cashing
+        }
+    """
+    p = np.asarray(p_win, dtype=np.float64)
+    n = p.shape[0]
+    shares = public_shares(win_odds)
+    out = {}
+
+    for pool, places, total in (("place", 2, place_total), ("show", 3, show_total)):
+        if n < places:
+            out[f"{pool}_odds"] = np.full(n, np.nan)
+            out[f"{pool}_return"] = np.full(n, np.nan)
+            out[f"p_{pool}"] = np.ones(n)
+            continue
+        own = float(stake) if total else 0.0
+        gross = float(total) if total else 1.0
+        bets = shares * gross
+        net_pool = (gross + own) * (1.0 - takeout)
+
+        if places == 2:
+            # probs[a, b]: a and b are the top two in either order
+            exacta = exacta_matrix(p)
+            probs = exacta + exacta.T
+            cashers = bets[:, None] + bets[None, :] + own
+        else:
+            # probs[a, b, c]: {a, b, c} is the top three in any order
+            t = trifecta_tensor(p)
+            probs = (t + t.transpose(0, 2, 1) + t.transpose(1, 0, 2)
+                     + t.transpose(1, 2, 0) + t.transpose(2, 0, 1) + t.transpose(2, 1, 0))
+            cashers = bets[:, None, None] + bets[None, :, None] + bets[None, None, :] + own
+
+        # Payout to the first-axis horse of each combination (others by symmetry)
+        own_bet = (bets + own).reshape((n,) + (1,) * (places - 1))
+        payout = split_payout(own_bet, cashers, net_pool, places)
+        sum_axes = tuple(range(1, places))
+        # Each unordered set is counted (places - 1)! times over the other axes
+        repeats = 1.0 if places == 2 else 2.0
+        p_cash = probs.sum(axis=sum_axes) / repeats
+        expected = (probs * payout).sum(axis=sum_axes) / repeats
+
+        cashes = p_cash > 0
+        out[f"{pool}_odds"] = np.where(cashes, expected / np.where(cashes, p_cash, 1.0), np.nan)
+        out[f"{pool}_return"] = expected
+        out[f"p_{pool}"] = p_cash
+    return out
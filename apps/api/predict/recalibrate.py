@@ -0,0 +1,152 @@
+"""
+Empirical recalibration from the reliability curve in model_params.json.
+
+Two stages, both precomputed once per artifact version:
+
+    1. Temperature scaling with temp_tau: a race's win distribution is
+       sharpened or flattened as p^(1/τ) (renormalized); a standalone
+       probability as σ(logit(p)/τ)
+    2. Monotone piecewise-linear map through the reliability points (c → p),
+       held flat outside the fitted confidence range (like np.interp)
+
+The reliability curve is fitted on pick confidence (observed hit rate of the
+top pick at a given confidence), so it only applies to the map() pick path.
+A race's win distribution (apply_field) gets the temperature stage alone:
+horses below the fitted range would all map to the same floor, and a single
+scale factor is erased by renormalization anyway.
+
+The curve is stored as knots plus per-segment slope/intercept, so a lookup
+is one vectorized searchsorted and a multiply-add.
+"""
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .calibration import MIN_PROB, MAX_PROB
+
+
+# Temperature floor (same as the JS post-processor)
+MIN_TAU = 0.05
+
+# Row-sum floor for padded races
+_TINY = np.finfo(np.float64).tiny
+
+
+class Recalibrator:
+    """Temperature + monotone piecewise-linear recalibration lookup."""
+
+    __slots__ = ("tau", "knots", "slopes", "intercepts")
+
+    def __init__(self, curve_c: Sequence[float], curve_p: Sequence[float], tau: float = 1.0):
+        """
+        Args:
+            curve_c: Reliability curve inputs (any order, duplicates averaged)
+            curve_p: Observed frequencies at curve_c
+            tau: Temperature (1.0 = none)
+        """
+        self.tau = max(float(tau), MIN_TAU)
+
+        c = np.clip(np.asarray(curve_c, dtype=np.float64), 0.0, 1.0)
+        p = np.clip(np.asarray(curve_p, dtype=np.float64), 0.0, 1.0)
+        xs, inverse = np.unique(c, return_inverse=True)
+        ys = np.bincount(inverse, weights=p, minlength=xs.shape[0]) / np.maximum(np.bincount(inverse), 1)
+        # Pool violators upward so the map never decreases
+        ys = np.maximum.accumulate(ys)
+
+        if xs.shape[0] == 0:
+            # No curve: one identity segment
+            self.knots = xs
+            self.slopes = np.ones(1)
+            self.intercepts = np.zeros(1)
+        else:
+            # Flat below the first and above the last point, linear in between
+            inner = np.diff(ys) / np.diff(xs)
+            self.knots = xs
+            self.slopes = np.concatenate([[0.0], inner, [0.0]])
+            self.intercepts = np.concatenate([[ys[0]], ys[:-1] - inner * xs[:-1], [ys[-1]]])
+        for arr in (self.knots, self.slopes, self.intercepts):
+            arr.flags.writeable = False
+
+    @property
+    def is_identity(self) -> bool:
+        return self.tau == 1.0 and self.knots.shape[0] == 0
+
+    def _segment(self, x: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.knots, x, side="right")
+
+    def curve(self, x) -> np.ndarray:
+        """Piecewise-linear reliability map alone (stage 2)."""
+        x = np.clip(np.asarray(x, dtype=np.float64), 0.0, 1.0)
+        k = self._segment(x)
+        return self.intercepts[k] + self.slopes[k] * x
+
+    def curve_slope(self, x) -> np.ndarray:
+        """d curve / dx (right-hand slope at knots)."""
+        x = np.clip(np.asarray(x, dtype=np.float64), 0.0, 1.0)
+        return self.slopes[self._segment(x)]
+
+    def map(self, p) -> np.ndarray:
+        """
+        Recalibrate pick confidences: temperature, then the reliability curve.
+
+        Args:
+            p: Probabilities in [0, 1], any shape
+
+        Returns:
+            Recalibrated probabilities, same shape
+        """
+        p = np.clip(np.asarray(p, dtype=np.float64), MIN_PROB, 1 - MIN_PROB)
+        if self.tau != 1.0:
+            p = 1.0 / (1.0 + np.exp(-np.log(p / (1 - p)) / self.tau))
+        return self.curve(p)
+
+    def apply_field(self, p_win: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Temperature-scale win probabilities race by race.
+
+        Temperature on the distribution, clamp to [MIN_PROB, MAX_PROB], then
+        renormalize each race to 1. The reliability curve is not applied
+        (it describes pick confidence, see the module docstring).
+
+        Args:
+            p_win: (n,) or (races, n) win probabilities (0 in padding)
+            mask: Optional bool mask of real horses (default p_win > 0)
+
+        Returns:
+            Recalibrated probabilities shaped like p_win (padding stays 0)
+        """
+        p = np.asarray(p_win, dtype=np.float64)
+        live = (p > 0) if mask is None else np.asarray(mask, dtype=bool)
+        q = np.where(live, p, 0.0)
+        if self.tau != 1.0:
+            q = np.where(live, np.power(np.where(live, q, 1.0), 1.0 / self.tau), 0.0)
+            q = q / np.maximum(q.sum(axis=-1, keepdims=True), _TINY)
+        r = np.minimum(np.maximum(q, MIN_PROB), MAX_PROB) * live
+        return r / np.maximum(r.sum(axis=-1, keepdims=True), _TINY)
+
+    def field_jacobian(self, p_win) -> np.ndarray:
+        """
+        ∂apply_field(p)/∂p for one race (1-D, every horse live).
+
+        Returns:
+            (n, n) array J with J[i, k] = ∂y_i/∂p_k
+        """
+        p = np.asarray(p_win, dtype=np.float64)
+        n = p.shape[0]
+        eye = np.eye(n)
+
+        if self.tau != 1.0:
+            g = 1.0 / self.tau
+            q = np.power(p, g)
+            q = q / q.sum()
+            d_q = g * (eye - q[:, None]) * np.where(p > 0, q / np.where(p > 0, p, 1.0), 0.0)[None, :]
+        else:
+            q = p
+            d_q = eye
+
+        free = (q > MIN_PROB) & (q < MAX_PROB)
+        d_r = free.astype(np.float64)
+        r = np.minimum(np.maximum(q, MIN_PROB), MAX_PROB)
+        total = r.sum()
+        d_y = (eye - (r / total)[:, None]) / total
+        return d_y @ (d_r[:, None] * d_q)
@@ -0,0 +1,313 @@
+"""
+Stateful race sessions for live odds updates.
+
+A session keeps one race's intermediate vectors (decimal odds, raw implied
+probabilities and their running total, calibrated p_win, place/show, EV
+and Kelly) per betting interest, so that an odds tick or a scratch only
+re-implies the interests that changed. The overround total is patched in O(k) for k changed horses;
+everything downstream of the overround normalization depends on every
+horse, so it is recomputed as whole-vector NumPy passes (O(n) calibration
+plus the O(n^2) closed-form Harville), which is well under a millisecond
+for real field sizes.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+from .calibration import implied_matrix, calibrate_implied_matrix
+from .odds import combine_entry_odds
+from .harville import harville_arrays, DEFAULT_ALGORITHM
+from .ordering import ordering_arrays, ORDERING_MODELS
+from .ev import expected_value_array, kelly_fraction_array
+
+
+# Updates between full re-sums of the overround total
+RESUM_EVERY = 256
+
+
+class RaceSession:
+    """Cached probability state for one race, kept per betting interest."""
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        decimal_odds: Sequence[Optional[float]],
+        ordering_model: str = "harville",
+        algorithm: str = DEFAULT_ALGORITHM,
+        alpha: Optional[float] = None,
+        interest_of: Optional[Sequence[Optional[int]]] = None,
+        entry_ids: Optional[Dict[int, str]] = None,
+        params: Optional[Dict[str, float]] = None,
+        artifact_version: Optional[str] = None,
+        ci_table=None
+    ):
+        """
+        Args:
+            names: Horse names (index-aligned with decimal_odds)
+            decimal_odds: Starting decimal odds per horse (None for scratched)
+            ordering_model: "harville", "henery" or "stern"
+            algorithm: Harville algorithm for place/show
+            alpha: Field-size smoothing parameter (default from params)
+            interest_of: Betting interest per horse, None if scratched
+                (default: every horse is its own interest)
+            entry_ids: {horse index: entry_id} for coupled horses
+            params: Calibration/Stern parameters the session is pinned to
+                (default the module constants)
+            artifact_version: Version of the artifact snapshot params came from
+            ci_table: Bootstrap CI table (intervals.CITable); Wilson if None
+        """
+        self.session_id = uuid.uuid4().hex[:16]
+        self.names = list(names)
+        self.ordering_model = ordering_model
+        self.algorithm = algorithm
+        self.alpha = alpha
+        self.params = params
+        self.artifact_version = artifact_version
+        self.ci_table = ci_table
+        self.version = 0
+        self.updated_at = time.time()
+        # Held by callers around apply_odds/scratch + snapshot (concurrent ticks)
+        self.lock = threading.Lock()
+
+        n = len(self.names)
+        if interest_of is None:
+            interest_of = list(range(n))
+        self.interest_of = list(interest_of)
+        self.entry_ids = dict(entry_ids or {})
+        self.horse_odds = [None if o is None else float(o) for o in decimal_odds]
+
+        m = max([j for j in self.interest_of if j is not None], default=-1) + 1
+        self.members: List[List[int]] = [[] for _ in range(m)]
+        for i, j in enumerate(self.interest_of):
+            if j is not None:
+                self.members[j].append(i)
+
+        self._mask = np.array([[bool(members) for members in self.members]], dtype=bool).reshape(1, m)
+        self.odds = np.array([[self._interest_odds(j) for j in range(m)]], dtype=np.float64).reshape(1, m)
+        self._raw = implied_matrix(self.odds, self._mask)
+        self._raw_total = self._raw.sum(axis=-1, keepdims=True)
+        self._recompute()
+
+    @property
+    def n_horses(self) -> int:
+        return len(self.names)
+
+    @property
+    def n_live(self) -> int:
+        return int(self._mask.sum())
+
+    def _interest_odds(self, j: int) -> float:
+        """Decimal odds for interest j from its live members."""
+        members = self.members[j]
+        if len(members) == 1:
+            return self.horse_odds[members[0]] or 0.0
+        combined = combine_entry_odds([self.horse_odds[i] for i in members])
+        return combined if combined is not None else 0.0
+
+    def _recompute(self) -> None:
+        """Re-derive everything downstream of the overround total."""
+        self.p_cal, self.ci_low, self.ci_high = calibrate_implied_matrix(
+            self._raw, self._mask, alpha=self.alpha, total=self._raw_total, params=self.params,
+            ci_table=self.ci_table
+        )
+
+        arrays = None
+        live = self._mask[0]
+        if self.ordering_model in ORDERING_MODELS and self.n_live >= 2:
+            compact = ordering_arrays(self.p_cal[0, live], model=self.ordering_model)
+            if compact is not None:
+                arrays = tuple(np.zeros_like(self.p_cal) for _ in range(3))
+                for full, part in zip(arrays, compact):
+                    full[0, live] = part
+        if arrays is None:
+            if self.ordering_model in ORDERING_MODELS and self.n_live >= 2:
+                self.ordering_model = "harville"
+            arrays = harville_arrays(
+                self.p_cal, use_stern=True, algorithm=self.algorithm,
+                stern_exponent=self.params["stern_exponent"] if self.params else None
+            )
+        self.p_win, self.p_place, self.p_show = arrays
+
+        self.ev_win = expected_value_array(self.p_win, self.odds)
+        self.kelly_win = np.round(kelly_fraction_array(self.p_win, self.odds), 4)
+
+    def _patch_interests(self, interests: List[int]) -> None:
+        """O(k) update of raw implied values and the overround total, then recompute."""
+        idx = np.array(sorted(set(interests)), dtype=np.int64)
+        new_odds = np.array([self._interest_odds(j) for j in idx.tolist()], dtype=np.float64)
+        new_raw = implied_matrix(new_odds, self._mask[0, idx])
+
+        # O(k) patch of the overround total instead of a full re-sum
+        # (periodically re-summed so rounding error cannot accumulate)
+        self._raw_total += new_raw.sum() - self._raw[0, idx].sum()
+        self._raw[0, idx] = new_raw
+        self.odds[0, idx] = new_odds
+        if (self.version + 1) % RESUM_EVERY == 0:
+            self._raw_total = self._raw.sum(axis=-1, keepdims=True)
+
+        self._recompute()
+        self.version += 1
+        self.updated_at = time.time()
+
+    def _check_indices(self, indices) -> None:
+        """Raise IndexError unless every index is a horse of this race (checked before any mutation)."""
+        bad = sorted(i for i in indices if not 0 <= i < self.n_horses)
+        if bad:
+            raise IndexError(f"horse indices out of range 0..{self.n_horses - 1}: {bad}")
+
+    def apply_odds(self, changes: Dict[int, float]) -> List[int]:
+        """
+        Apply decimal-odds changes and refresh the cached probabilities.
+
+        Args:
+            changes: {horse index: new decimal odds}
+
+        Returns:
+            Sorted horse indices whose odds actually changed
+
+        Raises:
+            IndexError: If an index is out of range (nothing is applied)
+        """
+        self._check_indices(changes)
+        changed = sorted(
+            i for i, o in changes.items()
+            if self.interest_of[i] is not None and self.horse_odds[i] != o
+        )
+        if not changed:
+            return []
+
+        for i in changed:
+            self.horse_odds[i] = float(changes[i])
+        self._patch_interests([self.interest_of[i] for i in changed])
+        return changed
+
+    def scratch(self, indices: Sequence[int]) -> List[int]:
+        """
+        Scratch horses and renormalize the remaining field.
+
+        A scratched member of a coupled entry leaves the entry running on
+        its remaining horses; a scratched single interest drops out of the
+        mask, so nothing is rebuilt or re-parsed.
+
+        Args:
+            indices: Horse indices to scratch
+
+        Returns:
+            Sorted horse indices that were newly scratched
+
+        Raises:
+            IndexError: If an index is out of range (nothing is scratched)
+        """
+        self._check_indices(indices)
+        scratched = sorted(i for i in set(indices) if self.interest_of[i] is not None)
+        if not scratched:
+            return []
+
+        touched = []
+        for i in scratched:
+            j = self.interest_of[i]
+            self.interest_of[i] = None
+            self.members[j].remove(i)
+            self._mask[0, j] = bool(self.members[j])
+            touched.append(j)
+        self._patch_interests(touched)
+        return scratched
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per-horse probabilities and value metrics, rounded like ticket_predict."""
+        horses = []
+        for i in range(self.n_horses):
+            j = self.interest_of[i]
+            if j is None:
+                horses.append({"index": i, "name": self.names[i], "scratched": True})
+                continue
+            horse = {
+                "index": i,
+                "name": self.names[i],
+                "ml_decimal": float(self.odds[0, j]),
+                "p_win": round(float(self.p_win[0, j]), 4),
+                "p_place": round(float(self.p_place[0, j]), 4),
+                "p_show": round(float(self.p_show[0, j]), 4),
+                "p_win_ci": [round(float(self.ci_low[0, j]), 4), round(float(self.ci_high[0, j]), 4)],
+                "ev_win": float(self.ev_win[0, j]),
+                "kelly_win": float(self.kelly_win[0, j])
+            }
+            if i in self.entry_ids:
+                horse["entry_id"] = self.entry_ids[i]
+            horses.append(horse)
+        return horses
+
+
+class SessionStore:
+    """Thread-safe in-memory session registry with LRU eviction and idle TTL."""
+
+    def __init__(self, max_sessions: int = 1000, ttl_s: float = 3600.0):
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self._sessions: "OrderedDict[str, RaceSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evict_listeners: List[Callable[[str], None]] = []
+        self._update_listeners: List[Callable[[RaceSession, Dict[str, Any]], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def on_evict(self, callback: Callable[[str], None]) -> None:
+        """Call callback(session_id) whenever a session leaves the store (removed, expired or LRU-evicted)."""
+        self._evict_listeners.append(callback)
+
+    def on_update(self, callback: Callable[[RaceSession, Dict[str, Any]], None]) -> None:
+        """Call callback(session, details) for every update reported through updated()."""
+        self._update_listeners.append(callback)
+
+    def updated(self, session: RaceSession, details: Dict[str, Any]) -> None:
+        """Report a change made to a session outside its stream (e.g. a REST odds update)."""
+        for callback in self._update_listeners:
+            callback(session, details)
+
+    def _notify_evicted(self, session_ids: List[str]) -> None:
+        # Outside the lock: listeners may look sessions up again
+        for sid in session_ids:
+            for callback in self._evict_listeners:
+                callback(sid)
+
+    def _evict(self, now: float) -> List[str]:
+        evicted = [sid for sid, s in self._sessions.items() if now - s.updated_at > self.ttl_s]
+        for sid in evicted:
+            del self._sessions[sid]
+        while len(self._sessions) > self.max_sessions:
+            evicted.append(self._sessions.popitem(last=False)[0])
+        return evicted
+
+    def add(self, session: RaceSession) -> RaceSession:
+        with self._lock:
+            self._sessions[session.session_id] = session
+            evicted = self._evict(time.time())
+        self._notify_evicted(evicted)
+        return session
+
+    def get(self, session_id: str) -> Optional[RaceSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            expired = time.time() - session.updated_at > self.ttl_s
+            if expired:
+                del self._sessions[session_id]
+            else:
+                self._sessions.move_to_end(session_id)
+        if expired:
+            self._notify_evicted([session_id])
+            return None
+        return session
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            removed = self._sessions.pop(session_id, None) is not None
+        if removed:
+            self._notify_evicted([session_id])
+        return removed
@@ -0,0 +1,212 @@
+"""
+Monte Carlo finish-order simulation (Plackett–Luce via the Gumbel-max trick).
+Samples whole finishing orders from win probabilities in NumPy batches.
+"""
+from typing import Dict, Any, Optional, Sequence
+
+import numpy as np
+
+
+# Sample budget bounds
+MIN_SAMPLES = 10_000
+MAX_SAMPLES = 1_000_000
+DEFAULT_SAMPLES = 100_000
+
+# Samples drawn per NumPy batch (bounds peak memory at ~CHUNK × n floats)
+CHUNK_SAMPLES = 100_000
+
+# Rough cost of one horse-sample in nanoseconds (single sort vs per-position
+# draws). Used only to size the sample budget from a latency budget.
+NS_PER_HORSE_SAMPLE = 60.0
+NS_PER_HORSE_SAMPLE_STAGED = 180.0
+
+# Positions tracked per sample (superfecta depth)
+MAX_DEPTH = 4
+
+# Plain Harville / Plackett–Luce: every position uses p as-is
+HARVILLE_DISCOUNTS = (1.0, 1.0, 1.0, 1.0)
+
+# Lo–Bacon-Shone discounted Harville: lower positions use p^λ
+LO_DISCOUNTS = (1.0, 0.76, 0.62, 0.62)
+
+# Staged-draw log p for p = 0 runners: below any real horse, yet finite so
+# they stay distinguishable from the -inf of horses already placed
+_ZERO_P_LOG = float(np.log(np.finfo(np.float64).tiny))
+
+
+def sample_budget(latency_budget_ms: float, n_horses: int, staged: bool = False) -> int:
+    """
+    Number of samples that fit in a latency budget.
+
+    Args:
+        latency_budget_ms: Time allowed for the simulation
+        n_horses: Field size
+        staged: True for discounted (per-position) sampling, which costs more
+
+    Returns:
+        Sample count clamped to [MIN_SAMPLES, MAX_SAMPLES]
+    """
+    if latency_budget_ms <= 0 or n_horses <= 0:
+        return MIN_SAMPLES
+
+    cost_ns = NS_PER_HORSE_SAMPLE_STAGED if staged else NS_PER_HORSE_SAMPLE
+    n = int(latency_budget_ms * 1e6 / (cost_ns * n_horses))
+    return max(MIN_SAMPLES, min(MAX_SAMPLES, n))
+
+
+def sample_finish_orders(
+    p_win: Sequence[float],
+    n_samples: int,
+    seed: int = 0,
+    discounts: Sequence[float] = HARVILLE_DISCOUNTS,
+    depth: int = MAX_DEPTH
+) -> np.ndarray:
+    """
+    Draw finishing orders (top `depth` positions) in one vectorized batch.
+
+    With all discounts equal to 1 this is exact Plackett–Luce sampling:
+    sorting log p + Gumbel noise yields the full order in one pass. With
+    per-position discounts, each position is an independent Gumbel-max
+    draw over the horses still running, using λ_s * log p as the key.
+    Horses with p = 0 only fill positions once every live horse is placed.
+
+    Args:
+        p_win: Win probabilities (n >= depth)
+        n_samples: Number of orders to draw
+        seed: RNG seed (same seed, same orders)
+        discounts: Per-position exponents λ_s
+        depth: Positions to keep per sample
+
+    Returns:
+        (n_samples, depth) int array of horse indices
+    """
+    p = np.asarray(p_win, dtype=np.float64)
+    n = p.shape[0]
+    depth = min(depth, n)
+
+    rng = np.random.default_rng(seed)
+    with np.errstate(divide="ignore"):
+        log_p = np.log(p)
+
+    orders = np.empty((n_samples, depth), dtype=np.int64)
+    lambdas = [float(discounts[s]) if s < len(discounts) else float(discounts[-1]) for s in range(depth)]
+
+    for start in range(0, n_samples, CHUNK_SAMPLES):
+        stop = min(start + CHUNK_SAMPLES, n_samples)
+        m = stop - start
+
+        if all(lam == 1.0 for lam in lambdas):
+            keys = log_p[None, :] + rng.gumbel(size=(m, n))
+            if depth < n:
+                top = np.argpartition(-keys, depth - 1, axis=1)[:, :depth]
+            else:
+                top = np.broadcast_to(np.arange(n), (m, n)).copy()
+            top_keys = np.take_along_axis(keys, top, axis=1)
+            order = np.argsort(-top_keys, axis=1)
+            orders[start:stop] = np.take_along_axis(top, order, axis=1)
+        else:
+            staged_log_p = np.maximum(log_p, _ZERO_P_LOG)
+            taken = np.zeros((m, n), dtype=bool)
+            rows = np.arange(m)
+            for s, lam in enumerate(lambdas):
+                keys = lam * staged_log_p[None, :] + rng.gumbel(size=(m, n))
+                keys[taken] = -np.inf
+                pick = np.argmax(keys, axis=1)
+                orders[start:stop, s] = pick
+                taken[rows, pick] = True
+
+    return orders
+
+
+def _top_combos(orders: np.ndarray, n: int, width: int, top_k: int) -> list:
+    """Most frequent ordered combinations of the first `width` positions."""
+    codes = np.zeros(orders.shape[0], dtype=np.int64)
+    for s in range(width):
+        codes = codes * n + orders[:, s]
+
+    uniq, counts = np.unique(codes, return_counts=True)
+    keep = np.argsort(-counts, kind="stable")[:top_k]
+
+    total = orders.shape[0]
+    out = []
+    for idx in keep:
+        code = int(uniq[idx])
+        combo = []
+        for _ in range(width):
+            combo.append(code % n)
+            code //= n
+        freq = counts[idx] / total
+        out.append({
+            "order": combo[::-1],
+            "prob": float(freq),
+            "se": float(np.sqrt(freq * (1.0 - freq) / total))
+        })
+    return out
+
+
+def simulate_race(
+    p_win: Sequence[float],
+    n_samples: Optional[int] = None,
+    latency_budget_ms: Optional[float] = None,
+    seed: int = 0,
+    discounts: Sequence[float] = HARVILLE_DISCOUNTS,
+    top_k: int = 10
+) -> Dict[str, Any]:
+    """
+    Monte Carlo W/P/S and exotic frequencies for one race.
+
+    Args:
+        p_win: Win probabilities (calibrated)
+        n_samples: Explicit sample count (overrides latency_budget_ms)
+        latency_budget_ms: Size the sample count to fit this budget
+        seed: RNG seed for reproducible results
+        discounts: Per-position exponents (HARVILLE_DISCOUNTS, LO_DISCOUNTS, ...)
+        top_k: Exotic combinations to return per pool
+
+    Returns:
+        {
+          n_samples, seed,
+          p_win, p_place, p_show: arrays,
+          se_win, se_place, se_show: arrays (binomial standard errors),
+          exacta, trifecta, superfecta: [{order, prob, se}]
+        }
+    """
+    p = np.asarray(p_win, dtype=np.float64)
+    n = p.shape[0]
+
+    if n_samples is None:
+        if latency_budget_ms:
+            staged = any(float(lam) != 1.0 for lam in discounts)
+            n_samples = sample_budget(latency_budget_ms, n, staged=staged)
+        else:
+            n_samples = DEFAULT_SAMPLES
+    n_samples = max(1, int(n_samples))
+
+    orders = sample_finish_orders(p, n_samples, seed=seed, discounts=discounts)
+    depth = orders.shape[1]
+
+    # Position counts: first, top-2, top-3
+    counts = np.zeros((MAX_DEPTH, n), dtype=np.int64)
+    for s in range(depth):
+        counts[s] = np.bincount(orders[:, s], minlength=n)
+
+    freq_win = counts[0] / n_samples
+    freq_place = counts[:2].sum(axis=0) / n_samples
+    freq_show = counts[:3].sum(axis=0) / n_samples
+
+    def _se(f):
+        return np.sqrt(f * (1.0 - f) / n_samples)
+
+    return {
+        "n_samples": n_samples,
+        "seed": seed,
+        "p_win": freq_win,
+        "p_place": freq_place,
+        "p_show": freq_show,
+        "se_win": _se(freq_win),
+        "se_place": _se(freq_place),
+        "se_show": _se(freq_show),
+        "exacta": _top_combos(orders, n, 2, top_k) if depth >= 2 else [],
+        "trifecta": _top_combos(orders, n, 3, top_k) if depth >= 3 else [],
+        "superfecta": _top_combos(orders, n, 4, top_k) if depth >= 4 else [],
+    }
@@ -4,32 +4,39 @@ Integrates with user-owned research API for horse racing data enrichment
 """
 from __future__ import annotations
 from typing import List, Dict, Any, Optional, Tuple
-import os, time, math
+import os, time, math, asyncio
 import httpx
 
+from .common.singleflight import SingleFlight
+from .common.http_pool import http_clients
+
 _DEF_TIMEOUT_MS = int(os.getenv("FINISHLINE_PROVIDER_TIMEOUT_MS", "4000"))
+_CONCURRENCY = int(os.getenv("FINISHLINE_PROVIDER_CONCURRENCY", "32"))  # in-flight calls per field
+_RESERVE_MS = int(os.getenv("FINISHLINE_PROVIDER_RESERVE_MS", "250"))   # budget left for scoring
+_BATCH = (os.getenv("FINISHLINE_PROVIDER_BATCH", "true").lower() == "true")  # try POST /field first
 _TTL_SECONDS = int(os.getenv("FINISHLINE_PROVIDER_CACHE_SECONDS", "900"))
 _BASE = os.getenv("FINISHLINE_RESEARCH_API_URL", "").rstrip("/")
 _KEY  = os.getenv("FINISHLINE_RESEARCH_API_KEY", "")
 _DBG  = (os.getenv("FINISHLINE_PROVIDER_DEBUG","false").lower() == "true")
 
-_cache: Dict[Tuple[str,str], Tuple[float, Any]] = {}
+# Shared by every request: cached results plus coalescing of identical in-flight calls
+_flight = SingleFlight(ttl_s=_TTL_SECONDS)
+_cache = _flight.cache
+
+# Per-entity endpoints, and the response key of each in a batch (/field) reply
+_ENTITY_GROUPS = (("/horse", "horses"), ("/trainer", "trainers"), ("/jockey", "jockeys"))
+_BATCH_PATH = "/field"
+
+# Research API base URLs that answered /field with 404/405/501, and when: per-entity
+# calls only until _TTL_SECONDS later, then /field is probed again
+_batch_unsupported: Dict[str, float] = {}
 
 def _log(*args):
     if _DBG: print("[CustomProvider]", *args)
 
-def _get_cached(key: Tuple[str,str]):
-    now = time.time()
-    hit = _cache.get(key)
-    if not hit: return None
-    ts, data = hit
-    if now - ts > _TTL_SECONDS: 
-        _cache.pop(key, None)
-        return None
-    return data
-
-def _set_cached(key: Tuple[str,str], data: Any):
-    _cache[key] = (time.time(), data)
+def cache_stats() -> Dict[str,int]:
+    """Hit/miss/coalesced counters of the API call cache."""
+    return _flight.stats()
 
 def _auth_headers() -> Dict[str,str]:
     hdr = {"Accept": "application/json"}
@@ -37,22 +44,46 @@ def _auth_headers() -> Dict[str,str]:
         hdr["Authorization"] = f"Bearer {_KEY}"
     return hdr
 
-async def _get_json(client: httpx.AsyncClient, path: str, params: Dict[str,str]) -> Any:
+def _entity_key(path: str, params: Dict[str,str]) -> Tuple[str,str]:
+    return (f"{_BASE}{path}", str(sorted(params.items())))
+
+def _entity_params(path: str, name: str, *, date: str, track: str) -> Dict[str,str]:
+    if path == "/horse":
+        return {"name": name, "track": track, "date": date}
+    return {"name": name}
+
+def _entity_names(h: Dict[str,Any]) -> Dict[str,str]:
+    """Stripped horse/trainer/jockey name per entity path ("" if missing)."""
+    return {
+        "/horse":   (h.get("name") or "").strip(),
+        "/trainer": (h.get("trainer") or "").strip(),
+        "/jockey":  (h.get("jockey") or "").strip(),
+    }
+
+async def _get_json(client: httpx.AsyncClient, path: str, params: Dict[str,str], timeout_s: Optional[float] = None) -> Any:
     if not _BASE:
         return None
     url = f"{_BASE}{path}"
-    key = (url, str(sorted(params.items())))
-    cached = _get_cached(key)
+    key = _entity_key(path, params)
+    cached = _flight.cached(key)
     if cached is not None:
         return cached
-    try:
-        r = await client.get(url, params=params, headers=_auth_headers(), timeout=_DEF_TIMEOUT_MS/1000)
+    timeout_s = _DEF_TIMEOUT_MS/1000 if timeout_s is None else timeout_s
+    if timeout_s <= 0:
+        _log("SKIP (budget spent)", url, params)
+        return None
+
+    async def _call():
+        # Hard deadline for the whole call (httpx timeouts are per connect/read phase)
+        r = await asyncio.wait_for(client.get(url, params=params, headers=_auth_headers(), timeout=timeout_s), timeout_s)
         if r.status_code == 200:
-            data = r.json()
-            _set_cached(key, data)
-            return data
+            return r.json()
         _log("HTTP", r.status_code, url, params)
         return None
+
+    try:
+        # Concurrent callers for the same (endpoint, params) share one request
+        return await _flight.do(key, _call, timeout_s=timeout_s)
     except Exception as e:
         _log("ERR", url, e)
         return None
@@ -92,41 +123,142 @@ def _map_person_features(h: Dict[str,Any], trainer_json: Optional[Dict[str,Any]]
     jw = _as_float(_pick(jockey_json  or {}, "win_pct","jockey_win_pct","j_win","jWinRate", default=0.12), 0.12)
     return { **h, "trainer_win_pct": tw, "jockey_win_pct": jw }
 
+class _CallBudget:
+    """Concurrency limit and end-to-end deadline shared by one enrichment fan-out."""
+    def __init__(self, budget_ms: Optional[float], concurrency: int):
+        self.sem = asyncio.Semaphore(max(1, concurrency))
+        self.deadline = None if budget_ms is None else time.monotonic() + max(budget_ms - _RESERVE_MS, 0) / 1000
+
+    def timeout_s(self) -> float:
+        """Per-call timeout: the provider default, cut to what is left of the budget."""
+        per_call = _DEF_TIMEOUT_MS / 1000
+        if self.deadline is None:
+            return per_call
+        return min(per_call, self.deadline - time.monotonic())
+
+    async def get(self, client: httpx.AsyncClient, path: str, params: Dict[str,str]) -> Any:
+        async with self.sem:
+            return await _get_json(client, path, params, timeout_s=self.timeout_s())
+
+async def _fetch_field(client: httpx.AsyncClient, horses: List[Dict[str,Any]], *, date: str, track: str,
+                       budget: _CallBudget) -> Optional[Dict[Tuple[str,str], Any]]:
+    """
+    Look up a whole field with one POST /field.
+
+    Entities already cached are not requested again; the reply is
+    demultiplexed per entity and cached like per-entity responses. Names the
+    reply leaves out are absent from the result (the caller falls back to
+    per-entity calls for them).
+
+    Returns:
+        {(path, name): entity json}, or None if batch mode is unavailable
+    """
+    marked = _batch_unsupported.get(_BASE)
+    if marked is not None:
+        if time.time() - marked <= _TTL_SECONDS:
+            return None
+        _batch_unsupported.pop(_BASE, None)
+    found: Dict[Tuple[str,str], Any] = {}
+    wanted: Dict[str,set] = {path: set() for path, _ in _ENTITY_GROUPS}
+    for h in horses:
+        for path, name in _entity_names(h).items():
+            if not name or (path, name) in found:
+                continue
+            cached = _flight.cached(_entity_key(path, _entity_params(path, name, date=date, track=track)))
+            if cached is not None:
+                found[(path, name)] = cached
+            else:
+                wanted[path].add(name)
+    if not any(wanted.values()):
+        return found
+
+    url = f"{_BASE}{_BATCH_PATH}"
+    body = {"track": track, "date": date, **{group: sorted(wanted[path]) for path, group in _ENTITY_GROUPS}}
+    timeout_s = budget.timeout_s()
+    if timeout_s <= 0:
+        return found
+    try:
+        async with budget.sem:
+            r = await asyncio.wait_for(client.post(url, json=body, headers=_auth_headers(), timeout=timeout_s), timeout_s)
+        if r.status_code in (404, 405, 501):
+            _log("batch unsupported", r.status_code, url)
+            _batch_unsupported[_BASE] = time.time()
+            return None
+        if r.status_code != 200:
+            _log("HTTP", r.status_code, url)
+            return None
+        data = r.json()
+    except Exception as e:
+        _log("ERR", url, e)
+        return None
+
+    for path, group in _ENTITY_GROUPS:
+        by_name = data.get(group) if isinstance(data, dict) else None
+        if not isinstance(by_name, dict):
+            continue
+        for name in wanted[path]:
+            value = by_name.get(name)
+            if value is not None:
+                found[(path, name)] = value
+                _flight.put(_entity_key(path, _entity_params(path, name, date=date, track=track)), value)
+    return found
+
 class CustomProvider:
+    def __init__(self, budget_ms: Optional[float] = None, concurrency: Optional[int] = None,
+                 batch: Optional[bool] = None):
+        """
+        Args:
+            budget_ms: End-to-end enrichment budget (per-call deadlines are cut to fit; None = per-call default only)
+            concurrency: Max in-flight API calls per field (default FINISHLINE_PROVIDER_CONCURRENCY)
+            batch: Try one POST /field per race before per-entity calls (default FINISHLINE_PROVIDER_BATCH)
+        """
+        self.budget_ms = budget_ms
+        self.concurrency = concurrency or _CONCURRENCY
+        self.batch = _BATCH if batch is None else batch
+
     async def fetch_race_context(self, *, date: str, track: str, distance: str, surface: str) -> Dict[str,Any]:
         # Optional: /track endpoint
         if not _BASE: 
             return {}
-        async with httpx.AsyncClient() as client:
-            tj = await _get_json(client, "/track", {"name": track, "date": date, "surface": surface, "distance": distance})
+        tj = await _get_json(http_clients.get("research"), "/track", {"name": track, "date": date, "surface": surface, "distance": distance})
         bias = {}
         if tj and isinstance(tj, dict):
             # Try some common fields; tweak as needed
             bias = _pick(tj, "bias", default={}) or {}
         return {"bias": bias, "source":"custom"}
 
-    async def enrich_one(self, client: httpx.AsyncClient, h: Dict[str,Any], *, date: str, track: str) -> Dict[str,Any]:
-        name    = (h.get("name") or "").strip()
-        trainer = (h.get("trainer") or "").strip()
-        jockey  = (h.get("jockey") or "").strip()
+    async def enrich_one(self, client: httpx.AsyncClient, h: Dict[str,Any], *, date: str, track: str,
+                         budget: Optional[_CallBudget] = None,
+                         batch: Optional[Dict[Tuple[str,str], Any]] = None) -> Dict[str,Any]:
+        budget = budget or _CallBudget(self.budget_ms, self.concurrency)
+        batch = batch or {}
+
+        async def _entity(path: str, name: str):
+            if not name:
+                return None
+            if (path, name) in batch:
+                return batch[(path, name)]
+            return await budget.get(client, path, _entity_params(path, name, date=date, track=track))
 
-        hj = await _get_json(client, "/horse",   {"name": name, "track": track, "date": date}) if name else None
-        tj = await _get_json(client, "/trainer", {"name": trainer}) if trainer else None
-        jj = await _get_json(client, "/jockey",  {"name": jockey})  if jockey else None
+        # /horse, /trainer and /jockey are independent: issue them together
+        hj, tj, jj = await asyncio.gather(*(_entity(path, name) for path, name in _entity_names(h).items()))
 
         h2 = _map_horse_features(h, hj or {})
         h3 = _map_person_features(h2, tj, jj)
         return h3
 
-    async def enrich_horses_async(self, horses: List[Dict[str,Any]], *, date: str, track: str) -> List[Dict[str,Any]]:
+    async def enrich_horses_async(self, horses: List[Dict[str,Any]], *, date: str, track: str,
+                                  client: Optional[httpx.AsyncClient] = None) -> List[Dict[str,Any]]:
         if not _BASE:
             # No API configured → pass-through
             return horses
-        async with httpx.AsyncClient() as client:
-            out = []
-            for h in horses:
-                out.append(await self.enrich_one(client, h, date=date, track=track))
-        return out
+        # Whole field at once, bounded by one semaphore and one deadline; gather keeps input order
+        budget = _CallBudget(self.budget_ms, self.concurrency)
+        client = client or http_clients.get("research")
+        batch = await _fetch_field(client, horses, date=date, track=track, budget=budget) if self.batch else None
+        return list(await asyncio.gather(
+            *(self.enrich_one(client, h, date=date, track=track, budget=budget, batch=batch) for h in horses)
+        ))
 
     async def enrich_horses(self, horses: List[Dict[str,Any]], *, date: str, track: str) -> List[Dict[str,Any]]:
         # Async method - called directly from FastAPI endpoint (no asyncio.run needed)
@@ -5,9 +5,13 @@ No database required - pure web research with TTL caching
 """
 from __future__ import annotations
 from typing import List, Dict, Any, Optional, Tuple
-import os, time, re, json
+import os, time, re, json, asyncio
 import httpx
 from bs4 import BeautifulSoup
+from openai import AsyncOpenAI
+
+from .common.singleflight import SingleFlight
+from .common.http_pool import http_clients
 
 _DBG   = (os.getenv("FINISHLINE_PROVIDER_DEBUG","false").lower()=="true")
 _TTL   = int(os.getenv("FINISHLINE_PROVIDER_CACHE_SECONDS","900"))
@@ -15,23 +19,35 @@ _TO_S  = float(int(os.getenv("FINISHLINE_PROVIDER_TIMEOUT_MS","7000"))/1000.0)
 _TAV   = os.getenv("FINISHLINE_TAVILY_API_KEY","").strip()
 _OAI   = os.getenv("FINISHLINE_OPENAI_API_KEY","").strip()
 _OAI_MODEL = os.getenv("FINISHLINE_OPENAI_MODEL","gpt-4o-mini")
+_CONCURRENCY = int(os.getenv("FINISHLINE_WEBSEARCH_CONCURRENCY","8"))  # searches/fetches/extractions in flight per field
+_RESERVE_MS = int(os.getenv("FINISHLINE_PROVIDER_RESERVE_MS","250"))   # budget left for scoring
 
-_cache: Dict[Tuple[str,str], Tuple[float, Any]] = {}
+# Shared by every request: extracted entities plus coalescing of identical in-flight lookups
+_flight = SingleFlight(ttl_s=_TTL)
+_cache = _flight.cache
 
 def _log(*a): 
     if _DBG: print("[websearch]", *a)
 
-def _get_cached(k): 
-    hit = _cache.get(k); 
-    if not hit: return None
-    ts, val = hit
-    if time.time()-ts > _TTL: 
-        _cache.pop(k, None); 
-        return None
-    return val
+def cache_stats() -> Dict[str,int]:
+    """Hit/miss/coalesced counters of the entity cache."""
+    return _flight.stats()
+
+class _FieldBudget:
+    """Concurrency limit and end-to-end deadline shared by one field's lookups."""
+    def __init__(self, budget_ms: Optional[float], concurrency: int):
+        self.sem = asyncio.Semaphore(max(1, concurrency))
+        self.deadline = None if budget_ms is None else time.monotonic() + max(budget_ms - _RESERVE_MS, 0) / 1000
 
-def _set_cached(k, v): 
-    _cache[k] = (time.time(), v)
+    def remaining_s(self) -> Optional[float]:
+        """Seconds left before the deadline (None = no deadline)."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    async def run(self, coro):
+        async with self.sem:
+            return await coro
 
 def _simple_text(html: str) -> str:
     soup = BeautifulSoup(html, "html.parser")
@@ -60,17 +76,26 @@ async def _fetch_text(client: httpx.AsyncClient, url: str) -> str:
     try:
         r = await client.get(url, timeout=_TO_S)
         if r.status_code==200 and r.text:
-            return _simple_text(r.text)
+            # HTML parsing is CPU-bound: keep it off the event loop
+            return await asyncio.to_thread(_simple_text, r.text)
     except Exception as e:
         _log("fetch err", url, e)
     return ""
 
 # --- OpenAI extraction ---
-def _openai_extract(blob: str, role: str, name: str) -> Dict[str, Any]:
-    # Synchronous OpenAI extract (small prompt). If key missing: return {}
+_oai_client: Optional[Tuple[httpx.AsyncClient, Any]] = None
+
+def _openai_client():
+    # Async SDK client on the pooled "openai" connections (rebuilt if the pool's client changes)
+    global _oai_client
+    http = http_clients.get("openai")
+    if _oai_client is None or _oai_client[0] is not http:
+        _oai_client = (http, AsyncOpenAI(api_key=_OAI, http_client=http))
+    return _oai_client[1]
+
+async def _openai_extract(blob: str, role: str, name: str) -> Dict[str, Any]:
+    # Async OpenAI extract (small prompt). If key missing: return {}
     if not _OAI: return {}
-    from openai import OpenAI
-    c = OpenAI(api_key=_OAI)
     sys = (
         "You extract racing features from raw web text. "
         "Return a short JSON object with keys:\n"
@@ -84,11 +109,12 @@ def _openai_extract(blob: str, role: str, name: str) -> Dict[str, Any]:
     )
     usr = f"ROLE={role}\nNAME={name}\nTEXT:\n{blob[:9000]}"
     try:
-        resp = c.chat.completions.create(
+        resp = await _openai_client().chat.completions.create(
             model=_OAI_MODEL,
             messages=[{"role":"system","content":sys},{"role":"user","content":usr}],
             temperature=0.1,
             max_tokens=300,
+            timeout=_TO_S,
         )
         content = resp.choices[0].message.content.strip()
         # model sometimes wraps in code fences
@@ -100,27 +126,41 @@ def _openai_extract(blob: str, role: str, name: str) -> Dict[str, Any]:
         _log("openai extract err", e)
     return {}
 
-async def _gather_entity(client, query: str, role: str, name: str) -> Dict[str,Any]:
-    key = ("ent", f"{role}:{name}")
-    hit = _get_cached(key)
-    if hit is not None: return hit
-    urls = await _tavily_search(client, query)
-    texts = []
-    for u in urls:
-        t = await _fetch_text(client, u)
-        if t: texts.append(t)
-    blob = "\n\n---\n\n".join(texts)[:12000]
-    data = _openai_extract(blob, role, name) if blob else {}
-    _set_cached(key, data)
-    return data
+async def _gather_entity(client, query: str, role: str, name: str,
+                         budget: Optional[_FieldBudget] = None) -> Dict[str,Any]:
+    budget = budget or _FieldBudget(None, _CONCURRENCY)
+
+    async def _lookup():
+        urls = await budget.run(_tavily_search(client, query))
+        texts = await asyncio.gather(*(budget.run(_fetch_text(client, u)) for u in urls))
+        blob = "\n\n---\n\n".join(t for t in texts if t)[:12000]
+        return await budget.run(_openai_extract(blob, role, name)) if blob else {}
+
+    # A trainer/jockey on several horses (or in concurrent requests) is looked up once
+    try:
+        return await _flight.do(("ent", f"{role}:{name}"), _lookup, timeout_s=budget.remaining_s())
+    except asyncio.TimeoutError:
+        # Out of budget: go without; the shared lookup finishes and caches for later requests
+        _log("deadline", role, name)
+        return {}
 
 class WebSearchProvider:
+    def __init__(self, budget_ms: Optional[float] = None, concurrency: Optional[int] = None):
+        """
+        Args:
+            budget_ms: End-to-end enrichment budget (lookups still running at the deadline are skipped; None = no deadline)
+            concurrency: Max searches/fetches/extractions in flight per field (default FINISHLINE_WEBSEARCH_CONCURRENCY)
+        """
+        self.budget_ms = budget_ms
+        self.concurrency = concurrency or _CONCURRENCY
+
     async def fetch_race_context(self, *, date: str, track: str, distance: str, surface: str) -> Dict[str,Any]:
         # Try to infer track bias if any public article mentions it
         if not (_TAV and _OAI and track):
             return {}
-        async with httpx.AsyncClient() as client:
-            data = await _gather_entity(client, f"{track} track bias {surface} {distance}", "track", track)
+        client = http_clients.get("websearch")
+        data = await _gather_entity(client, f"{track} track bias {surface} {distance}", "track", track,
+                                    _FieldBudget(self.budget_ms, self.concurrency))
         # Expect maybe {"bias":{"speed":0.05,"closer":0.02}}; if not, empty
         bias = data.get("bias") if isinstance(data, dict) else None
         return {"bias": bias or {}, "source":"websearch"}
@@ -129,34 +169,41 @@ class WebSearchProvider:
         # Async method - called directly from FastAPI endpoint (no asyncio.run needed)
         return await self._enrich_async(horses, date=date, track=track)
 
-    async def _enrich_async(self, horses: List[Dict[str,Any]], *, date: str, track: str) -> List[Dict[str,Any]]:
+    async def _enrich_async(self, horses: List[Dict[str,Any]], *, date: str, track: str,
+                            client: Optional[httpx.AsyncClient] = None) -> List[Dict[str,Any]]:
         if not (_TAV and _OAI):
             # No keys → pass-through
             return horses
-        out = []
-        async with httpx.AsyncClient() as client:
-            for h in horses:
-                name    = (h.get("name") or "").strip()
-                trainer = (h.get("trainer") or "").strip()
-                jockey  = (h.get("jockey") or "").strip()
-
-                horse_q   = f'"{name}" racehorse past performances speed figure pace style'
-                trainer_q = f'"{trainer}" trainer win percentage stats'
-                jockey_q  = f'"{jockey}" jockey win percentage stats'
-
-                h_feats   = await _gather_entity(client, horse_q, "horse", name) if name else {}
-                t_feats   = await _gather_entity(client, trainer_q, "trainer", trainer) if trainer else {}
-                j_feats   = await _gather_entity(client, jockey_q, "jockey",  jockey)  if jockey else {}
-
-                # Merge—fields may be missing
-                merged = {**h, **{
-                    "last_speed_fig": h_feats.get("last_speed_fig", h.get("last_speed_fig")),
-                    "early_pace":     (h_feats.get("early_pace") or h.get("early_pace") or "P"),
-                    "form_delta":     h_feats.get("form_delta", h.get("form_delta")),
-                    "days_since_race": h_feats.get("days_since", h.get("days_since_race")),
-                    "trainer_win_pct": t_feats.get("trainer_win_pct", h.get("trainer_win_pct")),
-                    "jockey_win_pct":  j_feats.get("jockey_win_pct",  h.get("jockey_win_pct")),
-                }}
-                out.append(merged)
-        return out
-
+        # Whole field at once, bounded by one semaphore and one deadline; gather keeps input order
+        budget = _FieldBudget(self.budget_ms, self.concurrency)
+        client = client or http_clients.get("websearch")
+
+        async def _entity(query: str, role: str, name: str) -> Dict[str,Any]:
+            return await _gather_entity(client, query, role, name, budget) if name else {}
+
+        async def _one(h: Dict[str,Any]) -> Dict[str,Any]:
+            name    = (h.get("name") or "").strip()
+            trainer = (h.get("trainer") or "").strip()
+            jockey  = (h.get("jockey") or "").strip()
+
+            horse_q   = f'"{name}" racehorse past performances speed figure pace style'
+            trainer_q = f'"{trainer}" trainer win percentage stats'
+            jockey_q  = f'"{jockey}" jockey win percentage stats'
+
+            h_feats, t_feats, j_feats = await asyncio.gather(
+                _entity(horse_q, "horse", name),
+                _entity(trainer_q, "trainer", trainer),
+                _entity(jockey_q, "jockey", jockey),
+            )
+
+            # Merge—fields may be missing
+            return {**h, **{
+                "last_speed_fig": h_feats.get("last_speed_fig", h.get("last_speed_fig")),
+                "early_pace":     (h_feats.get("early_pace") or h.get("early_pace") or "P"),
+                "form_delta":     h_feats.get("form_delta", h.get("form_delta")),
+                "days_since_race": h_feats.get("days_since", h.get("days_since_race")),
+                "trainer_win_pct": t_feats.get("trainer_win_pct", h.get("trainer_win_pct")),
+                "jockey_win_pct":  j_feats.get("jockey_win_pct",  h.get("jockey_win_pct")),
+            }}
+
+        return list(await asyncio.gather(*(_one(h) for h in horses)))
@@ -2,16 +2,19 @@
 Research-Enhanced Scoring System
 Combines research data (speed figures, trainer/jockey stats, pace) with odds analysis
 """
-from typing import List, Dict, Any
-from .odds import ml_to_fraction, ml_to_prob
-import math
+from typing import List, Dict, Any, Optional
+from .predict.features import FieldInputs, FeatureModel, DEFAULT_MODELS
 import os
 
-def research_score(horse: Dict[str, Any]) -> float:
+def research_scores(
+    horses: List[Dict[str, Any]],
+    model: Optional[FeatureModel] = None
+) -> List[float]:
     """
-    Calculate research-enhanced composite score for a horse.
+    Calculate research-enhanced composite scores for a field.
     
-    Uses:
+    Uses (as feature columns over the field):
+    - Odds-implied probability
     - Speed figures (last_speed_fig)
     - Trainer/Jockey win percentages
     - Pace style adjustments
@@ -19,62 +22,25 @@ def research_score(horse: Dict[str, Any]) -> float:
     - Days since last race
     
     Args:
-        horse: Dictionary with enriched research data
+        horses: List of dictionaries with enriched research data
+        model: Composite weights (default: the built-in "research" model)
     
     Returns:
-        Composite score (0.0 to 1.0+)
+        Composite score per horse (around 0.0 to 1.0+)
     """
-    # Base odds probability
-    odds_str = horse.get("odds", "5-2")
-    base_prob = ml_to_prob(odds_str)
-    
-    # Speed figure adjustment (normalized around 80)
-    speed_fig = horse.get("last_speed_fig", 80)
-    speed_factor = min(max(speed_fig / 100.0, 0.5), 1.5)  # 0.5 to 1.5 range
-    
-    # Trainer/Jockey win percentage (combined)
-    trainer_pct = horse.get("trainer_win_pct", 0.12)
-    jockey_pct = horse.get("jockey_win_pct", 0.12)
-    people_factor = (trainer_pct + jockey_pct) / 0.24  # normalized around 0.24 combined
-    
-    # Pace style (E=Early, P=Presser, S=Stalker, C=Closer)
-    pace = horse.get("early_pace", "P").upper()[:1]
-    pace_bonus = {"E": 1.05, "P": 1.0, "S": 0.95, "C": 0.90}.get(pace, 1.0)
-    
-    # Form delta (+positive is improving, -negative is declining)
-    form_delta = horse.get("form_delta", 0.0)
-    form_factor = 1.0 + (form_delta * 0.1)  # ±10% per point
-    form_factor = min(max(form_factor, 0.7), 1.3)
-    
-    # Days since race (prefer 14-35 days)
-    days_off = horse.get("days_since_race", 21)
-    if 14 <= days_off <= 35:
-        rest_factor = 1.1
-    elif days_off < 7:
-        rest_factor = 0.9  # Too fresh
-    elif days_off > 60:
-        rest_factor = 0.85  # Layoff concern
-    else:
-        rest_factor = 1.0
-    
-    # Composite calculation
-    composite = (
-        base_prob * 0.3 +           # 30% odds-implied probability
-        speed_factor * 0.25 +       # 25% speed figure
-        people_factor * 0.20 +      # 20% trainer/jockey
-        pace_bonus * 0.10 +         # 10% pace style
-        form_factor * 0.10 +        # 10% form trend
-        rest_factor * 0.05          # 5% rest pattern
-    )
-    
-    return round(composite, 4)
+    scores = (model or DEFAULT_MODELS["research"]).score(FieldInputs(horses))
+    return [round(s, 4) for s in scores.tolist()]
 
-def calculate_research_predictions(horses: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+def calculate_research_predictions(
+    horses: List[Dict[str, Any]],
+    model: Optional[FeatureModel] = None
+) -> Dict[str, Dict[str, Any]]:
     """
     Calculate Win/Place/Show predictions using research-enhanced scoring.
     
     Args:
         horses: List of enriched horse dictionaries
+        model: Composite weights (default: the built-in "research" model)
     
     Returns:
         Dictionary with win, place, show predictions
@@ -88,8 +54,7 @@ def calculate_research_predictions(horses: List[Dict[str, Any]]) -> Dict[str, Di
     
     # Score all horses using research algorithm
     scored = []
-    for h in horses:
-        score = research_score(h)
+    for h, score in zip(horses, research_scores(horses, model)):
         scored.append({
             "name": h.get("name", "Unknown"),
             "odds": h.get("odds", "1-1"),
@@ -0,0 +1,156 @@
+"""
+Local stand-in for the research API, for exercising the custom provider.
+
+Serves deterministic (name-hashed) horse/trainer/jockey records on the
+per-entity endpoints (GET /horse, /trainer, /jockey) and, unless disabled,
+the batch endpoint (POST /field), each with a fixed simulated latency.
+Run it as a server, or benchmark the provider's per-entity and batch modes
+against it in-process:
+
+    python -m apps.api.research_sim serve --port 8765 --latency-ms 20
+    python -m apps.api.research_sim bench --horses 12 --latency-ms 20 --rounds 5
+"""
+import argparse
+import asyncio
+import time
+import zlib
+from collections import Counter
+from typing import Dict, Any, List
+
+import httpx
+from fastapi import FastAPI
+
+from . import provider_custom
+from .provider_custom import CustomProvider
+
+
+# Base URL the in-process benchmark points the provider at
+SIM_BASE = "http://research.sim"
+
+PACE_STYLES = ("E", "EP", "P", "S", "C")
+
+
+def _unit(name: str, salt: str) -> float:
+    """Deterministic value in [0, 1) for a name."""
+    return (zlib.crc32(f"{salt}:{name}".encode()) % 10_000) / 10_000
+
+
+def horse_record(name: str) -> Dict[str, Any]:
+    return {
+        "last_speed_fig": 70 + int(30 * _unit(name, "fig")),
+        "pace_style": PACE_STYLES[int(len(PACE_STYLES) * _unit(name, "pace"))],
+        "form_delta": round(4 * _unit(name, "form") - 2, 1),
+        "days_since": 7 + int(83 * _unit(name, "days")),
+    }
+
+
+def person_record(name: str) -> Dict[str, Any]:
+    return {"win_pct": round(0.05 + 0.2 * _unit(name, "win"), 3)}
+
+
+def create_app(latency_ms: float = 20.0, batch: bool = True) -> FastAPI:
+    """
+    Stand-in research API.
+
+    Args:
+        latency_ms: Simulated service time of every call
+        batch: Serve POST /field (False answers it 404, like an API without batch support)
+
+    Returns:
+        FastAPI app; app.state.calls counts calls per path
+    """
+    app = FastAPI(title="Research API stand-in")
+    app.state.calls = Counter()
+    delay_s = latency_ms / 1000
+
+    async def _serve(path: str):
+        app.state.calls[path] += 1
+        await asyncio.sleep(delay_s)
+
+    @app.get("/horse")
+    async def horse(name: str, track: str = "", date: str = ""):
+        await _serve("/horse")
+        return horse_record(name)
+
+    @app.get("/trainer")
+    async def trainer(name: str):
+        await _serve("/trainer")
+        return person_record(name)
+
+    @app.get("/jockey")
+    async def jockey(name: str):
+        await _serve("/jockey")
+        return person_record(name)
+
+    if batch:
+        @app.post("/field")
+        async def field(body: Dict[str, Any]):
+            await _serve("/field")
+            return {
+                "horses": {n: horse_record(n) for n in body.get("horses") or []},
+                "trainers": {n: person_record(n) for n in body.get("trainers") or []},
+                "jockeys": {n: person_record(n) for n in body.get("jockeys") or []},
+            }
+
+    return app
+
+
+def sample_field(n_horses: int, race: int = 0) -> List[Dict[str, Any]]:
+    """A field where trainers and jockeys repeat across horses, as on a real card."""
+    return [
+        {"name": f"R{race} Horse {i + 1}", "trainer": f"Trainer {i % 5}", "jockey": f"Jockey {i % 8}"}
+        for i in range(n_horses)
+    ]
+
+
+async def bench(n_horses: int = 12, latency_ms: float = 20.0, rounds: int = 5) -> Dict[str, Any]:
+    """
+    Enrich cold-cache fields in per-entity and batch mode against the stand-in.
+
+    Points provider_custom at SIM_BASE for the run.
+
+    Returns:
+        {mode: {mean_ms, calls_per_field}, "same_output": bool}
+    """
+    provider_custom._BASE = SIM_BASE
+    results: Dict[str, Any] = {}
+    outputs = {}
+    for mode, batch in (("per_entity", False), ("batch", True)):
+        app = create_app(latency_ms, batch=batch)
+        provider = CustomProvider(batch=batch)
+        elapsed = []
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app)) as client:
+            for r in range(rounds):
+                provider_custom._flight.clear()
+                provider_custom._batch_unsupported.clear()
+                t0 = time.perf_counter()
+                out = await provider.enrich_horses_async(sample_field(n_horses, r), date="2025-01-01", track="SIM", client=client)
+                elapsed.append((time.perf_counter() - t0) * 1000)
+        outputs[mode] = out
+        results[mode] = {
+            "mean_ms": round(sum(elapsed) / len(elapsed), 1),
+            "calls_per_field": dict((path, n / rounds) for path, n in sorted(app.state.calls.items())),
+        }
+    results["same_output"] = outputs["per_entity"] == outputs["batch"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in research API for the custom provider")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Run the stand-in server")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency-ms", type=float, default=20.0)
+    serve.add_argument("--no-batch", action="store_true", help="Answer POST /field with 404")
+    run = sub.add_parser("bench", help="Benchmark per-entity vs batch enrichment in-process")
+    run.add_argument("--horses", type=int, default=12)
+    run.add_argument("--latency-ms", type=float, default=20.0)
+    run.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        import uvicorn
+        uvicorn.run(create_app(args.latency_ms, batch=not args.no_batch), port=args.port)
+    else:
+        import json
+        print(json.dumps(asyncio.run(bench(args.horses, args.latency_ms, args.rounds)), indent=2))
@@ -4,32 +4,81 @@ Pure mathematical model using only fields visible on a race ticket.
 No external API calls - completes in <2s.
 """
 import logging
+import os
 import time
-from typing import Dict, Any, List
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Literal, Optional, Tuple
+
+import numpy as np
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, conint
 
 # Import ticket-only prediction modules
 try:
-    from .predict.odds import parse_odds, field_size_adjust, detect_coupled_entries
-    from .predict.calibration import get_calibrated_win_probs
-    from .predict.harville import harville_place_show
-    from .predict.ev import compute_value_metrics
-    from .config import TICKET_ONLY_MODE
+    from .predict.odds import parse_odds, is_scratch
+    from .predict.frame import RaceFrame, pad_frames
+    from .predict.calibration import calibrate_win_matrix, calibration_jacobian
+    from .predict.harville import harville_arrays, harville_jacobian, finish_order_tables, top_k_cells
+    from .predict.ev import expected_value_array, kelly_fraction_array
+    from .predict.kelly import race_kelly, card_kelly, POOLS
+    from .predict.pools import place_show_payouts, DEFAULT_TAKEOUT
+    from .predict.simulate import simulate_race, HARVILLE_DISCOUNTS, LO_DISCOUNTS
+    from .predict.ordering import ordering_arrays, load_ordering_tables, ORDERING_MODELS
+    from .predict.session import RaceSession, SessionStore
+    from .predict.artifacts import ArtifactRegistry, ArtifactSnapshot
+    from .predict.recalibrate import Recalibrator
+    from .config import TICKET_ONLY_MODE, SESSION_MAX, SESSION_TTL_S, ARTIFACT_POLL_S
     from .retry_utils import generate_request_id
 except ImportError:
     # Fallback imports (if running standalone)
-    from predict.odds import parse_odds, field_size_adjust, detect_coupled_entries
-    from predict.calibration import get_calibrated_win_probs
-    from predict.harville import harville_place_show
-    from predict.ev import compute_value_metrics
-    from config import TICKET_ONLY_MODE
+    from predict.odds import parse_odds, is_scratch
+    from predict.frame import RaceFrame, pad_frames
+    from predict.calibration import calibrate_win_matrix, calibration_jacobian
+    from predict.harville import harville_arrays, harville_jacobian, finish_order_tables, top_k_cells
+    from predict.ev import expected_value_array, kelly_fraction_array
+    from predict.kelly import race_kelly, card_kelly, POOLS
+    from predict.pools import place_show_payouts, DEFAULT_TAKEOUT
+    from predict.simulate import simulate_race, HARVILLE_DISCOUNTS, LO_DISCOUNTS
+    from predict.ordering import ordering_arrays, load_ordering_tables, ORDERING_MODELS
+    from predict.session import RaceSession, SessionStore
+    from predict.artifacts import ArtifactRegistry, ArtifactSnapshot
+    from predict.recalibrate import Recalibrator
+    from config import TICKET_ONLY_MODE, SESSION_MAX, SESSION_TTL_S, ARTIFACT_POLL_S
     from retry_utils import generate_request_id
 
 log = logging.getLogger(__name__)
 
-router = APIRouter()
+# Harville place/show algorithm ("closed_form" or "broadcast"), for A/B runs
+HARVILLE_ALGORITHM = os.getenv("FINISHLINE_HARVILLE_ALGORITHM", "closed_form").strip().lower()
+
+# Place/show ordering model: "harville" or a table-driven model ("henery", "stern")
+ORDERING_MODEL = os.getenv("FINISHLINE_ORDERING_MODEL", "harville").strip().lower()
+
+# Largest full card accepted by the batch endpoint
+MAX_BATCH_RACES = int(os.getenv("FINISHLINE_MAX_BATCH_RACES", "40"))
+
+# Memory-map the Henery/Stern lookup tables once at startup
+load_ordering_tables()
+
+# Live race sessions for odds-delta updates (in-process)
+sessions = SessionStore(max_sessions=SESSION_MAX, ttl_s=SESSION_TTL_S)
+
+# Model artifacts, loaded once and swapped atomically when the files change
+artifacts = ArtifactRegistry()
+
+
+@asynccontextmanager
+async def artifact_watch_lifespan(app):
+    """Poll for new artifact versions while the app is up."""
+    artifacts.start(ARTIFACT_POLL_S)
+    try:
+        yield
+    finally:
+        await artifacts.stop()
+
+
+router = APIRouter(lifespan=artifact_watch_lifespan)
 
 
 class HorseInput(BaseModel):
@@ -38,6 +87,8 @@ class HorseInput(BaseModel):
     ml_odds_raw: str = Field(default="", description="ML odds (any format)")
     trainer: str = Field(default="")
     jockey: str = Field(default="")
+    program: str = Field(default="", description="Program number (1, 1A, 1X for coupled entries)")
+    owner: str = Field(default="", description="Owner (same owner couples horses into one entry)")
 
 
 class RaceContext(BaseModel):
@@ -48,10 +99,536 @@ class RaceContext(BaseModel):
     distance: str = Field(default="")
 
 
+class SimulationOptions(BaseModel):
+    """Monte Carlo finish-order simulation settings."""
+    seed: int = Field(default=0)
+    budget_ms: float = Field(default=50.0, gt=0, le=2000, description="Latency budget for sampling")
+    discounted: bool = Field(default=False, description="Lo discounted ordering instead of plain Harville")
+
+
+class PoolOptions(BaseModel):
+    """Pari-mutuel place/show pool settings for payout estimates."""
+    takeout: float = Field(default=DEFAULT_TAKEOUT, ge=0, lt=1)
+    place_total: Optional[float] = Field(default=None, gt=0, description="Place pool total, if known")
+    show_total: Optional[float] = Field(default=None, gt=0, description="Show pool total, if known")
+    stake: float = Field(default=0.0, ge=0, description="Own bet per horse (same units as the totals)")
+
+
+class KellyOptions(BaseModel):
+    """Simultaneous Kelly sizing across the field (or the card)."""
+    max_kelly: float = Field(default=0.25, gt=0, le=1, description="Cap per bet")
+    bankroll_cap: float = Field(default=1.0, gt=0, le=1, description="Cap on the total fraction staked")
+
+
 class TicketPredictRequest(BaseModel):
     """Request for ticket-only prediction."""
     race: RaceContext
     horses: List[HorseInput]
+    include_exotics: bool = Field(default=False, description="Add exacta/trifecta/superfecta tables")
+    exotics_top_k: int = Field(default=10, ge=1, le=100)
+    simulation: Optional[SimulationOptions] = None
+    ordering_model: Optional[Literal["harville", "henery", "stern"]] = Field(
+        default=None, description="harville | henery | stern (default from env)"
+    )
+    include_sensitivity: bool = Field(default=False, description="Add ∂(p_win, p_place, p_show)/∂odds Jacobian")
+    couple_by_trainer: bool = Field(default=False, description="Also couple horses sharing a trainer")
+    recalibrate: bool = Field(default=False, description="Apply temp_tau temperature scaling to the win distribution")
+    joint_kelly: Optional[KellyOptions] = Field(default=None, description="Size all bets of the race jointly")
+    pools: Optional[PoolOptions] = None
+
+
+class TicketPredictBatchRequest(BaseModel):
+    """Full card: one ticket-only request per race."""
+    races: List[TicketPredictRequest]
+    card_kelly: Optional[KellyOptions] = Field(default=None, description="Size bets jointly across parallel races")
+
+
+class OddsUpdate(BaseModel):
+    """One horse's new odds, addressed by index or name."""
+    index: Optional[int] = Field(default=None, ge=0)
+    name: Optional[str] = Field(default=None)
+    ml_odds_raw: str
+
+
+class OddsDeltaRequest(BaseModel):
+    """Odds changes to apply to a live race session ("SCR" scratches the horse)."""
+    updates: List[OddsUpdate]
+
+
+class ScratchRequest(BaseModel):
+    """Horses to scratch from a live race session, by index or name."""
+    indices: List[conint(ge=0)] = Field(default_factory=list)
+    names: List[str] = Field(default_factory=list)
+
+
+def build_exotics(names: List[str], p_win: List[float], top_k: int) -> Dict[str, Any]:
+    """
+    Top-K exacta, trifecta and superfecta combinations by horse name.
+    
+    Args:
+        names: Horse names (index-aligned with p_win)
+        p_win: Post-Stern win probabilities (as used for place/show)
+        top_k: Combinations per pool
+    
+    Returns:
+        {exacta, trifecta, superfecta: [{names, prob}]}
+    """
+    tables = finish_order_tables(p_win, top_k=top_k)
+    
+    def _named(cells):
+        return [
+            {"names": [names[i] for i in c["order"]], "prob": round(c["prob"], 6)}
+            for c in cells
+        ]
+    
+    return {
+        "exacta": _named(top_k_cells(tables["exacta"], top_k)),
+        "trifecta": _named(top_k_cells(tables["trifecta"], top_k)),
+        "superfecta": _named(tables["superfecta"])
+    }
+
+
+def build_simulation(
+    names: List[str],
+    p_win: List[float],
+    opts: SimulationOptions,
+    top_k: int
+) -> Dict[str, Any]:
+    """
+    Monte Carlo W/P/S and exotic frequencies by horse name.
+    
+    Args:
+        names: Horse names (index-aligned with p_win)
+        p_win: Post-Stern win probabilities
+        opts: Seed, latency budget and ordering model
+        top_k: Combinations per pool
+    
+    Returns:
+        {n_samples, seed, model, horses: [...], exacta, trifecta, superfecta}
+    """
+    sim = simulate_race(
+        p_win,
+        latency_budget_ms=opts.budget_ms,
+        seed=opts.seed,
+        discounts=LO_DISCOUNTS if opts.discounted else HARVILLE_DISCOUNTS,
+        top_k=top_k
+    )
+    
+    def _named(cells):
+        return [
+            {"names": [names[i] for i in c["order"]], "prob": round(c["prob"], 6), "se": round(c["se"], 6)}
+            for c in cells
+        ]
+    
+    return {
+        "n_samples": sim["n_samples"],
+        "seed": sim["seed"],
+        "model": "lo_discounted" if opts.discounted else "harville",
+        "horses": [
+            {
+                "name": names[i],
+                "p_win": round(float(sim["p_win"][i]), 4),
+                "p_place": round(float(sim["p_place"][i]), 4),
+                "p_show": round(float(sim["p_show"][i]), 4),
+                "se_win": round(float(sim["se_win"][i]), 5),
+                "se_place": round(float(sim["se_place"][i]), 5),
+                "se_show": round(float(sim["se_show"][i]), 5)
+            }
+            for i in range(len(names))
+        ],
+        "exacta": _named(sim["exacta"]),
+        "trifecta": _named(sim["trifecta"]),
+        "superfecta": _named(sim["superfecta"])
+    }
+
+
+def parse_ticket_horses(horses: List[HorseInput], rid: str) -> RaceFrame:
+    """
+    Parse ML odds for one race, filling missing/invalid odds with the field average.
+    
+    Horses marked "SCR"/"WD" are flagged scratched and keep no decimal odds.
+    
+    Args:
+        horses: Horses from the ticket
+        rid: Request ID (for logging)
+    
+    Returns:
+        RaceFrame with decimal odds set for every running horse
+    """
+    frame = RaceFrame.from_horses(horses)
+    for i in np.flatnonzero(~frame.parsed & ~frame.scratched):
+        log.warning(f"[{rid}] Could not parse odds for {horses[i].name}: '{horses[i].ml_odds_raw}'")
+    return frame
+
+
+def couple_ticket_frame(frame: RaceFrame, couple_by_trainer: bool, rid: str) -> Dict[str, Any]:
+    """
+    Group a race's horses into betting interests, logging duplicate rows.
+    
+    Args:
+        frame: Parsed race frame
+        couple_by_trainer: Also couple horses sharing a trainer
+        rid: Request ID (for logging)
+    
+    Returns:
+        RaceFrame.couple result
+    """
+    coupling = frame.couple(couple_by_trainer)
+    for i, k in coupling["duplicates"].items():
+        log.warning(f"[{rid}] Row {i} repeats {frame.names[k]} (row {k}), left out of the field")
+    return coupling
+
+
+def resolve_ordering_model(requested: Optional[str]) -> str:
+    """Normalize a per-request ordering model, falling back to the env default."""
+    return (requested or ORDERING_MODEL).strip().lower()
+
+
+def build_sensitivity(
+    p_calibrated: np.ndarray,
+    decimal_odds: np.ndarray,
+    labels: List[str],
+    params: Optional[Dict[str, float]] = None,
+    recalibrator: Optional[Recalibrator] = None
+) -> Dict[str, Any]:
+    """
+    Jacobian of the reported W/P/S probabilities with respect to each horse's odds.
+    
+    Lets a client extrapolate what-if odds moves locally:
+    Δp ≈ J @ Δodds, re-querying only on large moves.
+    
+    Args:
+        p_calibrated: Calibrated (pre-recalibration) win probabilities per betting interest
+        decimal_odds: Decimal odds per betting interest
+        labels: Interest names (coupled entries joined with " / ")
+        params: Calibration/Stern parameters (default the module constants)
+        recalibrator: Temperature stage to chain in, if the race used it
+    
+    Returns:
+        {wrt, outputs, labels, jacobian: [3][n][n]}
+    """
+    stern_exponent = params["stern_exponent"] if params else None
+    d_win = calibration_jacobian(decimal_odds, params=params)
+    p_in = p_calibrated
+    if recalibrator is not None:
+        d_win = recalibrator.field_jacobian(p_calibrated) @ d_win
+        p_in = recalibrator.apply_field(p_calibrated)
+    jacobian = harville_jacobian(p_in, use_stern=True, stern_exponent=stern_exponent) @ d_win
+    return {
+        "wrt": "ml_decimal",
+        "outputs": ["p_win", "p_place", "p_show"],
+        "labels": labels,
+        "jacobian": np.round(jacobian, 6).tolist()
+    }
+
+
+def build_portfolio(
+    labels: List[str],
+    fractions: Dict[str, np.ndarray],
+    p_hit: Dict[str, np.ndarray],
+    decimal_odds: Dict[str, np.ndarray]
+) -> List[Dict[str, Any]]:
+    """
+    Non-zero stakes of a joint Kelly solution, largest first.
+    
+    Args:
+        labels: Interest names
+        fractions: {pool: (n,) bankroll fractions}
+        p_hit: {pool: (n,) model probability that the bet cashes}
+        decimal_odds: {pool: (n,) decimal odds}
+    
+    Returns:
+        [{name, pool, fraction, prob, odds}]
+    """
+    bets = [
+        {
+            "name": labels[j],
+            "pool": pool,
+            "fraction": round(float(fractions[pool][j]), 4),
+            "prob": round(float(p_hit[pool][j]), 4),
+            "odds": round(float(decimal_odds[pool][j]), 4)
+        }
+        for pool in POOLS if pool in decimal_odds
+        for j in np.flatnonzero(fractions[pool] >= 5e-5)
+    ]
+    return sorted(bets, key=lambda b: b["fraction"], reverse=True)
+
+
+def build_race_response(
+    body: TicketPredictRequest,
+    frame: RaceFrame,
+    ordering_model: str,
+    sensitivity: Optional[Dict[str, Any]] = None,
+    artifact_version: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Rank horses and assemble the per-race response body.
+    
+    Args:
+        body: Original race request (options for exotics/simulation)
+        frame: Race frame with probability and value columns filled in
+        ordering_model: Model actually used for place/show
+        sensitivity: Optional Jacobian block (see build_sensitivity)
+        artifact_version: Version of the artifact snapshot used
+    
+    Returns:
+        Response dict (without rid/elapsed_ms)
+    """
+    # One row per betting interest (coupled entries rank as one; scratches not at all)
+    order = frame.rank()
+    labels = frame.labels
+    records = frame.to_records()
+    leads = [records[i] for i in frame.leads.tolist()]
+    by_win = [leads[j] for j in order["win"].tolist()]
+    n_scratched = int(frame.scratched.sum())
+    
+    response = {
+        "ok": True,
+        "mode": "ticket-only",
+        "meta": {
+            "track": body.race.track,
+            "date": body.race.date,
+            "surface": body.race.surface,
+            "distance": body.race.distance,
+            "n_horses": frame.n_horses - n_scratched - len(frame.duplicate_of),
+            "n_interests": frame.n_interests,
+            "n_scratched": n_scratched,
+            "n_duplicates": len(frame.duplicate_of),
+            "ordering_model": ordering_model,
+            "artifact_version": artifact_version
+        },
+        "horses": records,
+        "summary": {
+            "top_win": [labels[j] for j in order["win"][:3].tolist()],
+            "top_value": [labels[j] for j in order["value"][:3].tolist()],
+            "top_kelly": [labels[j] for j in order["kelly"][:3].tolist()]
+        },
+        "predictions": {
+            pool: {
+                "name": labels[order["win"][k]],
+                "prob": by_win[k][f"p_{pool}"],
+                "ev": by_win[k][f"ev_{pool}"],
+                "kelly": by_win[k][f"kelly_{pool}"]
+            } if len(by_win) > k else None
+            for k, pool in enumerate(POOLS)
+        }
+    }
+    
+    # Optional exotic tables (same adjusted p_win as place/show)
+    adjusted = frame.columns["p_win"].tolist()
+    if body.include_exotics:
+        response["exotics"] = build_exotics(labels, adjusted, body.exotics_top_k)
+    
+    # Optional Monte Carlo cross-check / alternative ordering model
+    if body.simulation is not None:
+        response["simulation"] = build_simulation(labels, adjusted, body.simulation, body.exotics_top_k)
+    
+    if body.include_sensitivity:
+        response["sensitivity"] = sensitivity
+    
+    return response
+
+
+def predict_races(
+    bodies: List[TicketPredictRequest],
+    rid: str,
+    snapshot: Optional[ArtifactSnapshot] = None,
+    card_options: Optional[KellyOptions] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """
+    Ticket-only predictions for one or more races in a single vectorized pass.
+    
+    Races are padded into a races×interests matrix (coupled entries
+    collapse to one betting interest, scratches drop out); calibration,
+    Harville place/show and EV/Kelly each run once over the whole
+    matrix. Races asking for a table-driven ordering model are evaluated
+    per row, as are the pari-mutuel place/show price estimates.
+    
+    Args:
+        bodies: Race requests (each must have at least one horse)
+        rid: Request ID (for logging)
+        snapshot: Artifact snapshot to use (default the registry's current one)
+        card_options: Size the races' bets jointly as one card (see card_kelly);
+            each race gets a "card_portfolio" block and a private "_card" summary
+    
+    Returns:
+        (per-race response dicts, stage timings in ms)
+    """
+    snapshot = snapshot or artifacts.current()
+    params = snapshot.params
+    timing = {}
+    t = time.perf_counter()
+    
+    def _lap(stage):
+        nonlocal t
+        now = time.perf_counter()
+        timing[stage] = round((now - t) * 1000, 3)
+        t = now
+    
+    # Step 0: Parse odds, group betting interests, pad into races×interests
+    frames = [parse_ticket_horses(body.horses, rid) for body in bodies]
+    for body, frame in zip(bodies, frames):
+        couple_ticket_frame(frame, body.couple_by_trainer, rid)
+    sizes = [frame.n_interests for frame in frames]
+    odds, mask = pad_frames(frames)
+    _lap("parse_ms")
+    
+    # Step 1: Calibrated win probabilities
+    p_cal, ci_low, ci_high = calibrate_win_matrix(odds, mask, params=params, ci_table=snapshot.ci_table)
+    p_base = p_cal
+    
+    # Optional temperature recalibration (CIs move with their point estimate)
+    recal_rows = np.array([body.recalibrate for body in bodies], dtype=bool)
+    if recal_rows.any():
+        recalibrator = snapshot.recalibrator
+        p_cal = p_cal.copy()
+        p_cal[recal_rows] = recalibrator.apply_field(p_base[recal_rows], mask[recal_rows])
+        ratio = np.where(p_base > 0, p_cal / np.where(p_base > 0, p_base, 1.0), 0.0)
+        ci_low, ci_high = ci_low * ratio, np.minimum(ci_high * ratio, 1.0)
+    
+    # Optional feature tilt from the "ticket" horse model (none in the default weights)
+    ticket_model = snapshot.feature_models.get("ticket")
+    if ticket_model is not None and not ticket_model.is_identity:
+        p_tilted = p_cal.copy()
+        for r, (body, frame) in enumerate(zip(bodies, frames)):
+            if sizes[r]:
+                ctx = {"surface": body.race.surface, "distance": body.race.distance}
+                p_tilted[r, :sizes[r]] = ticket_model.tilt(p_cal[r, :sizes[r]], frame.feature_inputs(ctx))
+        ratio = np.where(p_cal > 0, p_tilted / np.where(p_cal > 0, p_cal, 1.0), 0.0)
+        ci_low, ci_high = ci_low * ratio, np.minimum(ci_high * ratio, 1.0)
+        p_cal = p_tilted
+    _lap("calibrate_ms")
+    
+    # Step 2: Place/show (Harville for the whole card, Henery/Stern per race)
+    p_win, p_place, p_show = harville_arrays(
+        p_cal, use_stern=True, algorithm=HARVILLE_ALGORITHM, stern_exponent=params["stern_exponent"]
+    )
+    models = []
+    for r, body in enumerate(bodies):
+        model = resolve_ordering_model(body.ordering_model)
+        n = sizes[r]
+        if model not in ORDERING_MODELS:
+            model = "harville"
+        elif n >= 2:
+            arrays = ordering_arrays(p_cal[r, :n], model=model)
+            if arrays is None:
+                log.warning(f"[{rid}] {model} tables unavailable, using Harville")
+                model = "harville"
+            else:
+                p_win[r, :n], p_place[r, :n], p_show[r, :n] = arrays
+        models.append(model)
+    _lap("place_show_ms")
+    
+    # Step 3: Place/show prices from the pari-mutuel pool model (a ticket has win odds only)
+    place_odds = np.full_like(odds, np.nan)
+    show_odds = np.full_like(odds, np.nan)
+    for r, body in enumerate(bodies):
+        n = sizes[r]
+        if n >= 2:
+            pools = body.pools or PoolOptions()
+            estimate = place_show_payouts(
+                p_win[r, :n], odds[r, :n], takeout=pools.takeout,
+                place_total=pools.place_total, show_total=pools.show_total, stake=pools.stake
+            )
+            place_odds[r, :n] = estimate["place_odds"]
+            show_odds[r, :n] = estimate["show_odds"]
+    _lap("pools_ms")
+    
+    # Step 4: EV and Kelly per pool (NaN where a pool has no price)
+    ev_win = expected_value_array(p_win, odds)
+    kelly_win = np.round(kelly_fraction_array(p_win, odds), 4)
+    priced_place, priced_show = np.isfinite(place_odds), np.isfinite(show_odds)
+    ev_place = np.where(priced_place, expected_value_array(p_place, np.nan_to_num(place_odds)), np.nan)
+    ev_show = np.where(priced_show, expected_value_array(p_show, np.nan_to_num(show_odds)), np.nan)
+    kelly_place = np.where(priced_place, np.round(kelly_fraction_array(p_place, np.nan_to_num(place_odds)), 4), np.nan)
+    kelly_show = np.where(priced_show, np.round(kelly_fraction_array(p_show, np.nan_to_num(show_odds)), 4), np.nan)
+    
+    # Best bet: highest EV with positive edge across the pools (as in compute_value_metrics)
+    ev_pools = np.stack([ev_win, ev_place, ev_show])
+    eligible = (ev_pools > 0) & (np.stack([kelly_win, kelly_place, kelly_show]) > 0)
+    best_bet = np.where(eligible.any(axis=0), np.where(eligible, ev_pools, -np.inf).argmax(axis=0), -1)
+    _lap("value_ms")
+    
+    # Step 4b: Simultaneous Kelly over the Harville finish orders
+    labels = [frame.labels for frame in frames]
+    
+    def _pool_rows(r):
+        n = sizes[r]
+        probs = {"win": p_win[r, :n], "place": p_place[r, :n], "show": p_show[r, :n]}
+        prices = {"win": odds[r, :n], "place": place_odds[r, :n], "show": show_odds[r, :n]}
+        return probs, prices
+    
+    portfolios = [None] * len(bodies)
+    for r, body in enumerate(bodies):
+        if body.joint_kelly is not None:
+            n = sizes[r]
+            probs, prices = _pool_rows(r)
+            solved = race_kelly(
+                p_win[r, :n], odds[r, :n], place_odds[r, :n], show_odds[r, :n],
+                max_kelly=body.joint_kelly.max_kelly, bankroll_cap=body.joint_kelly.bankroll_cap
+            )
+            independent = np.nansum(kelly_win[r, :n]) + np.nansum(kelly_place[r, :n]) + np.nansum(kelly_show[r, :n])
+            portfolios[r] = {
+                "bets": build_portfolio(labels[r], solved, probs, prices),
+                "total": round(solved["total"], 4),
+                "growth": round(solved["growth"], 6),
+                "independent_total": round(float(independent), 4),
+                "cap_binding": solved["cap_binding"]
+            }
+    card = None
+    if card_options is not None:
+        card = card_kelly(
+            [
+                {
+                    "p_win": p_win[r, :sizes[r]], "win_odds": odds[r, :sizes[r]],
+                    "place_odds": place_odds[r, :sizes[r]], "show_odds": show_odds[r, :sizes[r]]
+                }
+                for r in range(len(bodies))
+            ],
+            max_kelly=card_options.max_kelly, bankroll_cap=card_options.bankroll_cap
+        )
+    _lap("kelly_ms")
+    
+    # Step 5: Per-race responses (interest columns are views into the card matrices)
+    results = []
+    for r, (body, frame) in enumerate(zip(bodies, frames)):
+        n = sizes[r]
+        frame.set_columns(
+            p_win=p_win[r, :n], p_place=p_place[r, :n], p_show=p_show[r, :n],
+            ci_low=ci_low[r, :n], ci_high=ci_high[r, :n],
+            place_odds_est=place_odds[r, :n], show_odds_est=show_odds[r, :n],
+            ev_win=ev_win[r, :n], ev_place=ev_place[r, :n], ev_show=ev_show[r, :n],
+            kelly_win=kelly_win[r, :n], kelly_place=kelly_place[r, :n], kelly_show=kelly_show[r, :n],
+            best_bet=best_bet[r, :n]
+        )
+        # Analytic derivatives cover the Harville path (the Henery/Stern tables are not differentiated)
+        sensitivity = None
+        if body.include_sensitivity and models[r] == "harville" and n >= 1:
+            sensitivity = build_sensitivity(
+                p_base[r, :n], odds[r, :n], labels[r], params=params,
+                recalibrator=snapshot.recalibrator if body.recalibrate else None
+            )
+        response = build_race_response(body, frame, models[r], sensitivity, snapshot.version)
+        response["meta"]["recalibrated"] = bool(body.recalibrate)
+        response["meta"]["ci_method"] = "bootstrap" if snapshot.ci_table is not None else "wilson"
+        if portfolios[r] is not None:
+            response["portfolio"] = portfolios[r]
+        if card is not None:
+            allocation = card["races"][r]
+            response["card_portfolio"] = {
+                "bets": build_portfolio(labels[r], allocation, *_pool_rows(r)),
+                "total": round(allocation["total"], 4)
+            }
+            response["_card"] = {
+                "total": round(card["total"], 4),
+                "growth": round(card["growth"], 6),
+                "exact": card["exact"],
+                "cap_binding": card["cap_binding"]
+            }
+        results.append(response)
+    _lap("assemble_ms")
+    
+    return results, timing
 
 
 @router.post("/api/finishline/ticket/predict")
@@ -83,135 +660,89 @@ async def ticket_predict(request: Request, body: TicketPredictRequest):
                 "rid": rid
             }, status_code=200)
         
-        # Parse ML odds
-        horses_data = []
-        decimal_odds = []
+        results, _ = predict_races([body], rid)
+        response = results[0]
         
-        for i, h in enumerate(body.horses):
-            parsed = parse_odds(h.ml_odds_raw)
-            if parsed:
-                horses_data.append({
-                    "index": i,
-                    "name": h.name,
-                    "ml_odds_raw": h.ml_odds_raw,
-                    "ml_decimal": parsed.decimal,
-                    "trainer": h.trainer,
-                    "jockey": h.jockey,
-                    "parsed": True
-                })
-                decimal_odds.append(parsed.decimal)
-            else:
-                # Missing/invalid odds - use field average as placeholder
-                log.warning(f"[{rid}] Could not parse odds for {h.name}: '{h.ml_odds_raw}'")
-                horses_data.append({
-                    "index": i,
-                    "name": h.name,
-                    "ml_odds_raw": h.ml_odds_raw,
-                    "ml_decimal": None,
-                    "trainer": h.trainer,
-                    "jockey": h.jockey,
-                    "parsed": False
-                })
-                decimal_odds.append(None)
-        
-        # Fill in missing odds with field average
-        valid_odds = [o for o in decimal_odds if o is not None]
-        if valid_odds:
-            avg_decimal = sum(valid_odds) / len(valid_odds)
-        else:
-            avg_decimal = 6.0  # Default if all odds missing
-        
-        decimal_odds = [o if o is not None else avg_decimal for o in decimal_odds]
-        
-        # Update horses_data with filled odds
-        for i, h in enumerate(horses_data):
-            if h["ml_decimal"] is None:
-                h["ml_decimal"] = decimal_odds[i]
-        
-        n_horses = len(horses_data)
+        elapsed_ms = int((time.perf_counter() - t0) * 1000)
+        log.info(f"[{rid}] ticket_predict success: {elapsed_ms}ms")
         
-        # Step 1: Get calibrated win probabilities
-        win_probs_with_ci = get_calibrated_win_probs(decimal_odds, n_horses)
-        p_win = [p[0] for p in win_probs_with_ci]
+        response["rid"] = rid
+        response["elapsed_ms"] = elapsed_ms
+        return JSONResponse(response, status_code=200)
+    
+    except Exception as e:
+        elapsed_ms = int((time.perf_counter() - t0) * 1000)
+        log.exception(f"[{rid}] ticket_predict failed")
+        return JSONResponse({
+            "ok": False,
+            "code": "predict_failed",
+            "message": f"Prediction failed: {str(e)[:200]}",
+            "rid": rid,
+            "elapsed_ms": elapsed_ms
+        }, status_code=200)  # Status 200 with ok:false
+
+
+@router.post("/api/finishline/ticket/predict_batch")
+async def ticket_predict_batch(request: Request, body: TicketPredictBatchRequest):
+    """
+    Ticket-Only predictions for a full card in one call.
+    
+    Every race is computed in one vectorized pass (calibration, place/show
+    and EV run once over a padded races×horses matrix). Each entry in
+    "races" has the same shape as a single /ticket/predict response; races
+    without horses come back as ok:false entries without failing the card.
+    """
+    rid = generate_request_id()
+    t0 = time.perf_counter()
+    
+    try:
+        log.info(f"[{rid}] ticket_predict_batch: {len(body.races)} races")
         
-        # Step 2: Compute place/show with Harville
-        harville_results = harville_place_show(p_win, use_stern=True)
+        if not body.races:
+            return JSONResponse({
+                "ok": False,
+                "code": "no_races",
+                "message": "No races provided",
+                "rid": rid
+            }, status_code=200)
         
-        # Step 3: Compute value metrics
-        for i, h in enumerate(horses_data):
-            probs = harville_results[i]
-            p_w, ci_low, ci_high = win_probs_with_ci[i]
-            
-            # Compute EV and Kelly
-            metrics = compute_value_metrics(
-                p_win=probs["p_win"],
-                p_place=probs["p_place"],
-                p_show=probs["p_show"],
-                win_odds=h["ml_decimal"]
-            )
-            
-            h.update({
-                "p_win": round(probs["p_win"], 4),
-                "p_place": round(probs["p_place"], 4),
-                "p_show": round(probs["p_show"], 4),
-                "p_win_ci": [round(ci_low, 4), round(ci_high, 4)],
-                **metrics
-            })
+        if len(body.races) > MAX_BATCH_RACES:
+            return JSONResponse({
+                "ok": False,
+                "code": "too_many_races",
+                "message": f"At most {MAX_BATCH_RACES} races per batch",
+                "rid": rid
+            }, status_code=200)
         
-        # Rank horses
-        sorted_by_win = sorted(horses_data, key=lambda x: x["p_win"], reverse=True)
-        sorted_by_ev = sorted([h for h in horses_data if h.get("ev_win", -999) > 0], 
-                             key=lambda x: x["ev_win"], reverse=True)
-        sorted_by_kelly = sorted([h for h in horses_data if h.get("kelly_win", 0) > 0], 
-                                key=lambda x: x["kelly_win"], reverse=True)
+        runnable = [i for i, race in enumerate(body.races) if race.horses]
+        races = [
+            {"ok": False, "code": "no_horses", "message": "No horses provided"}
+            for _ in body.races
+        ]
         
-        # Assign ranks
-        for rank, h in enumerate(sorted_by_win, 1):
-            h["rank_win"] = rank
-        for rank, h in enumerate(sorted_by_ev, 1):
-            h["rank_value"] = rank
-        for rank, h in enumerate(sorted_by_kelly, 1):
-            h["rank_kelly"] = rank
+        timing = {}
+        card_portfolio = None
+        snapshot = artifacts.current()
+        if runnable:
+            results, timing = predict_races([body.races[i] for i in runnable], rid, snapshot, body.card_kelly)
+            for i, result in zip(runnable, results):
+                card_portfolio = result.pop("_card", None) or card_portfolio
+                races[i] = result
         
-        # Build response
         elapsed_ms = int((time.perf_counter() - t0) * 1000)
-        log.info(f"[{rid}] ticket_predict success: {elapsed_ms}ms")
+        log.info(f"[{rid}] ticket_predict_batch success: {len(runnable)}/{len(body.races)} races, {elapsed_ms}ms")
         
         return JSONResponse({
             "ok": True,
-            "mode": "ticket-only",
-            "meta": {
-                "track": body.race.track,
-                "date": body.race.date,
-                "surface": body.race.surface,
-                "distance": body.race.distance,
-                "n_horses": n_horses
-            },
-            "horses": horses_data,
-            "summary": {
-                "top_win": [h["name"] for h in sorted_by_win[:3]],
-                "top_value": [h["name"] for h in sorted_by_ev[:3]],
-                "top_kelly": [h["name"] for h in sorted_by_kelly[:3]]
-            },
-            "predictions": {
-                "win": {
-                    "name": sorted_by_win[0]["name"],
-                    "prob": sorted_by_win[0]["p_win"],
-                    "ev": sorted_by_win[0]["ev_win"],
-                    "kelly": sorted_by_win[0]["kelly_win"]
-                } if sorted_by_win else None,
-                "place": {
-                    "name": sorted_by_win[1]["name"],
-                    "prob": sorted_by_win[1]["p_place"],
-                    "ev": sorted_by_win[1].get("ev_place"),
-                    "kelly": sorted_by_win[1].get("kelly_place")
-                } if len(sorted_by_win) > 1 else None,
-                "show": {
-                    "name": sorted_by_win[2]["name"],
-                    "prob": sorted_by_win[2]["p_show"],
-                    "ev": sorted_by_win[2].get("ev_show"),
-                    "kelly": sorted_by_win[2].get("kelly_show")
-                } if len(sorted_by_win) > 2 else None
+            "mode": "ticket-only-batch",
+            "artifact_version": snapshot.version,
+            "n_races": len(body.races),
+            "races": races,
+            **({"card_portfolio": card_portfolio} if card_portfolio is not None else {}),
+            "timing": {
+                **timing,
+                "n_horses": sum(len(body.races[i].horses) for i in runnable),
+                "ms_per_race": round(elapsed_ms / len(body.races), 3)
             },
             "rid": rid,
             "elapsed_ms": elapsed_ms
@@ -219,12 +750,271 @@ async def ticket_predict(request: Request, body: TicketPredictRequest):
     
     except Exception as e:
         elapsed_ms = int((time.perf_counter() - t0) * 1000)
-        log.exception(f"[{rid}] ticket_predict failed")
+        log.exception(f"[{rid}] ticket_predict_batch failed")
         return JSONResponse({
             "ok": False,
             "code": "predict_failed",
-            "message": f"Prediction failed: {str(e)[:200]}",
+            "message": f"Batch prediction failed: {str(e)[:200]}",
             "rid": rid,
             "elapsed_ms": elapsed_ms
-        }, status_code=200)  # Status 200 with ok:false
+        }, status_code=200)
+
+
+def create_race_session(body: TicketPredictRequest, rid: str) -> RaceSession:
+    """
+    Build and register a live session from a ticket request.
+    
+    The session is pinned to the current artifact snapshot, so its
+    incremental state never mixes two parameter versions.
+    
+    Args:
+        body: Race request (horses with ML odds)
+        rid: Request ID (for logging)
+    
+    Returns:
+        Registered RaceSession
+    """
+    frame = parse_ticket_horses(body.horses, rid)
+    coupling = couple_ticket_frame(frame, body.couple_by_trainer, rid)
+    snapshot = artifacts.current()
+    session = RaceSession(
+        frame.names,
+        frame.horse_odds(),
+        ordering_model=resolve_ordering_model(body.ordering_model),
+        algorithm=HARVILLE_ALGORITHM,
+        interest_of=coupling["interest_of"],
+        entry_ids=coupling["index_to_entry"],
+        params=snapshot.params,
+        artifact_version=snapshot.version,
+        ci_table=snapshot.ci_table
+    )
+    return sessions.add(session)
+
+
+def resolve_horse_index(session: RaceSession, index: Optional[int], name: Optional[str]) -> Optional[int]:
+    """Horse index in a session by explicit index or (case-insensitive) name."""
+    if index is not None:
+        return index if 0 <= index < session.n_horses else None
+    wanted = (name or "").strip().lower()
+    for i, horse_name in enumerate(session.names):
+        if horse_name.strip().lower() == wanted:
+            return i
+    return None
+
+
+def resolve_odds_updates(
+    session: RaceSession,
+    updates: List[OddsUpdate]
+) -> Tuple[Dict[int, float], List[int], List[Dict[str, Any]]]:
+    """
+    Map odds updates to {index: decimal odds} and scratches ("SCR", "WD"),
+    collecting the ones that cannot apply.
+    
+    Args:
+        session: Target session
+        updates: Requested changes
+    
+    Returns:
+        (changes, scratches, rejected) where rejected items carry a reason
+    """
+    changes = {}
+    scratches = []
+    rejected = []
+    
+    for u in updates:
+        i = resolve_horse_index(session, u.index, u.name)
+        if i is None:
+            rejected.append({"index": u.index, "name": u.name, "reason": "unknown_horse"})
+            continue
+        if session.interest_of[i] is None:
+            rejected.append({"index": i, "name": session.names[i], "reason": "scratched"})
+            continue
+        if is_scratch(u.ml_odds_raw):
+            scratches.append(i)
+            continue
+        
+        parsed = parse_odds(u.ml_odds_raw)
+        if not parsed:
+            rejected.append({"index": i, "name": session.names[i], "reason": "unparsable_odds"})
+            continue
+        changes[i] = parsed.decimal
+    
+    return changes, scratches, rejected
+
+
+@router.post("/api/finishline/ticket/session")
+async def ticket_session_create(request: Request, body: TicketPredictRequest):
+    """
+    Open a live race session for incremental odds updates.
+    
+    Returns a session_id plus the starting probabilities; send odds deltas
+    to /api/finishline/ticket/session/{session_id}/odds afterwards.
+    """
+    rid = generate_request_id()
+    t0 = time.perf_counter()
+    
+    if not body.horses:
+        return JSONResponse({
+            "ok": False,
+            "code": "no_horses",
+            "message": "No horses provided",
+            "rid": rid
+        }, status_code=200)
+    
+    try:
+        session = create_race_session(body, rid)
+        elapsed_ms = int((time.perf_counter() - t0) * 1000)
+        log.info(f"[{rid}] ticket_session created {session.session_id}: {session.n_horses} horses")
+        
+        return JSONResponse({
+            "ok": True,
+            "session_id": session.session_id,
+            "version": session.version,
+            "ordering_model": session.ordering_model,
+            "artifact_version": session.artifact_version,
+            "horses": session.snapshot(),
+            "rid": rid,
+            "elapsed_ms": elapsed_ms
+        }, status_code=200)
+    
+    except Exception as e:
+        elapsed_ms = int((time.perf_counter() - t0) * 1000)
+        log.exception(f"[{rid}] ticket_session create failed")
+        return JSONResponse({
+            "ok": False,
+            "code": "session_failed",
+            "message": f"Session create failed: {str(e)[:200]}",
+            "rid": rid,
+            "elapsed_ms": elapsed_ms
+        }, status_code=200)
+
+
+@router.post("/api/finishline/ticket/session/{session_id}/odds")
+async def ticket_session_odds(request: Request, session_id: str, body: OddsDeltaRequest):
+    """
+    Apply odds deltas to a live session and return the new probabilities.
+    
+    Only the changed horses are re-parsed and re-implied; compute_us is the
+    time spent recomputing the race (excluding HTTP and JSON overhead).
+    """
+    rid = generate_request_id()
+    
+    session = sessions.get(session_id)
+    if session is None:
+        return JSONResponse({
+            "ok": False,
+            "code": "session_not_found",
+            "message": f"Unknown or expired session: {session_id}",
+            "rid": rid
+        }, status_code=200)
+    
+    try:
+        with session.lock:
+            t0 = time.perf_counter()
+            changes, scratches, rejected = resolve_odds_updates(session, body.updates)
+            scratched = session.scratch(scratches)
+            changed = session.apply_odds(changes)
+            compute_us = int((time.perf_counter() - t0) * 1e6)
+            horses = session.snapshot()
+            version = session.version
+        if changed or scratched:
+            sessions.updated(session, {"changed": changed, "scratched": scratched, "compute_us": compute_us})
+        
+        return JSONResponse({
+            "ok": True,
+            "session_id": session_id,
+            "version": version,
+            "artifact_version": session.artifact_version,
+            "changed": changed,
+            "scratched": scratched,
+            "rejected": rejected,
+            "horses": horses,
+            "compute_us": compute_us,
+            "rid": rid
+        }, status_code=200)
+    
+    except Exception as e:
+        log.exception(f"[{rid}] ticket_session odds update failed")
+        return JSONResponse({
+            "ok": False,
+            "code": "session_update_failed",
+            "message": f"Odds update failed: {str(e)[:200]}",
+            "rid": rid
+        }, status_code=200)
+
+
+@router.post("/api/finishline/ticket/session/{session_id}/scratch")
+async def ticket_session_scratch(request: Request, session_id: str, body: ScratchRequest):
+    """
+    Scratch horses from a live session.
+    
+    The cached field is renormalized in place (coupled entries keep running
+    on their remaining horses); the client does not resend the race.
+    """
+    rid = generate_request_id()
+    
+    session = sessions.get(session_id)
+    if session is None:
+        return JSONResponse({
+            "ok": False,
+            "code": "session_not_found",
+            "message": f"Unknown or expired session: {session_id}",
+            "rid": rid
+        }, status_code=200)
+    
+    targets = [(i, None) for i in body.indices] + [(None, name) for name in body.names]
+    
+    try:
+        with session.lock:
+            t0 = time.perf_counter()
+            indices, rejected = [], []
+            for index, name in targets:
+                i = resolve_horse_index(session, index, name)
+                if i is None:
+                    rejected.append({"index": index, "name": name, "reason": "unknown_horse"})
+                else:
+                    indices.append(i)
+            scratched = session.scratch(indices)
+            compute_us = int((time.perf_counter() - t0) * 1e6)
+            horses = session.snapshot()
+            version = session.version
+        if scratched:
+            sessions.updated(session, {"changed": [], "scratched": scratched, "compute_us": compute_us})
+        
+        return JSONResponse({
+            "ok": True,
+            "session_id": session_id,
+            "version": version,
+            "artifact_version": session.artifact_version,
+            "scratched": scratched,
+            "rejected": rejected,
+            "horses": horses,
+            "compute_us": compute_us,
+            "rid": rid
+        }, status_code=200)
+    
+    except Exception as e:
+        log.exception(f"[{rid}] ticket_session scratch failed")
+        return JSONResponse({
+            "ok": False,
+            "code": "session_update_failed",
+            "message": f"Scratch failed: {str(e)[:200]}",
+            "rid": rid
+        }, status_code=200)
+
+
+@router.delete("/api/finishline/ticket/session/{session_id}")
+async def ticket_session_close(session_id: str):
+    """Close a live session."""
+    return JSONResponse({"ok": sessions.remove(session_id), "session_id": session_id}, status_code=200)
+
 
+@router.get("/api/finishline/artifacts")
+async def artifacts_status():
+    """Loaded model artifact versions (per file and combined) and reload counters."""
+    return JSONResponse({
+        "ok": True,
+        **artifacts.current().describe(),
+        "reloads": artifacts.reloads,
+        "failures": artifacts.failures
+    }, status_code=200)
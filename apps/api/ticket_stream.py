@@ -0,0 +1,247 @@
+"""
+Live odds stream for ticket-only sessions (Server-Sent Events).
+
+Clients open a race session (POST /api/finishline/ticket/session), subscribe
+to its event stream, and push tote odds ticks. Ticks that arrive within the
+coalescing window are merged (latest odds per horse win) and the race is
+recomputed once, then the new W/P/S probabilities, EV and Kelly fractions
+are pushed to every subscriber. Updates made through the REST /odds and
+/scratch endpoints are pushed too, and a stream ends with a "closed" event
+when its session is closed, evicted or expires.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Any, List, Optional, Sequence, Set
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    from .ticket_predict import sessions, resolve_odds_updates, OddsDeltaRequest
+    from .predict.session import RaceSession
+    from .config import STREAM_COALESCE_MS, STREAM_KEEPALIVE_S, STREAM_QUEUE_SIZE
+    from .retry_utils import generate_request_id
+except ImportError:
+    # Fallback imports (if running standalone)
+    from ticket_predict import sessions, resolve_odds_updates, OddsDeltaRequest
+    from predict.session import RaceSession
+    from config import STREAM_COALESCE_MS, STREAM_KEEPALIVE_S, STREAM_QUEUE_SIZE
+    from retry_utils import generate_request_id
+
+log = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class RaceStream:
+    """Coalesces odds ticks for one session and fans results out to subscribers."""
+
+    def __init__(self, session: RaceSession, coalesce_ms: float = STREAM_COALESCE_MS):
+        self.session = session
+        self.coalesce_s = max(0.0, coalesce_ms) / 1000.0
+        self.subscribers: List[asyncio.Queue] = []
+        self._pending: Dict[int, float] = {}
+        self._pending_scratches: Set[int] = set()
+        self._pending_ticks = 0
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def push(self, changes: Dict[int, float], scratches: Sequence[int] = ()) -> None:
+        """Queue odds changes and scratches; schedules one recompute per coalescing window."""
+        if not changes and not scratches:
+            return
+        self._pending.update(changes)
+        self._pending_scratches.update(scratches)
+        for i in scratches:
+            self._pending.pop(i, None)
+        self._pending_ticks += 1
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.coalesce_s)
+        try:
+            self.flush()
+        except Exception:
+            log.exception(f"[{self.session.session_id}] stream flush failed; pending ticks dropped")
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """Apply all pending changes at once and broadcast the result."""
+        if not self._pending and not self._pending_scratches:
+            return None
+        changes, scratches, ticks = self._pending, self._pending_scratches, self._pending_ticks
+        self._pending, self._pending_scratches, self._pending_ticks = {}, set(), 0
+
+        with self.session.lock:
+            t0 = time.perf_counter()
+            scratched = self.session.scratch(sorted(scratches))
+            changed = self.session.apply_odds(changes)
+            compute_us = int((time.perf_counter() - t0) * 1e6)
+            event = self.snapshot_event()
+
+        event.update({"changed": changed, "scratched": scratched, "ticks": ticks, "compute_us": compute_us})
+        self.broadcast(event)
+        return event
+
+    def publish(self, details: Dict[str, Any]) -> None:
+        """Broadcast the session's current state after a change made outside the stream."""
+        with self.session.lock:
+            event = self.snapshot_event()
+        event.update({"ticks": 0, **details})
+        self.broadcast(event)
+
+    def close(self) -> None:
+        """Drop pending ticks and tell every subscriber the session is gone."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        self._pending, self._pending_scratches, self._pending_ticks = {}, set(), 0
+        self.broadcast(CLOSED)
+
+    def snapshot_event(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session.session_id,
+            "version": self.session.version,
+            "ordering_model": self.session.ordering_model,
+            "artifact_version": self.session.artifact_version,
+            "horses": self.session.snapshot()
+        }
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+    def broadcast(self, event: Dict[str, Any]) -> None:
+        """Deliver to every subscriber; a slow client drops its oldest update."""
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+# Sentinel event ending a subscriber's stream
+CLOSED: Dict[str, Any] = {"closed": True}
+
+# Streams by session id (created on first subscribe/tick, dropped with the session)
+streams: Dict[str, RaceStream] = {}
+
+
+def drop_stream(session_id: str) -> None:
+    """Forget a session's stream and end its subscribers (the session left the store)."""
+    stream = streams.pop(session_id, None)
+    if stream is not None:
+        stream.close()
+
+
+def publish_update(session: RaceSession, details: Dict[str, Any]) -> None:
+    """Push a REST odds/scratch update to the session's subscribers, if it has a stream."""
+    stream = streams.get(session.session_id)
+    if stream is not None and stream.session is session:
+        stream.publish(details)
+
+
+sessions.on_evict(drop_stream)
+sessions.on_update(publish_update)
+
+
+def get_stream(session_id: str) -> Optional[RaceStream]:
+    """Stream for a live session, or None if the session is gone."""
+    session = sessions.get(session_id)
+    if session is None:
+        drop_stream(session_id)
+        return None
+    stream = streams.get(session_id)
+    if stream is None or stream.session is not session:
+        stream = streams[session_id] = RaceStream(session)
+    return stream
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@router.get("/api/finishline/ticket/session/{session_id}/stream")
+async def ticket_session_stream(request: Request, session_id: str):
+    """
+    Subscribe to recomputed predictions for a live session (text/event-stream).
+
+    Sends a "snapshot" event immediately, then a "prediction" event per
+    coalesced batch of ticks or REST update, with ": keepalive" comments
+    while idle. Ends with a "closed" event once the session is gone.
+    """
+    stream = get_stream(session_id)
+    if stream is None:
+        return JSONResponse({
+            "ok": False,
+            "code": "session_not_found",
+            "message": f"Unknown or expired session: {session_id}",
+            "rid": generate_request_id()
+        }, status_code=200)
+
+    queue = stream.subscribe()
+
+    async def events():
+        try:
+            with stream.session.lock:
+                snapshot = stream.snapshot_event()
+            yield format_sse("snapshot", snapshot)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    if sessions.get(session_id) is not stream.session:
+                        event = CLOSED
+                    else:
+                        yield ": keepalive\n\n"
+                        continue
+                if event is CLOSED:
+                    yield format_sse("closed", {"session_id": session_id})
+                    break
+                yield format_sse("prediction", event)
+        finally:
+            stream.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/api/finishline/ticket/session/{session_id}/ticks")
+async def ticket_session_ticks(request: Request, session_id: str, body: OddsDeltaRequest):
+    """
+    Push tote odds ticks into a live session's stream.
+
+    Returns immediately; the recompute happens once per coalescing window
+    and is delivered to stream subscribers.
+    """
+    rid = generate_request_id()
+
+    stream = get_stream(session_id)
+    if stream is None:
+        return JSONResponse({
+            "ok": False,
+            "code": "session_not_found",
+            "message": f"Unknown or expired session: {session_id}",
+            "rid": rid
+        }, status_code=200)
+
+    changes, scratches, rejected = resolve_odds_updates(stream.session, body.updates)
+    stream.push(changes, scratches)
+
+    return JSONResponse({
+        "ok": True,
+        "session_id": session_id,
+        "queued": len(changes) + len(scratches),
+        "rejected": rejected,
+        "subscribers": len(stream.subscribers),
+        "rid": rid
+    }, status_code=200)
@@ -0,0 +1,158 @@
+"""
+Local tote-feed simulator for exercising the live odds stream.
+
+Simulates win-pool money moving between horses (random walk on log pool
+shares) and reports tote odds after takeout. Use it in-process via
+ToteFeedSimulator, or against a running server:
+
+    python -m apps.api.tote_sim --base-url http://localhost:8000 --horses 10 --interval-ms 200
+"""
+import argparse
+import asyncio
+import json
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+try:
+    from .predict.pools import DEFAULT_TAKEOUT
+except ImportError:
+    from predict.pools import DEFAULT_TAKEOUT
+
+# Lowest odds the board shows (1-20)
+MIN_DECIMAL_ODDS = 1.05
+
+
+class ToteFeedSimulator:
+    """Seeded win-pool random walk producing tote odds ticks."""
+
+    def __init__(
+        self,
+        n_horses: int = 10,
+        seed: int = 0,
+        takeout: float = DEFAULT_TAKEOUT,
+        volatility: float = 0.08,
+        tick_fraction: float = 0.3
+    ):
+        """
+        Args:
+            n_horses: Field size
+            seed: RNG seed (same seed, same feed)
+            takeout: Pool takeout used to turn shares into odds
+            volatility: Std-dev of each log-share move per tick
+            tick_fraction: Share of horses whose money moves on each tick
+        """
+        self.rng = np.random.default_rng(seed)
+        self.takeout = takeout
+        self.volatility = volatility
+        self.tick_fraction = tick_fraction
+        self.names = [f"Horse {i + 1}" for i in range(n_horses)]
+        self.log_share = np.log(self.rng.dirichlet(np.full(n_horses, 1.5)))
+        self._board = self.board()
+
+    def board(self) -> List[str]:
+        """Current tote odds as displayed decimal strings."""
+        share = np.exp(self.log_share - self.log_share.max())
+        share /= share.sum()
+        decimal = np.maximum((1.0 - self.takeout) / share, MIN_DECIMAL_ODDS)
+        return [f"{d:.2f}" for d in decimal]
+
+    def race_request(self, track: str = "SIM") -> Dict[str, Any]:
+        """Ticket request body for opening a session on this field."""
+        return {
+            "race": {"track": track},
+            "horses": [
+                {"name": name, "ml_odds_raw": odds}
+                for name, odds in zip(self.names, self._board)
+            ]
+        }
+
+    def tick(self) -> List[Dict[str, Any]]:
+        """
+        Advance one refresh and return the horses whose displayed odds changed.
+
+        Returns:
+            [{index, ml_odds_raw}] (possibly empty)
+        """
+        n = len(self.names)
+        moving = self.rng.random(n) < self.tick_fraction
+        self.log_share = self.log_share + moving * self.rng.normal(0.0, self.volatility, n)
+
+        board = self.board()
+        updates = [
+            {"index": i, "ml_odds_raw": odds}
+            for i, (odds, old) in enumerate(zip(board, self._board))
+            if odds != old
+        ]
+        self._board = board
+        return updates
+
+
+async def run_feed(
+    base_url: str,
+    n_horses: int = 10,
+    interval_ms: float = 200.0,
+    ticks: int = 50,
+    seed: int = 0
+) -> None:
+    """
+    Drive a running server: open a session, stream predictions, push ticks.
+
+    Args:
+        base_url: API root (e.g. http://localhost:8000)
+        n_horses: Field size
+        interval_ms: Delay between tote refreshes
+        ticks: Number of refreshes to send
+        seed: Feed seed
+    """
+    import httpx
+
+    sim = ToteFeedSimulator(n_horses=n_horses, seed=seed)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        created = (await client.post("/api/finishline/ticket/session", json=sim.race_request())).json()
+        if not created.get("ok"):
+            print(f"Session create failed: {created}")
+            return
+        session_id = created["session_id"]
+        print(f"Session {session_id} opened ({n_horses} horses)")
+
+        async def listen():
+            event: Optional[str] = None
+            async with client.stream("GET", f"/api/finishline/ticket/session/{session_id}/stream") as resp:
+                async for line in resp.aiter_lines():
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data = json.loads(line[5:])
+                        top = max(data["horses"], key=lambda h: h["p_win"])
+                        print(
+                            f"[{event}] v{data['version']} ticks={data.get('ticks', 0)} "
+                            f"compute={data.get('compute_us', 0)}us top={top['name']} p_win={top['p_win']}"
+                        )
+
+        listener = asyncio.create_task(listen())
+        try:
+            for _ in range(ticks):
+                await asyncio.sleep(interval_ms / 1000.0)
+                updates = sim.tick()
+                if updates:
+                    await client.post(
+                        f"/api/finishline/ticket/session/{session_id}/ticks",
+                        json={"updates": updates}
+                    )
+            await asyncio.sleep(1.0)
+        finally:
+            listener.cancel()
+            await client.delete(f"/api/finishline/ticket/session/{session_id}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated tote feed for the live odds stream")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--horses", type=int, default=10)
+    parser.add_argument("--interval-ms", type=float, default=200.0)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run_feed(args.base_url, args.horses, args.interval_ms, args.ticks, args.seed))
@@ -0,0 +1,112 @@
+"""
+Tests for the hot-reloadable artifact registry.
+"""
+import json
+import os
+import shutil
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from apps.api.predict.artifacts import ARTIFACT_FILES, ArtifactRegistry, default_artifact_paths
+from apps.api.predict.params import DEFAULT_PARAMS
+from apps.api.ticket_predict import TicketPredictRequest, artifacts, predict_races, router
+
+
+RACE = {
+    "race": {},
+    "horses": [{"name": f"H{i}", "ml_odds_raw": o} for i, o in enumerate(["5/2", "3/1", "9/2", "8/1", "15/1"])],
+}
+
+
+def _registry(tmp_path):
+    for name, filename in ARTIFACT_FILES.items():
+        src = default_artifact_paths()[name]
+        if os.path.exists(src):
+            shutil.copy(src, tmp_path / filename)
+    return ArtifactRegistry(default_artifact_paths(str(tmp_path)))
+
+
+def _write(path, doc, bump):
+    path.write_text(json.dumps(doc))
+    os.utime(path, ns=(bump, bump))
+
+
+def test_snapshot_lookups():
+    """Reliability interpolation and band lookups follow the checked-in artifacts."""
+    snap = ArtifactRegistry().current()
+
+    # model_params.json: (0.64, 0.5) ... (0.72, 1.0), clamped outside
+    assert snap.reliability(0.10) == 0.5
+    assert abs(snap.reliability(0.65) - (0.5 + 0.7777777777777778) / 2) <= 1e-12
+    assert snap.reliability(0.90) == 1.0
+    assert snap.policy_for(50)["band"] == "60-64"
+    assert snap.policy_for(77)["band"] == "75-79"
+    assert snap.stake_for(72) == 2.0
+    assert snap.bin_for(99)["bin"] == "85+"
+    assert snap.signal_score({"confidence": 80, "top3_mass": 50}) == 0.5 * 80 + 0.3 * 50
+
+
+def test_reload_swaps_atomically(tmp_path):
+    """A new fitted-params file is picked up on reload; a broken file keeps the old snapshot."""
+    registry = _registry(tmp_path)
+    before = registry.current()
+    assert registry.reload() is False
+
+    fitted = tmp_path / ARTIFACT_FILES["fitted_params"]
+    _write(fitted, {"version": "fit-a", "params": dict(DEFAULT_PARAMS, stern_exponent=0.8)}, 1)
+    assert registry.reload() is True
+    after = registry.current()
+    assert after.version != before.version
+    assert after.params["stern_exponent"] == 0.8
+    assert after.sources["fitted_params"]["version"] == "fit-a"
+
+    old, new = (
+        predict_races([TicketPredictRequest(**RACE)], "test", snap)[0][0]
+        for snap in (before, after)
+    )
+    assert new["meta"]["artifact_version"] == after.version
+    # γ discounts the lower places only: p_win stays the calibrated value
+    assert [h["p_win"] for h in old["horses"]] == [h["p_win"] for h in new["horses"]]
+    assert [h["p_place"] for h in old["horses"]] != [h["p_place"] for h in new["horses"]]
+
+    fitted.write_text("{not json")
+    os.utime(fitted, ns=(2, 2))
+    assert registry.reload() is False
+    assert registry.current() is after
+    assert registry.failures == 1
+
+
+def test_responses_report_artifact_version():
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        version = artifacts.current().version
+        assert client.post("/api/finishline/ticket/predict", json=RACE).json()["meta"]["artifact_version"] == version
+        session = client.post("/api/finishline/ticket/session", json=RACE).json()
+        assert session["artifact_version"] == version
+        status = client.get("/api/finishline/artifacts").json()
+        assert status["version"] == version and "model_params" in status["sources"]
+
+
+def test_app_endpoints_take_one_snapshot_per_request(monkeypatch):
+    """predict and research_predict read one snapshot per request and report its version."""
+    from apps.api.api_main import app as main_app
+
+    taken = []
+    current = artifacts.current
+    monkeypatch.setattr(artifacts, "current", lambda: taken.append(1) or current())
+
+    horses = [{"name": n, "odds": o} for n, o in zip("ABCD", ["2-1", "3-1", "5-1", "8-1"])]
+    requests = [
+        ("/api/finishline/predict", {"horses": horses}),
+        ("/api/finishline/research_predict", {"horses": horses, "provider": "stub"}),
+        ("/api/finishline/research_predict", {"horses": horses, "provider": "custom", "depth": "quick", "recalibrate": True}),
+    ]
+    client = TestClient(main_app)
+    for path, body in requests:
+        taken.clear()
+        out = client.post(path, json=body).json()
+        assert out["meta"]["artifact_version"] == current().version
+        assert len(taken) == 1
+    assert out["recalibration"]["artifact_version"] == out["meta"]["artifact_version"]
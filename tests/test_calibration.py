@@ -0,0 +1,62 @@
+"""
+Parity tests for the vectorized calibration pipeline.
+Compares get_calibrated_win_probs (now a one-row calibrate_win_matrix call)
+against the original step-by-step scalar helpers.
+"""
+import math
+import random
+
+import pytest
+
+from apps.api.predict.calibration import (
+    FIELD_SIZE_ALPHA,
+    MAX_PROB,
+    MIN_PROB,
+    base_implied_from_odds,
+    benchmark,
+    empirical_calibration,
+    get_calibrated_win_probs,
+    overround_correction,
+)
+from apps.api.predict.odds import field_size_adjust
+
+
+def _reference(odds, n_horses, alpha=FIELD_SIZE_ALPHA):
+    """The original five list passes."""
+    p_raw = [base_implied_from_odds(o) for o in odds]
+    p_final = field_size_adjust(empirical_calibration(overround_correction(p_raw)), n_horses, alpha)
+
+    z, n_trials = 1.96, 100
+    out = []
+    for p in p_final:
+        p_safe = max(MIN_PROB, min(1 - MIN_PROB, p))
+        denominator = 1 + (z**2 / n_trials)
+        center = (p_safe + (z**2 / (2 * n_trials))) / denominator
+        margin = (z * math.sqrt((p_safe * (1 - p_safe) / n_trials) + (z**2 / (4 * n_trials**2)))) / denominator
+        out.append((p, max(MIN_PROB, center - margin), min(MAX_PROB, center + margin)))
+    return out
+
+
+@pytest.mark.parametrize("extra_field", [0, 2])
+def test_matches_scalar_pipeline(extra_field):
+    """Same numbers as the scalar helpers, including invalid odds and n_horses != len."""
+    rng = random.Random(11)
+    for _ in range(300):
+        n = rng.randint(1, 16)
+        odds = [1.0 + rng.expovariate(1 / 8.0) for _ in range(n)]
+        if rng.random() < 0.2:
+            odds[0] = 1.0  # invalid → MAX_PROB
+        got = get_calibrated_win_probs(odds, n + extra_field)
+        for a, b in zip(got, _reference(odds, n + extra_field)):
+            assert all(abs(x - y) <= 1e-15 for x, y in zip(a, b))
+
+
+def test_empty_inputs():
+    assert get_calibrated_win_probs([], 0) == []
+    assert get_calibrated_win_probs([3.0, 4.0], 0) == []
+
+
+def test_benchmark_reports_throughput():
+    result = benchmark(n_races=200, n_horses=10)
+    assert result["n_races"] == 200
+    assert result["batch_races_per_s"] > 0 and result["single_races_per_s"] > 0
@@ -0,0 +1,133 @@
+"""
+Tests for coupled-entry detection, per-interest collapse and scratches.
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from apps.api.predict.odds import detect_coupled_entries, program_base
+from apps.api.ticket_predict import router
+
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+KEYS = ("p_win", "p_place", "p_show", "ev_win", "kelly_win")
+
+
+def _predict(horses, **extra):
+    return client.post("/api/finishline/ticket/predict", json={"race": {}, "horses": horses, **extra}).json()
+
+
+def test_program_base():
+    assert program_base("1") == "1"
+    assert program_base("1A") == "1"
+    assert program_base(" 01x ") == "1"
+    assert program_base("A") is None
+    assert program_base("") is None
+
+
+def test_detect_program_and_owner_coupling():
+    """1/1A share an interest; same owner couples too; scratches are left out."""
+    horses = [
+        {"name": "Alpha", "program": "1", "ml_decimal": 3.5},
+        {"name": "Bravo", "program": "1A", "ml_decimal": 3.5},
+        {"name": "Charlie", "program": "2", "owner": "Oak Stable", "ml_decimal": 5.0},
+        {"name": "Delta", "program": "3", "owner": "oak stable", "ml_decimal": 9.0},
+        {"name": "Echo", "program": "4", "scratched": True},
+        {"name": "Foxtrot", "program": "5", "ml_decimal": 7.0},
+    ]
+    coupling = detect_coupled_entries(horses)
+
+    assert coupling["has_coupled"] is True
+    assert coupling["interests"] == [[0, 1], [2, 3], [5]]
+    assert coupling["interest_of"] == [0, 0, 1, 1, None, 2]
+    assert coupling["entries"][0]["combined_odds"] == 3.5
+    assert abs(coupling["entries"][1]["combined_odds"] - 1.0 / (1 / 5.0 + 1 / 9.0)) <= 1e-12
+
+    assert detect_coupled_entries(horses[2:4], couple_by_trainer=True)["has_coupled"] is True
+    assert detect_coupled_entries([{"name": "A", "trainer": "T"}, {"name": "B", "trainer": "T"}])["has_coupled"] is False
+
+
+def test_duplicate_rows_are_not_an_entry():
+    """A repeated name is a duplicate row: dropped from the field, not coupled into a synthetic entry."""
+    field = [
+        {"name": "Alpha", "program": "1", "ml_odds_raw": "5/2"},
+        {"name": "Charlie", "program": "2", "ml_odds_raw": "4/1"},
+        {"name": "Delta", "program": "3", "ml_odds_raw": "6/1"},
+    ]
+    coupling = detect_coupled_entries([
+        {"name": "Alpha", "program": "1"}, {"name": "alpha ", "program": "7"}, {"name": "Charlie", "program": "2"},
+    ])
+    assert coupling["has_coupled"] is False
+    assert coupling["interests"] == [[0], [2]]
+    assert coupling["duplicates"] == {1: 0}
+
+    duplicated = _predict(field + [{"name": "Alpha", "program": "1", "ml_odds_raw": "5/2"}])
+    single = _predict(field)
+    assert duplicated["meta"]["n_interests"] == 3 and duplicated["meta"]["n_duplicates"] == 1
+    assert duplicated["meta"]["n_horses"] == 3
+    assert "entry_id" not in duplicated["horses"][0]
+    assert duplicated["horses"][3]["duplicate_of"] == 0 and duplicated["horses"][3]["p_win"] == 0.0
+    for a, b in zip(duplicated["horses"], single["horses"]):
+        for key in KEYS:
+            assert a[key] == b[key]
+
+
+def test_entry_predicts_as_one_interest():
+    """A 1/1A entry gets the same numbers as a single horse at the entry's odds."""
+    field = [("Charlie", "2", "4/1"), ("Delta", "3", "6/1"), ("Echo", "4", "10/1")]
+    rest = [{"name": n, "program": p, "ml_odds_raw": o} for n, p, o in field]
+
+    coupled = _predict([
+        {"name": "Alpha", "program": "1", "ml_odds_raw": "5/2"},
+        {"name": "Bravo", "program": "1A", "ml_odds_raw": "5/2"},
+    ] + rest)
+    single = _predict([{"name": "Alpha", "program": "1", "ml_odds_raw": "5/2"}] + rest)
+
+    assert coupled["meta"]["n_interests"] == 4
+    assert coupled["horses"][0]["entry_id"] == coupled["horses"][1]["entry_id"] == "1"
+    for key in KEYS + ("rank_win",):
+        assert coupled["horses"][0][key] == coupled["horses"][1][key] == single["horses"][0][key]
+    for a, b in zip(coupled["horses"][2:], single["horses"][1:]):
+        for key in KEYS:
+            assert a[key] == b[key]
+    assert len(set(coupled["summary"]["top_win"])) == len(coupled["summary"]["top_win"])
+
+
+def test_session_scratch_matches_fresh_predict():
+    """Scratching in a session equals predicting the smaller field from scratch."""
+    horses = [
+        {"name": "Alpha", "program": "1", "ml_odds_raw": "5/2"},
+        {"name": "Bravo", "program": "1A", "ml_odds_raw": "5/2"},
+        {"name": "Charlie", "program": "2", "ml_odds_raw": "4/1"},
+        {"name": "Delta", "program": "3", "ml_odds_raw": "6/1"},
+        {"name": "Echo", "program": "4", "ml_odds_raw": "10/1"},
+    ]
+    session = client.post("/api/finishline/ticket/session", json={"race": {}, "horses": horses}).json()
+    sid = session["session_id"]
+
+    # Scratching one half of the entry leaves the interest running
+    res = client.post(f"/api/finishline/ticket/session/{sid}/scratch", json={"names": ["bravo"]}).json()
+    assert res["scratched"] == [1]
+    assert res["horses"][0]["p_win"] == session["horses"][0]["p_win"]
+
+    # Scratching a single interest renormalizes the field
+    res = client.post(
+        f"/api/finishline/ticket/session/{sid}/odds",
+        json={"updates": [{"index": 3, "ml_odds_raw": "SCR"}, {"index": 1, "ml_odds_raw": "2/1"}]},
+    ).json()
+    assert res["scratched"] == [3]
+    assert res["rejected"][0]["reason"] == "scratched"
+    assert res["horses"][3] == {"index": 3, "name": "Delta", "scratched": True}
+
+    fresh = _predict([h for i, h in enumerate(horses) if i not in (1, 3)])
+    live = [h for h in res["horses"] if not h.get("scratched")]
+    for a, b in zip(live, fresh["horses"]):
+        for key in KEYS:
+            assert a[key] == b[key], key
+
+    # Scratched on the ticket: same as leaving the horse off
+    marked = _predict([dict(h, ml_odds_raw="SCR") if i == 3 else h for i, h in enumerate(horses) if i != 1])
+    assert marked["meta"]["n_scratched"] == 1
+    assert [h["p_win"] for h in marked["horses"] if not h["scratched"]] == [h["p_win"] for h in fresh["horses"]]
@@ -0,0 +1,93 @@
+"""
+Tests for the shared horse feature pipeline.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from apps.api.predict.artifacts import ARTIFACT_FILES, ArtifactRegistry, default_artifact_paths
+from apps.api.predict.features import (
+    DEFAULT_MODELS, FEATURE_EXTRACTORS, FeatureModel, FieldInputs, models_from_artifact, register_feature
+)
+
+
+HORSES = [
+    {"name": "A", "odds": "5/2", "program": "1"},
+    {"name": "B", "odds": "3-1", "program": "9"},
+    {"name": "C", "odds": "junk", "program": "4"},
+]
+RESEARCH = {"horses": {"A": {"jt_win_pct": 20, "style": "E"}, "B": {"jt_win_pct": 8, "style": "C"}}}
+
+
+def test_columns_are_computed_once_per_field():
+    calls = []
+
+    @register_feature("test_counter")
+    def _counter(field):
+        calls.append(1)
+        return np.ones(len(field))
+
+    try:
+        field = FieldInputs(HORSES, {"distance": "6f"}, RESEARCH)
+        model = FeatureModel(("odds_log", "test_counter", "pace"), (1.0, 0.5, 0.01))
+        p1, p2 = model.probabilities(field), model.probabilities(field)
+        assert len(calls) == 1 and np.allclose(p1, p2) and abs(p1.sum() - 1.0) < 1e-12
+    finally:
+        del FEATURE_EXTRACTORS["test_counter"]
+
+    assert field.column("pace").tolist() == [1.0, -2.0, 0.0]
+    assert field.column("post").tolist() == [0.0, -0.02, 0.0]  # sprint, post from program number
+    assert abs(field.column("odds_baseline").sum() - 1.0) < 1e-12
+
+
+def test_models_from_artifact_and_validation():
+    models = models_from_artifact({"horse_models": {
+        "ticket": {"link": "logit", "feature_order": ["post"], "weights": [2.0]}
+    }})
+    assert models["predict"] is DEFAULT_MODELS["predict"]
+    assert not models["ticket"].is_identity
+    with pytest.raises(ValueError):
+        FeatureModel(("no_such_feature",), (1.0,))
+    with pytest.raises(ValueError):
+        FeatureModel(("pace",), (1.0, 2.0))
+
+    # Tilt reweights an existing distribution and keeps it normalized
+    field = FieldInputs(HORSES, {"distance": "1 1/8m"})
+    p = np.array([0.5, 0.3, 0.2])
+    tilted = models["ticket"].tilt(p, field)
+    assert abs(tilted.sum() - 1.0) < 1e-12 and tilted[0] < p[0]  # rail penalty in a route
+
+
+def test_ticket_model_from_horse_models_artifact(tmp_path):
+    from apps.api.ticket_predict import TicketPredictRequest, predict_races
+
+    paths = default_artifact_paths()
+    doc = json.loads(open(paths["horse_models"]).read())
+    doc["horse_models"]["ticket"] = {"link": "logit", "feature_order": ["post"], "weights": [5.0]}
+    (tmp_path / ARTIFACT_FILES["horse_models"]).write_text(json.dumps(doc))
+    snapshot = ArtifactRegistry(dict(paths, horse_models=str(tmp_path / ARTIFACT_FILES["horse_models"]))).current()
+
+    body = TicketPredictRequest(race={"distance": "1 1/16m"}, horses=[
+        {"name": n, "ml_odds_raw": o, "program": str(i + 1)} for i, (n, o) in enumerate(zip("ABCD", ["2/1", "3/1", "5/1", "8/1"]))
+    ])
+    (plain,), _ = predict_races([body], rid="t")
+    (tilted,), _ = predict_races([body], rid="t", snapshot=snapshot)
+    assert tilted["horses"][0]["p_win"] < plain["horses"][0]["p_win"]
+    assert abs(sum(h["p_win"] for h in tilted["horses"]) - 1.0) < 1e-3
+
+
+def test_research_scores_keep_the_composite_scale():
+    """The shipped research model reproduces the hand-weighted composite (values go to clients)."""
+    from apps.api.research_scoring import research_scores
+
+    horses = [
+        {"name": "A", "odds": "5-2", "last_speed_fig": 90, "trainer_win_pct": 0.15, "jockey_win_pct": 0.18,
+         "early_pace": "E", "form_delta": 1.0, "days_since_race": 21},
+        {"name": "B", "odds": "8-1"},
+        {"name": "C", "odds": "6-1", "early_pace": "C", "days_since_race": 70, "last_speed_fig": 75},
+    ]
+    # 0.3·implied + 0.25·speed/100 + 0.2·(t+j)/0.24 + 0.1·pace + 0.1·form + 0.05·rest
+    expected = [0.8557, 0.6883, 0.6629]
+    assert research_scores(horses) == expected
+    assert research_scores(horses, ArtifactRegistry().current().feature_models["research"]) == expected
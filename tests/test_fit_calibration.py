@@ -0,0 +1,101 @@
+"""
+Tests for the offline calibration fitter and the parameter artifact.
+"""
+import json
+
+from apps.api.predict.fit_calibration import (
+    fit,
+    load_outcomes,
+    load_runners,
+    race_key,
+    simulate_runners,
+    write_artifact,
+)
+from apps.api.predict.params import DEFAULT_PARAMS, DEFAULT_VERSION, load_calibration_params
+
+
+TRUTH = {"calibration_a": 0.3, "calibration_b": 0.8, "field_size_alpha": 1.0, "stern_exponent": 0.85}
+
+
+def test_fit_recovers_simulated_parameters():
+    """Fitting results drawn from the model beats the priors and recovers the shape parameters."""
+    result = fit(simulate_runners(30000, params=TRUTH, seed=3))
+    params = result["params"]
+
+    assert result["n_races"] == 30000
+    assert abs(params["stern_exponent"] - TRUTH["stern_exponent"]) <= 0.05
+    assert abs(params["calibration_b"] - TRUTH["calibration_b"]) <= 0.1
+    ll = result["log_likelihood"]
+    assert ll["fitted"]["win"] > ll["priors"]["win"]
+    assert ll["fitted"]["place_show"] > ll["priors"]["place_show"]
+
+
+def test_runner_csv_joins_result_history(tmp_path):
+    """Runner rows without a finish column pick up W/P/S from the outcome files."""
+    outcomes = tmp_path / "results.csv"
+    outcomes.write_text(
+        "date,track,race_number,winner,place,show,win_payoff,place_payoff,show_payoff\n"
+        "2024-10-12,Gulfstream Park,3,Fast Break,Silver Jet,Evening Star,8.80,4.20,3.10\n"
+    )
+    runners = tmp_path / "runners.csv"
+    runners.write_text(
+        "track,date,race,horse,ml_odds_raw\n"
+        "Gulfstream Park,2024-10-12,3,Fast Break,7/2\n"
+        "Gulfstream Park,2024-10-12,3,Silver Jet,2-1\n"
+        "Gulfstream Park,2024-10-12,3,Evening Star,5.5\n"
+        "Gulfstream Park,2024-10-12,3,Also Ran,SCR\n"
+        "Gulfstream Park,2024-10-12,3,Back Marker,12/1\n"
+        "Gulfstream Park,2024-10-13,3,Unknown Race,3/1\n"
+    )
+
+    history = load_outcomes([str(outcomes)])
+    assert race_key("Gulfstream Park", "2024-10-12", "03") == "GULFSTREAMPARK-R3-20241012"
+    assert history["GULFSTREAMPARK-R3-20241012"] == ("fastbreak", "silverjet", "eveningstar")
+
+    table = load_runners([str(runners)], history)
+    assert table.finish.tolist() == [1, 2, 3, 0]
+    assert table.odds.tolist() == [4.5, 3.0, 5.5, 13.0]
+
+
+def test_repo_result_history_loads():
+    """The checked-in result logs parse into race outcomes."""
+    outcomes = load_outcomes()
+    assert outcomes["GULFSTREAMPARK-R3-20241012"][0] == "fastbreak"
+    assert len(outcomes) > 100
+
+
+def test_artifact_round_trip(tmp_path):
+    """The API loads a written artifact and falls back to the priors on a bad one."""
+    path = tmp_path / "params.json"
+    artifact = {"version": "fit-test", "params": dict(DEFAULT_PARAMS, stern_exponent=0.9)}
+    write_artifact(artifact, str(path))
+
+    loaded = load_calibration_params(str(path))
+    assert loaded["version"] == "fit-test"
+    assert loaded["params"]["stern_exponent"] == 0.9
+
+    path.write_text(json.dumps({"version": "bad", "params": dict(DEFAULT_PARAMS, calibration_b=-1)}))
+    load_calibration_params.cache_clear()
+    assert load_calibration_params(str(path)) == {"version": DEFAULT_VERSION, "params": DEFAULT_PARAMS}
+    assert load_calibration_params(str(tmp_path / "missing.json"))["version"] == DEFAULT_VERSION
+
+
+def test_api_place_show_is_the_fitted_model():
+    """harville_arrays under the fitted γ serves the calibrated p_win and matches results drawn from the model."""
+    import numpy as np
+
+    from apps.api.predict.fit_calibration import _overround_corrected, race_matrix, win_matrix
+    from apps.api.predict.harville import harville_arrays
+
+    m = race_matrix(simulate_runners(30000, params=TRUTH, seed=5))
+    mask, places = m["mask"], m["places"]
+    p = win_matrix(_overround_corrected(m["odds"], mask), mask, TRUTH)
+    p_win, p_place, p_show = harville_arrays(p, stern_exponent=TRUTH["stern_exponent"])
+    assert np.array_equal(p_win, p)
+
+    # Favourite's observed win/place/show rates vs the served probabilities
+    rows = np.arange(p.shape[0])
+    fav = np.argmax(np.where(mask, p, -1.0), axis=1)
+    for k, served in enumerate((p_win, p_place, p_show), start=1):
+        observed = (places[:, :k] == fav[:, None]).any(axis=1).mean()
+        assert abs(served[rows, fav].mean() - observed) <= 0.01
@@ -0,0 +1,44 @@
+"""
+Tests for the columnar race frame.
+"""
+import numpy as np
+
+from apps.api.predict.frame import RaceFrame, pad_frames, rank_column
+
+
+def test_rank_column_matches_sorted():
+    values = np.array([0.2, -0.1, 0.5, 0.2, 0.0, 0.5])
+    ranks, order = rank_column(values, values > 0)
+    expected = sorted([j for j in range(6) if values[j] > 0], key=lambda j: values[j], reverse=True)
+    assert order.tolist() == expected
+    assert ranks.tolist() == [3, 0, 1, 4, 0, 2]
+
+
+def test_frame_coupling_and_records():
+    frame = RaceFrame(["A", "B", "C", "D"], ["2/1", "3/1", "SCR", "junk"], programs=["1", "1A", "2", "3"])
+    assert frame.scratched.tolist() == [False, False, True, False]
+    assert frame.parsed.tolist() == [True, True, False, False]
+    assert frame.decimal[3] == (3.0 + 4.0) / 2  # field average of the parsed odds
+
+    frame.couple()
+    assert frame.n_interests == 2 and frame.interest_of.tolist() == [0, 0, -1, 1]
+    assert frame.labels == ["A / B", "D"]
+    odds, mask = pad_frames([frame, RaceFrame(["X"], ["5/1"])])
+    assert odds.shape == (2, 2) and mask.tolist() == [[True, True], [True, False]]
+
+    m = frame.n_interests
+    nan = np.full(m, np.nan)
+    frame.set_columns(
+        p_win=np.array([0.6, 0.4]), p_place=np.ones(m), p_show=np.ones(m),
+        ci_low=np.array([0.5, 0.3]), ci_high=np.array([0.7, 0.5]),
+        place_odds_est=nan, show_odds_est=nan,
+        ev_win=np.array([-0.1, 0.2]), ev_place=nan, ev_show=nan,
+        kelly_win=np.array([0.0, 0.05]), kelly_place=nan, kelly_show=nan,
+        best_bet=np.array([-1, 0])
+    )
+    frame.rank()
+    records = frame.to_records()
+    assert [r["rank_win"] for r in records if not r["scratched"]] == [1, 1, 2]
+    assert "rank_value" not in records[0] and records[3]["rank_value"] == 1
+    assert records[1]["entry_name"] == "A / B" and records[2]["p_win_ci"] is None
+    assert records[3]["best_bet"] == "win" and records[3]["kelly_place"] is None
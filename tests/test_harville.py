@@ -0,0 +1,138 @@
+"""
+Parity tests for the NumPy Harville engine.
+Compares harville_place_show against the pure-Python reference and
+checks the batch exotic tables against brute-force enumeration.
+"""
+import itertools
+import random
+
+import pytest
+
+from apps.api.predict.harville import (
+    HARVILLE_ALGORITHMS,
+    compute_exacta_prob,
+    exacta_matrix,
+    harville_place_show,
+    harville_place_show_py,
+    top_k_finish_orders,
+    trifecta_tensor,
+)
+
+
+TOLERANCE = 1e-12
+
+
+def _random_field(n, seed):
+    """Random win-probability vector summing to 1.0."""
+    rng = random.Random(seed)
+    raw = [rng.uniform(0.01, 1.0) for _ in range(n)]
+    total = sum(raw)
+    return [p / total for p in raw]
+
+
+def _assert_parity(probs, use_stern, algorithm):
+    fast = harville_place_show(probs, use_stern=use_stern, algorithm=algorithm)
+    ref = harville_place_show_py(probs, use_stern=use_stern)
+
+    assert len(fast) == len(ref)
+    for a, b in zip(fast, ref):
+        assert set(a) == set(b)
+        for key in ("p_win", "p_place", "p_show"):
+            assert isinstance(a[key], float)
+            assert abs(a[key] - b[key]) <= TOLERANCE, (key, a[key], b[key])
+
+
+@pytest.mark.parametrize("algorithm", HARVILLE_ALGORITHMS)
+@pytest.mark.parametrize("use_stern", [True, False])
+@pytest.mark.parametrize("n", [2, 3, 4, 8, 14, 20])
+def test_parity_random_fields(n, use_stern, algorithm):
+    """NumPy engine matches the reference on random fields."""
+    for seed in range(5):
+        _assert_parity(_random_field(n, seed), use_stern, algorithm)
+
+
+@pytest.mark.parametrize("algorithm", HARVILLE_ALGORITHMS)
+@pytest.mark.parametrize("use_stern", [True, False])
+def test_parity_heavy_favorite(use_stern, algorithm):
+    """Denominator guards behave identically for near-certain favorites."""
+    _assert_parity([0.999999999, 1e-10, 1e-10, 0.0], use_stern, algorithm)
+    _assert_parity([0.97, 0.02, 0.005, 0.005], use_stern, algorithm)
+
+
+@pytest.mark.parametrize("algorithm", HARVILLE_ALGORITHMS)
+@pytest.mark.parametrize("use_stern", [True, False])
+def test_parity_unnormalized_input(use_stern, algorithm):
+    """Inputs that do not sum to 1.0 are handled the same way."""
+    _assert_parity([0.5, 0.4, 0.3, 0.2, 0.1], use_stern, algorithm)
+    _assert_parity([0.05, 0.05, 0.05], use_stern, algorithm)
+
+
+def test_unknown_algorithm_rejected():
+    """Unknown algorithm names raise instead of silently falling back."""
+    with pytest.raises(ValueError):
+        harville_place_show([0.5, 0.3, 0.2], algorithm="nope")
+
+
+def test_edge_cases():
+    """Empty and single-horse fields keep the original contract."""
+    assert harville_place_show([]) == []
+    assert harville_place_show([0.7]) == [{"p_win": 1.0, "p_place": 1.0, "p_show": 1.0}]
+
+
+def test_place_exceeds_win():
+    """Place beats win and show beats place for every horse."""
+    results = harville_place_show([0.40, 0.30, 0.20, 0.10])
+    for r in results:
+        assert r["p_show"] > r["p_place"] > r["p_win"]
+
+
+@pytest.mark.parametrize("algorithm", HARVILLE_ALGORITHMS)
+def test_place_show_mass(algorithm):
+    """Two place and three show slots: Σ p_place = 2 and Σ p_show = 3."""
+    results = harville_place_show(_random_field(12, 6), use_stern=False, algorithm=algorithm)
+    assert abs(sum(r["p_place"] for r in results) - 2.0) <= 1e-9
+    assert abs(sum(r["p_show"] for r in results) - 3.0) <= 1e-9
+
+
+def test_place_consistent_with_exacta():
+    """P(place_i) = P(i 1st) + Σ_j exacta[j, i]."""
+    probs = _random_field(7, 7)
+    table = exacta_matrix(probs)
+    results = harville_place_show(probs, use_stern=False)
+    for i, r in enumerate(results):
+        assert abs(r["p_place"] - (probs[i] + table[:, i].sum())) <= TOLERANCE
+
+
+def test_exacta_matrix_matches_pairwise():
+    """Batch exacta table agrees with compute_exacta_prob cell by cell."""
+    probs = _random_field(9, 3)
+    table = exacta_matrix(probs)
+    for i in range(9):
+        for j in range(9):
+            assert abs(table[i, j] - compute_exacta_prob(probs, i, j)) <= TOLERANCE
+    assert abs(table.sum() - 1.0) <= 1e-9
+
+
+def test_trifecta_tensor_sums_to_one():
+    """Trifecta tensor is a distribution over ordered distinct triples."""
+    table = trifecta_tensor(_random_field(10, 4))
+    assert abs(table.sum() - 1.0) <= 1e-9
+    assert table[0, 0, 1] == 0.0 and table[1, 2, 1] == 0.0
+
+
+def test_superfecta_top_k_matches_brute_force():
+    """Best-first enumeration returns exactly the brute-force top K."""
+    probs = _random_field(8, 5)
+    tri = trifecta_tensor(probs)
+    brute = sorted(
+        (
+            (tri[i, j, k] * probs[l] / (1.0 - probs[i] - probs[j] - probs[k]), (i, j, k, l))
+            for i, j, k, l in itertools.permutations(range(8), 4)
+        ),
+        reverse=True,
+    )
+    top = top_k_finish_orders(probs, k=15, depth=4)
+    assert len(top) == 15
+    for got, (prob, order) in zip(top, brute[:15]):
+        assert tuple(got["order"]) == order
+        assert abs(got["prob"] - prob) <= TOLERANCE
@@ -0,0 +1,49 @@
+"""
+Tests for the pooled outbound HTTP clients.
+"""
+import asyncio
+
+import httpx
+
+from apps.api.common import http_pool
+from apps.api.common.http_pool import HttpClientRegistry
+
+
+def test_clients_are_shared_metered_and_closed():
+    async def handler(request):
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={"path": request.url.path})
+
+    async def go():
+        registry = HttpClientRegistry(max_connections=2)
+        client = registry.get("research", transport=httpx.MockTransport(handler))
+        assert registry.get("research") is client and registry.get("openai") is not client
+
+        out = await asyncio.gather(*(client.get(f"http://research.test/h{i}") for i in range(5)))
+        assert [r.json()["path"] for r in out] == [f"/h{i}" for i in range(5)]
+        pool = registry.stats()["pools"]["research"]
+        assert pool["requests"] == 5 and pool["peak_in_flight"] == 5 and pool["saturated"] == 3
+        assert pool["in_flight"] == 0
+
+        await registry.aclose()
+        assert client.is_closed and registry.stats()["pools"] == {}
+
+    asyncio.run(go())
+
+
+def test_saturation_is_not_counted_under_http2(monkeypatch):
+    monkeypatch.setattr(http_pool, "H2_AVAILABLE", True)
+
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(200)
+
+    async def go():
+        registry = HttpClientRegistry(max_connections=2, http2=True)
+        client = registry.get("research", transport=httpx.MockTransport(handler))
+        await asyncio.gather(*(client.get(f"http://research.test/h{i}") for i in range(5)))
+        pool = registry.stats()["pools"]["research"]
+        assert registry.http2 and pool["peak_in_flight"] == 5 and pool["saturated"] is None
+        await registry.aclose()
+
+    asyncio.run(go())
@@ -0,0 +1,61 @@
+"""
+Tests for the bootstrap CI table.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from apps.api.predict.artifacts import ARTIFACT_FILES, load_snapshot
+from apps.api.predict.calibration import calibrate_win_matrix
+from apps.api.predict.fit_calibration import fit_ci_table, simulate_runners
+from apps.api.predict.intervals import CITable
+from apps.api.predict.params import DEFAULT_PARAMS
+from apps.api.ticket_predict import TicketPredictRequest, predict_races
+
+
+@pytest.fixture(scope="module")
+def runners():
+    return simulate_runners(20_000, seed=5)
+
+
+def _populated(table):
+    return np.asarray(table["count"]) >= 2_000
+
+
+def test_bands_cover_a_calibrated_model_and_flag_a_biased_one(runners):
+    calibrated = fit_ci_table(runners, DEFAULT_PARAMS, n_resamples=60)
+    cells = _populated(calibrated)
+    low, high = np.asarray(calibrated["logit_low"]), np.asarray(calibrated["logit_high"])
+    assert cells.sum() >= 5
+    assert np.mean((low[cells] < 0) & (high[cells] > 0)) >= 0.8
+
+    # Reporting flatter probabilities than the data follow shifts the bands off zero
+    biased = fit_ci_table(runners, dict(DEFAULT_PARAMS, calibration_b=0.6), n_resamples=60)
+    low, high = np.asarray(biased["logit_low"]), np.asarray(biased["logit_high"])
+    assert np.mean((low[cells] > 0) | (high[cells] < 0)) >= 0.5
+
+
+def test_lookup_replaces_wilson(runners, tmp_path):
+    table = fit_ci_table(runners, DEFAULT_PARAMS, n_resamples=30)
+    ci = CITable.from_artifact(table)
+    odds = np.array([[3.5, 4.0, 6.0, 9.0, 16.0, 0.0]])
+    mask = odds > 0
+    p, low, high = calibrate_win_matrix(odds, mask, ci_table=ci)
+    _, w_low, w_high = calibrate_win_matrix(odds, mask)
+    assert np.all(low[mask] <= p[mask]) and np.all(p[mask] <= high[mask])
+    assert np.all(high[mask] - low[mask] < w_high[mask] - w_low[mask])
+    assert low[0, 5] == high[0, 5] == 0.0
+
+    path = tmp_path / ARTIFACT_FILES["ci_table"]
+    path.write_text(json.dumps(table))
+    snapshot = load_snapshot({"ci_table": str(path)})
+    horses = [{"name": f"H{i}", "ml_odds_raw": o} for i, o in enumerate(["5/2", "3/1", "9/2", "8/1", "15/1"])]
+    result = predict_races([TicketPredictRequest(race={}, horses=horses)], "test", snapshot)[0][0]
+    assert result["meta"]["ci_method"] == "bootstrap"
+    assert all(h["p_win_ci"][0] <= h["p_win"] <= h["p_win_ci"][1] for h in result["horses"])
+
+
+def test_rejects_malformed_table():
+    with pytest.raises(ValueError):
+        CITable([2, 8], [0.0, 0.1], [[0.0, 0.0]], [[0.1, 0.1]])
@@ -0,0 +1,104 @@
+"""
+Tests for the simultaneous Kelly optimizer.
+"""
+import time
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from apps.api.predict.ev import kelly_fraction
+from apps.api.predict.kelly import _race_bets, card_kelly, race_kelly, solve_log_growth
+from apps.api.ticket_predict import router
+
+
+def _field(n=14, seed=0):
+    rng = np.random.default_rng(seed)
+    p = rng.dirichlet(np.full(n, 2.0))
+    win = 0.95 / (p * rng.uniform(0.6, 1.3, n))
+    return p, win, 1 + (win - 1) * 0.45, 1 + (win - 1) * 0.3
+
+
+def test_single_bet_matches_closed_form():
+    p = np.array([0.4, 0.35, 0.25])
+    odds = np.array([3.0, 2.0, 2.0])  # only the first horse has an edge
+    solved = race_kelly(p, odds)
+    assert abs(solved["win"][0] - kelly_fraction(0.4, 3.0)) < 1e-8
+    assert solved["win"][1:].sum() == 0.0
+
+
+def test_kkt_conditions_and_caps():
+    p, win, place, show = _field()
+    bets = _race_bets(p, win, place, show)
+    for max_kelly, cap in ((0.25, 1.0), (0.05, 1.0), (0.25, 0.1)):
+        f = solve_log_growth(bets["returns"], bets["probs"], max_kelly, cap)["fractions"]
+        assert f.min() >= 0 and f.max() <= max_kelly + 1e-12 and f.sum() <= cap + 1e-9
+        if f.sum() < cap - 1e-6:
+            grad = bets["returns"].T @ (bets["probs"] / (1 + bets["returns"] @ f))
+            inside = (f > 1e-9) & (f < max_kelly - 1e-9)
+            assert np.allclose(grad[inside], 0.0, atol=1e-7)
+            assert np.all(grad[f <= 1e-9] <= 1e-7)
+
+
+def test_stacked_pools_on_one_horse_stake_less_than_independent():
+    """Win/place/show on the same horse cash together, so joint sizing stakes less."""
+    p = np.array([0.4, 0.25, 0.2, 0.15])
+    win, place, show = np.array([3.0, 3.0, 4.0, 5.0]), np.full(4, 1.01), np.full(4, 1.01)
+    place[0], show[0] = 1.8, 1.35
+    bets = _race_bets(p, win, place, show)
+    assert set(bets["horses"]) == {0} and len(bets["horses"]) == 3
+    independent = sum(kelly_fraction(ph, o) for ph, o in zip(bets["p_hit"], bets["odds"]))
+    solved = race_kelly(p, win, place, show)
+    assert 0 < solved["total"] < independent
+
+
+def test_fourteen_horse_race_is_fast():
+    p, win, place, show = _field()
+    race_kelly(p, win, place, show)
+    t0 = time.perf_counter()
+    for _ in range(20):
+        race_kelly(p, win, place, show)
+    assert (time.perf_counter() - t0) / 20 < 0.05  # loose bound for slow CI hosts
+
+
+def test_card_kelly_respects_bankroll():
+    races = [dict(zip(("p_win", "win_odds"), _field(8, seed)[:2])) for seed in range(3)]
+    card = card_kelly(races, bankroll_cap=0.2)
+    assert card["exact"] and card["total"] <= 0.2 + 1e-9
+    assert abs(sum(r["total"] for r in card["races"]) - card["total"]) < 1e-12
+
+
+def test_endpoints_report_portfolios():
+    horses = [{"name": n, "ml_odds_raw": o} for n, o in zip("ABCDE", ["5/2", "3/1", "6/1", "9/1", "12/1"])]
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        single = client.post("/api/finishline/ticket/predict",
+                             json={"race": {}, "horses": horses, "joint_kelly": {}}).json()
+        assert single["ok"] and "portfolio" in single
+        assert single["portfolio"]["total"] <= 1.0
+        batch = client.post("/api/finishline/ticket/predict_batch", json={
+            "races": [{"race": {}, "horses": horses}] * 2,
+            "card_kelly": {"bankroll_cap": 0.5}
+        }).json()
+        assert batch["ok"] and batch["card_portfolio"]["total"] <= 0.5 + 1e-9
+        assert all("card_portfolio" in race and "_card" not in race for race in batch["races"])
+
+
+def test_fully_scratched_race_has_no_bets():
+    solved = race_kelly(np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0))
+    assert solved["total"] == 0.0 and solved["win"].shape == (0,)
+
+    scratched = [{"name": n, "ml_odds_raw": "SCR"} for n in "ABC"]
+    live = [{"name": n, "ml_odds_raw": o} for n, o in zip("ABCD", ["2/1", "3/1", "5/1", "8/1"])]
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        single = client.post("/api/finishline/ticket/predict",
+                             json={"race": {}, "horses": scratched, "joint_kelly": {}}).json()
+        assert single["ok"] and single["portfolio"]["total"] == 0.0
+        batch = client.post("/api/finishline/ticket/predict_batch", json={
+            "races": [{"race": {}, "horses": scratched}, {"race": {}, "horses": live}],
+            "card_kelly": {"bankroll_cap": 0.5}
+        }).json()
+        assert batch["ok"] and batch["card_portfolio"]["total"] <= 0.5 + 1e-9
@@ -0,0 +1,58 @@
+"""
+Tests for the shared odds-parsing engine.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from apps.api.predict.odds import COMMON_ODDS, parse_odds, parse_odds_column
+
+
+@pytest.mark.parametrize("raw,decimal,kind", [
+    ("7/2", 4.5, "fractional"),
+    ("5-2", 3.5, "fractional"),
+    (" 7 TO 2 ", 4.5, "fractional"),
+    ("7–2", 4.5, "fractional"),
+    ("13:8", 2.625, "fractional"),
+    ("6", 7.0, "fractional"),
+    ("150", 151.0, "fractional"),
+    ("3.50", 3.5, "decimal"),
+    ("+350", 4.5, "moneyline"),
+    ("-200", 1.5, "moneyline"),
+    ("even", 2.0, "even"),
+    ("1-1", 2.0, "even"),
+])
+def test_formats(raw, decimal, kind):
+    parsed = parse_odds(raw)
+    assert parsed.kind == kind
+    assert parsed.decimal == pytest.approx(decimal)
+    assert parsed.implied_win == pytest.approx(1.0 / decimal)
+
+
+@pytest.mark.parametrize("raw", [None, "", "SCR", "—", "WD", "5/0", "0", "abc", "7/2/1"])
+def test_unparsable(raw):
+    assert parse_odds(raw) is None
+
+
+def test_records_are_interned_and_read_only():
+    assert parse_odds("5-2") is parse_odds("5/2") is COMMON_ODDS["5/2"]
+    assert parse_odds("21/4") is parse_odds(" 21/4")  # memoized fallback
+    with pytest.raises(AttributeError):
+        parse_odds("5/2").decimal = 9.0
+
+
+def test_column_matches_scalar_parser():
+    raws = ["7/2", "SCR", None, "6", "+350", "9-5", "bad", "7/2", "3.5", "21/4"]
+    col = parse_odds_column(raws)
+    assert col.dtype == np.float64 and col.shape == (len(raws),)
+    for raw, value in zip(raws, col):
+        parsed = parse_odds(raw)
+        if parsed is None:
+            assert math.isnan(value)
+        else:
+            assert value == parsed.decimal
+
+    # Decimal columns do not read bare integers as N/1
+    assert parse_odds_column(["6", "3.5", "1.0", "x"], decimal=True)[:2].tolist() == [6.0, 3.5]
+    assert np.isnan(parse_odds_column(["1.0", "x"], decimal=True)).all()
@@ -0,0 +1,114 @@
+"""
+Tests for the table-driven Henery/Stern ordering models.
+"""
+import numpy as np
+import pytest
+
+from apps.api.predict.ordering import (
+    MAX_FIELD,
+    ORDERING_MODELS,
+    exact_ordering_arrays,
+    in_table_range,
+    load_ordering_tables,
+    ordering_arrays,
+    ordering_place_show,
+)
+from apps.api.predict.simulate import LO_DISCOUNTS, simulate_race
+
+
+PROBS = [0.30, 0.22, 0.15, 0.12, 0.08, 0.06, 0.04, 0.03]
+
+
+def test_tables_are_memory_mapped():
+    """Shipped table loads read-only via mmap."""
+    table = load_ordering_tables()
+    assert table is not None
+    assert isinstance(table, np.memmap)
+    assert table.shape[1] == MAX_FIELD + 1
+
+
+@pytest.mark.parametrize("model", ORDERING_MODELS)
+@pytest.mark.parametrize("n", [3, 8, 14, 20])
+def test_uniform_field(model, n):
+    """Equal horses get place = 2/n and show = 3/n."""
+    p, p_place, p_show = ordering_arrays([1.0 / n] * n, model=model)
+    assert np.allclose(p_place, 2.0 / n, atol=1e-9)
+    assert np.allclose(p_show, 3.0 / n, atol=1e-9)
+
+
+@pytest.mark.parametrize("model", ORDERING_MODELS)
+def test_place_show_mass_and_order(model):
+    """Mass sums to 2/3 and show >= place >= win for every horse."""
+    p, p_place, p_show = ordering_arrays(PROBS, model=model)
+    assert np.array_equal(p, PROBS)
+    assert abs(p_place.sum() - 2.0) < 1e-9
+    assert abs(p_show.sum() - 3.0) < 1e-9
+    assert np.all(p_show >= p_place) and np.all(p_place >= p)
+
+
+def test_henery_agrees_with_lo_discounted_simulation():
+    """Lo's discount exponents approximate Henery; the two should agree closely."""
+    _, p_place, p_show = ordering_arrays(PROBS, model="henery")
+    sim = simulate_race(PROBS, n_samples=200_000, seed=1, discounts=LO_DISCOUNTS)
+    assert np.max(np.abs(p_place - sim["p_place"])) < 0.01
+    assert np.max(np.abs(p_show - sim["p_show"])) < 0.01
+
+
+def _simulate_model(model, strength, n_samples=200_000, seed=0):
+    """Monte Carlo win/place/show rates straight from the model's performance draws."""
+    rng = np.random.default_rng(seed)
+    strength = np.asarray(strength, dtype=np.float64)
+    if model == "henery":
+        time_like = -(strength + rng.standard_normal((n_samples, strength.size)))
+    else:
+        time_like = rng.gamma(4.0, 1.0, (n_samples, strength.size)) / np.exp(strength)
+    rank = np.argsort(np.argsort(time_like, axis=1), axis=1)
+    return [(rank < k).mean(axis=0) for k in (1, 2, 3)]
+
+
+FIELDS = {
+    "dominant_favourite": [1.2, 0.3, 0.2, 0.0, -0.2],
+    "short": [0.7, 0.0, -0.4],
+    "skewed_eight": [0.9, 0.3, 0.2, 0.1, 0.0, 0.0, -0.1, -0.3],
+    "even_nine": [0.1, 0.05, 0.0, 0.0, -0.05, -0.1, -0.1, -0.15, 0.1],
+}
+
+
+@pytest.mark.parametrize("model", ORDERING_MODELS)
+@pytest.mark.parametrize("field", sorted(FIELDS))
+def test_matches_direct_model_simulation(model, field):
+    """Fed the simulated win rates, place/show reproduce the simulated rates."""
+    p_win, place, show = _simulate_model(model, FIELDS[field])
+    _, p_place, p_show = ordering_arrays(p_win, model=model)
+    assert np.max(np.abs(p_place - place)) < 0.01
+    assert np.max(np.abs(p_show - show)) < 0.01
+
+
+def test_table_range_and_dominant_favourite():
+    """Lopsided/short fields bypass the average-rival table."""
+    assert in_table_range(np.full(10, 0.1))
+    assert not in_table_range([0.5, 0.2, 0.15, 0.1, 0.05])
+    assert not in_table_range(PROBS)
+
+    # Stern with a 0.5 favourite in five: the average-rival table gave 0.811 / 0.951
+    _, p_place, p_show = ordering_arrays([0.5, 0.2, 0.15, 0.1, 0.05], model="stern")
+    assert abs(p_place[0] - 0.769) < 0.002
+    assert abs(p_show[0] - 0.913) < 0.002
+
+
+def test_exact_zero_probability_runners():
+    """p = 0 horses never place; the rest still carry place 2 / show 3."""
+    p, p_place, p_show = exact_ordering_arrays([0.5, 0.3, 0.2, 0.0, 0.0], model="henery")
+    assert np.all(p_place[3:] == 0) and np.all(p_show[3:] == 0)
+    assert abs(p_place.sum() - 2.0) < 1e-9
+    assert abs(p_show.sum() - 3.0) < 1e-9
+
+
+def test_contract_and_errors():
+    """Same dict contract as harville_place_show; unknown models raise."""
+    results = ordering_place_show(PROBS, model="stern")
+    assert len(results) == len(PROBS)
+    assert set(results[0]) == {"p_win", "p_place", "p_show"}
+    assert ordering_place_show([0.9]) == [{"p_win": 1.0, "p_place": 1.0, "p_show": 1.0}]
+    with pytest.raises(ValueError):
+        ordering_arrays(PROBS, model="plackett")
@@ -0,0 +1,43 @@
+"""
+Tests for the pari-mutuel place/show payout model.
+"""
+import numpy as np
+
+from apps.api.predict import pools
+from apps.api.predict.harville import harville_arrays
+from apps.api.predict.pools import place_show_payouts, public_shares, split_payout
+
+ODDS = np.array([2.5, 4.0, 5.0, 7.0, 9.0, 13.0, 16.0, 21.0])
+
+
+def test_split_rules():
+    # $1000 net place pool, $300 on the horse, $500 on both placers: $250 profit each,
+    # 1 + 250/300 = 1.833 per $1, broken down to 1.80
+    assert abs(float(split_payout(300.0, 500.0, 1000.0, 2)) - 1.80) < 1e-12
+    # Minus pool pays the minimum
+    assert float(split_payout(900.0, 1000.0, 950.0, 3)) == pools.MIN_PAYOUT
+
+
+def test_pool_pays_out_net_of_takeout(monkeypatch):
+    """Without breakage/minimum the public collects exactly (1 - takeout) of each pool."""
+    monkeypatch.setattr(pools, "BREAKAGE", 1e-12)
+    monkeypatch.setattr(pools, "MIN_PAYOUT", 0.0)
+    shares = public_shares(ODDS)
+    est = place_show_payouts(shares, ODDS, takeout=0.17)
+    assert abs(shares @ est["place_return"] - 0.83) < 1e-9
+    assert abs(shares @ est["show_return"] - 0.83) < 1e-9
+
+
+def test_probabilities_match_harville_and_stake_moves_price():
+    p = np.random.default_rng(1).dirichlet(np.ones(ODDS.shape[0]))
+    _, p_place, p_show = harville_arrays(p, use_stern=False)
+    est = place_show_payouts(p, ODDS)
+    assert np.allclose(est["p_place"], p_place) and np.allclose(est["p_show"], p_show)
+    assert np.all(est["place_odds"] >= pools.MIN_PAYOUT)
+
+    small = place_show_payouts(p, ODDS, place_total=10_000, stake=10)["place_odds"]
+    large = place_show_payouts(p, ODDS, place_total=10_000, stake=2_000)["place_odds"]
+    assert np.all(large <= small + 1e-12) and np.any(large < small)
+
+    two = place_show_payouts([0.6, 0.4], [1.8, 2.5])
+    assert np.isnan(two["show_odds"]).all() and np.isfinite(two["place_odds"]).all()
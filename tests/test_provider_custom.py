@@ -0,0 +1,107 @@
+"""
+Tests for the custom research provider's bounded fan-out.
+"""
+import asyncio
+import time
+
+import httpx
+
+from apps.api import provider_custom
+from apps.api.provider_custom import CustomProvider
+
+
+def _client(delay_s, stats):
+    async def handler(request):
+        stats.setdefault("paths", []).append(request.url.path)
+        stats["active"] += 1
+        stats["peak"] = max(stats["peak"], stats["active"])
+        try:
+            await asyncio.sleep(delay_s)
+        finally:
+            stats["active"] -= 1
+        name = request.url.params["name"]
+        if request.url.path == "/horse":
+            return httpx.Response(200, json={"last_speed_fig": 90 + int(name[1:])})
+        return httpx.Response(200, json={"win_pct": 0.2})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _run(provider, horses, client):
+    async def go():
+        async with client:
+            return await provider.enrich_horses_async(horses, date="2025-01-01", track="AQU", client=client)
+    return asyncio.run(go())
+
+
+def test_field_fans_out_in_order(monkeypatch):
+    monkeypatch.setattr(provider_custom, "_BASE", "http://research.test")
+    provider_custom._cache.clear()
+    horses = [{"name": f"H{i}", "trainer": f"T{i}", "jockey": f"J{i}"} for i in range(12)]
+    stats = {"active": 0, "peak": 0}
+
+    t0 = time.perf_counter()
+    out = _run(CustomProvider(concurrency=8, batch=False), horses, _client(0.05, stats))
+    elapsed = time.perf_counter() - t0
+
+    assert [h["name"] for h in out] == [h["name"] for h in horses]
+    assert [h["last_speed_fig"] for h in out] == [90 + i for i in range(12)]
+    assert stats["peak"] == 8
+    assert elapsed < 36 * 0.05 / 2  # 36 calls in ~5 waves of 8, not 36 serial round trips
+
+
+def test_budget_cuts_calls_short(monkeypatch):
+    monkeypatch.setattr(provider_custom, "_BASE", "http://research.test")
+    monkeypatch.setattr(provider_custom, "_RESERVE_MS", 0)
+    provider_custom._cache.clear()
+    horses = [{"name": f"H{i}"} for i in range(3)]
+
+    t0 = time.perf_counter()
+    out = _run(CustomProvider(budget_ms=100, batch=False), horses, _client(1.0, {"active": 0, "peak": 0}))
+    assert time.perf_counter() - t0 < 0.5
+    assert [h["last_speed_fig"] for h in out] == [80.0] * 3  # defaults when the API misses the deadline
+
+
+def test_duplicate_calls_are_coalesced(monkeypatch):
+    monkeypatch.setattr(provider_custom, "_BASE", "http://research.test")
+    provider_custom._flight.clear()
+    # Four horses share one trainer and two jockeys
+    horses = [{"name": f"H{i}", "trainer": "T0", "jockey": f"J{i % 2}"} for i in range(4)]
+    stats = {"active": 0, "peak": 0}
+
+    _run(CustomProvider(batch=False), horses, _client(0.05, stats))
+    assert sorted(stats["paths"]) == ["/horse"] * 4 + ["/jockey"] * 2 + ["/trainer"]
+    assert provider_custom.cache_stats() == {"hits": 0, "misses": 7, "coalesced": 5, "cached": 7, "inflight": 0}
+
+    # A second field is served from the cache
+    _run(CustomProvider(batch=False), horses, _client(0.05, stats))
+    assert len(stats["paths"]) == 7 and provider_custom.cache_stats()["hits"] == 12
+
+
+def test_batch_mode_and_fallback(monkeypatch):
+    from apps.api.research_sim import SIM_BASE, create_app, sample_field
+
+    monkeypatch.setattr(provider_custom, "_BASE", SIM_BASE)
+    monkeypatch.setattr(provider_custom, "_batch_unsupported", {})
+    horses = sample_field(6)
+    outputs = {}
+    for batch in (True, False):
+        provider_custom._flight.clear()
+        app = create_app(latency_ms=0, batch=batch)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+        outputs[batch] = _run(CustomProvider(), horses, client)
+        # A second field reuses the cache / the remembered lack of batch support
+        _run(CustomProvider(), horses + sample_field(2, race=1), httpx.AsyncClient(transport=httpx.ASGITransport(app=app)))
+        outputs[batch, "calls"] = dict(app.state.calls)
+
+    assert outputs[True] == outputs[False]
+    assert outputs[True, "calls"] == {"/field": 2}
+    # One 404 probe, then per-entity calls only (trainers/jockeys of race 1 are cached)
+    assert outputs[False, "calls"] == {"/horse": 8, "/trainer": 5, "/jockey": 6}
+    assert set(provider_custom._batch_unsupported) == {SIM_BASE}
+
+    # The mark expires with the cache TTL, after which /field is probed again
+    provider_custom._flight.clear()
+    provider_custom._batch_unsupported[SIM_BASE] -= provider_custom._TTL_SECONDS + 1
+    app = create_app(latency_ms=0, batch=True)
+    assert _run(CustomProvider(), horses, httpx.AsyncClient(transport=httpx.ASGITransport(app=app))) == outputs[True]
+    assert dict(app.state.calls) == {"/field": 1} and not provider_custom._batch_unsupported
@@ -0,0 +1,77 @@
+"""
+Tests for the websearch provider's concurrent, deadline-bound enrichment.
+"""
+import asyncio
+import json
+import time
+
+import httpx
+
+from apps.api import provider_websearch
+from apps.api.common.http_pool import http_clients
+from apps.api.provider_websearch import WebSearchProvider
+
+
+def _transport(extract_delay_s, calls):
+    async def handler(request):
+        if request.url.host == "api.tavily.com":
+            query = json.loads(request.content)["query"]
+            return httpx.Response(200, json={"results": [{"url": f"https://pages.test/{len(query)}"}]})
+        if request.url.host == "pages.test":
+            return httpx.Response(200, text="<html><body><p>Stats page</p><script>x()</script></body></html>")
+        calls.append(1)
+        await asyncio.sleep(extract_delay_s)
+        role = json.loads(request.content)["messages"][1]["content"].split("\n")[0]
+        data = {"ROLE=horse": {"last_speed_fig": 91, "early_pace": "E"},
+                "ROLE=trainer": {"trainer_win_pct": 0.21},
+                "ROLE=jockey": {"jockey_win_pct": 0.17}}[role]
+        return httpx.Response(200, json={
+            "id": "x", "object": "chat.completion", "created": 0, "model": "m",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(data)}}]
+        })
+    return httpx.MockTransport(handler)
+
+
+def _run(provider, horses, transport):
+    async def go():
+        http_clients.get("openai", transport=transport)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await provider._enrich_async(horses, date="2025-01-01", track="AQU", client=client)
+    return asyncio.run(go())
+
+
+def _setup(monkeypatch):
+    monkeypatch.setattr(provider_websearch, "_TAV", "tav-key")
+    monkeypatch.setattr(provider_websearch, "_OAI", "oai-key")
+    provider_websearch._flight.clear()
+
+
+def test_field_is_enriched_concurrently(monkeypatch):
+    _setup(monkeypatch)
+    horses = [{"name": f"H{i}", "trainer": "T", "jockey": f"J{i % 2}"} for i in range(4)]
+    calls = []
+
+    # Warm-up: the OpenAI SDK imports its resources on first use, keep that out of the timing
+    _run(WebSearchProvider(), horses[:1], _transport(0.0, []))
+    provider_websearch._flight.clear()
+
+    t0 = time.perf_counter()
+    out = _run(WebSearchProvider(), horses, _transport(0.1, calls))
+    elapsed = time.perf_counter() - t0
+
+    assert [h["name"] for h in out] == ["H0", "H1", "H2", "H3"]
+    assert all(h["last_speed_fig"] == 91 and h["trainer_win_pct"] == 0.21 and h["jockey_win_pct"] == 0.17 for h in out)
+    assert len(calls) == 7  # 4 horses, 1 shared trainer, 2 jockeys
+    assert elapsed < 0.35  # 7 extractions of 0.1s overlap instead of running back to back
+
+
+def test_deadline_skips_slow_lookups(monkeypatch):
+    _setup(monkeypatch)
+    monkeypatch.setattr(provider_websearch, "_RESERVE_MS", 0)
+    horses = [{"name": f"H{i}", "trainer": "T"} for i in range(3)]
+
+    t0 = time.perf_counter()
+    out = _run(WebSearchProvider(budget_ms=100), horses, _transport(1.0, []))
+    assert time.perf_counter() - t0 < 0.5
+    assert [h["early_pace"] for h in out] == ["P"] * 3 and out[0]["trainer_win_pct"] is None
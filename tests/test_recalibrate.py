@@ -0,0 +1,98 @@
+"""
+Tests for the reliability-curve / temperature recalibrator.
+"""
+import numpy as np
+
+from apps.api.predict.recalibrate import Recalibrator
+
+
+def test_identity_and_monotone():
+    ident = Recalibrator([], [], 1.0)
+    assert ident.is_identity
+    x = np.linspace(0.01, 0.99, 50)
+    assert np.allclose(ident.map(x), x)
+
+    # Non-monotone points and duplicates are pooled into a non-decreasing map
+    rec = Recalibrator([0.2, 0.5, 0.5, 0.7, 0.9], [0.15, 0.5, 0.4, 0.42, 0.95], 1.3)
+    y = rec.map(np.linspace(0.0, 1.0, 201))
+    assert np.all(np.diff(y) >= -1e-12)
+    assert 0.0 <= y.min() and y.max() <= 1.0
+
+
+def test_apply_field_rows_sum_to_one():
+    rec = Recalibrator([0.1, 0.3, 0.6], [0.08, 0.33, 0.7], 0.8)
+    rng = np.random.default_rng(3)
+    p = rng.dirichlet(np.ones(9), size=20)
+    p[:5, 6:] = 0.0  # padded races
+    p[:5] /= p[:5].sum(axis=1, keepdims=True)
+    out = rec.apply_field(p)
+    assert np.allclose(out.sum(axis=1), 1.0)
+    assert np.all(out[:5, 6:] == 0.0)
+
+
+def test_field_jacobian_matches_finite_differences():
+    rec = Recalibrator([0.1, 0.3, 0.6], [0.08, 0.33, 0.7], 0.8)
+    p = np.array([0.35, 0.25, 0.2, 0.12, 0.08])
+    jac = rec.field_jacobian(p)
+    eps = 1e-7
+    for k in range(p.shape[0]):
+        up, down = p.copy(), p.copy()
+        up[k] += eps
+        down[k] -= eps
+        fd = (rec.apply_field(up) - rec.apply_field(down)) / (2 * eps)
+        assert np.allclose(jac[:, k], fd, atol=1e-5)
+
+
+def test_ticket_predict_recalibrate_flag():
+    from apps.api.ticket_predict import TicketPredictRequest, predict_races
+
+    horses = [{"name": n, "ml_odds_raw": o} for n, o in zip("ABCDE", ["2/1", "3/1", "5/1", "8/1", "12/1"])]
+    (plain, recal), _ = predict_races([
+        TicketPredictRequest(race={}, horses=horses),
+        TicketPredictRequest(race={}, horses=horses, recalibrate=True)
+    ], rid="t")
+    assert plain["meta"]["recalibrated"] is False and recal["meta"]["recalibrated"] is True
+    total = sum(h["p_win"] for h in recal["horses"])
+    assert abs(total - 1.0) < 1e-3
+
+
+def test_shipped_model_params_curve():
+    from apps.api.predict.artifacts import ArtifactRegistry
+
+    snap = ArtifactRegistry().current()
+    rec = snap.recalibrator
+    assert snap.reliability_c.shape[0] > 0
+
+    # Pick path: the curve matches the artifact's own interpolation and is
+    # held flat outside the fitted range instead of running to (0, 0)
+    conf = np.linspace(0.3, 0.95, 66)
+    if rec.tau == 1.0:
+        assert np.allclose(rec.map(conf), snap.reliability(conf))
+    assert np.allclose(rec.curve([0.1, 0.5]), snap.reliability_p[0])
+    assert np.allclose(rec.curve([0.9, 1.0]), snap.reliability_p[-1])
+
+    # Field path: temperature only, so with the shipped tau the distribution
+    # is the temperature-scaled input
+    p = np.array([0.5, 0.3, 0.15, 0.05])
+    q = p ** (1.0 / rec.tau)
+    assert np.allclose(rec.apply_field(p), q / q.sum())
+
+
+def test_research_predict_recalibrate_keeps_pick_probs():
+    from fastapi.testclient import TestClient
+    from apps.api.api_main import app
+
+    client = TestClient(app)
+    horses = [
+        {"name": n, "odds": o, "trainer": f"T{i}", "jockey": f"J{i}"}
+        for i, (n, o) in enumerate(zip("ABCDEF", ["2-1", "5-2", "4-1", "6-1", "10-1", "20-1"]))
+    ]
+    for provider, depth in (("stub", "draft"), ("custom", "quick")):
+        body = {"horses": horses, "provider": provider, "depth": depth, "timeout_ms": 5000}
+        plain = client.post("/api/finishline/research_predict", json=body).json()
+        recal = client.post("/api/finishline/research_predict", json={**body, "recalibrate": True}).json()
+        probs = [recal[k]["prob"] for k in ("win", "place", "show")]
+        assert probs == [plain[k]["prob"] for k in ("win", "place", "show")]
+        # Distinct values, not flattened onto the reliability curve's end points
+        assert len(set(probs)) == 3 and max(probs) < 1.0
+        assert recal["recalibration"]["applied"] is False and recal["recalibration"]["skipped"]
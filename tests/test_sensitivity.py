@@ -0,0 +1,70 @@
+"""
+Finite-difference checks for the analytic Jacobians used by what-if sliders.
+"""
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from apps.api.predict.calibration import calibrate_win_matrix, calibration_jacobian
+from apps.api.predict.harville import harville_arrays, harville_jacobian
+from apps.api.ticket_predict import router
+
+
+STEP = 1e-6
+
+
+def _numeric_jacobian(f, x):
+    x = np.asarray(x, dtype=np.float64)
+    cols = []
+    for k in range(x.shape[0]):
+        e = np.zeros_like(x)
+        e[k] = STEP
+        cols.append((f(x + e) - f(x - e)) / (2 * STEP))
+    return np.stack(cols, axis=-1)
+
+
+@pytest.mark.parametrize("use_stern", [True, False])
+@pytest.mark.parametrize("n", [4, 8, 14])
+def test_harville_jacobian_matches_finite_differences(n, use_stern):
+    """∂(p_win', p_place, p_show)/∂p_win agrees with central differences."""
+    p = np.random.default_rng(n).dirichlet(np.ones(n))
+    numeric = _numeric_jacobian(lambda x: np.array(harville_arrays(x, use_stern=use_stern)), p)
+    assert np.abs(harville_jacobian(p, use_stern=use_stern) - numeric).max() <= 1e-7
+
+
+@pytest.mark.parametrize("odds", [
+    [3.5, 4.0, 2.8, 12.0, 31.0, 5.5],
+    [1.2, 1.5, 50.0, 80.0],
+    [0.5, 3.0, 4.0, 7.0],  # invalid odds are held constant
+])
+def test_calibration_jacobian_matches_finite_differences(odds):
+    """∂p_win/∂odds agrees with central differences through every clamp."""
+    mask = np.ones((1, len(odds)), dtype=bool)
+    numeric = _numeric_jacobian(lambda x: calibrate_win_matrix(x[None, :], mask)[0][0], odds)
+    assert np.abs(calibration_jacobian(odds) - numeric).max() <= 1e-8
+
+
+def test_endpoint_jacobian_predicts_small_moves():
+    """J @ Δodds tracks the re-predicted probabilities for a small nudge."""
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    race = {
+        "race": {},
+        "horses": [{"name": f"H{i}", "ml_odds_raw": o} for i, o in enumerate(["5/2", "3/1", "9/2", "8/1", "15/1"])],
+        "ordering_model": "harville",
+        "include_sensitivity": True,
+    }
+    base = client.post("/api/finishline/ticket/predict", json=race).json()
+    jacobian = np.array(base["sensitivity"]["jacobian"])
+
+    race["horses"][1]["ml_odds_raw"] = "4.05"  # 3/1 is 4.0 decimal
+    moved = client.post("/api/finishline/ticket/predict", json=race).json()
+
+    for row, key in enumerate(("p_win", "p_place", "p_show")):
+        before = np.array([h[key] for h in base["horses"]])
+        after = np.array([h[key] for h in moved["horses"]])
+        predicted = before + jacobian[row][:, 1] * 0.05
+        assert np.abs(predicted - after).max() <= 2e-4
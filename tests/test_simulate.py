@@ -0,0 +1,68 @@
+"""
+Tests for the Monte Carlo Plackett–Luce finish-order simulator.
+"""
+import numpy as np
+
+from apps.api.predict.harville import harville_arrays
+from apps.api.predict.simulate import (
+    LO_DISCOUNTS,
+    MAX_SAMPLES,
+    MIN_SAMPLES,
+    sample_budget,
+    sample_finish_orders,
+    simulate_race,
+)
+
+
+PROBS = [0.30, 0.22, 0.15, 0.12, 0.08, 0.06, 0.04, 0.03]
+
+
+def test_matches_harville_within_standard_errors():
+    """Undiscounted sampling reproduces Harville W/P/S within ~5 SE."""
+    result = simulate_race(PROBS, n_samples=200_000, seed=11)
+    p, p_place, p_show = harville_arrays(PROBS, use_stern=False)
+
+    for freq, se, exact in (
+        (result["p_win"], result["se_win"], p),
+        (result["p_place"], result["se_place"], p_place),
+        (result["p_show"], result["se_show"], p_show),
+    ):
+        assert np.all(np.abs(freq - exact) <= 5 * se + 1e-12)
+
+
+def test_seed_is_deterministic():
+    """Same seed, same frequencies; different seed, different draw."""
+    a = simulate_race(PROBS, n_samples=20_000, seed=3)
+    b = simulate_race(PROBS, n_samples=20_000, seed=3)
+    c = simulate_race(PROBS, n_samples=20_000, seed=4)
+    assert np.array_equal(a["p_show"], b["p_show"])
+    assert a["exacta"] == b["exacta"]
+    assert not np.array_equal(a["p_show"], c["p_show"])
+
+
+def test_discounted_model_flattens_lower_positions():
+    """Lo discounting moves show probability toward longshots."""
+    plain = simulate_race(PROBS, n_samples=100_000, seed=5)
+    lo = simulate_race(PROBS, n_samples=100_000, seed=5, discounts=LO_DISCOUNTS)
+    assert lo["p_show"][-1] > plain["p_show"][-1]
+    assert lo["p_show"][0] < plain["p_show"][0]
+    assert abs(lo["p_show"].sum() - 3.0) < 1e-9
+
+
+def test_zero_probability_runners_fill_the_tail_once():
+    """p = 0 horses never repeat a placed horse and only run behind the live ones."""
+    probs = [0.5, 0.3, 0.2, 0.0, 0.0, 0.0]
+    for discounts in ((1.0, 1.0, 1.0, 1.0), LO_DISCOUNTS):
+        orders = sample_finish_orders(probs, 20_000, seed=2, discounts=discounts)
+        assert all(len(set(row)) == 4 for row in orders.tolist())
+        assert np.all(orders[:, :3] < 3) and np.all(orders[:, 3] >= 3)
+
+    lo = simulate_race(probs, n_samples=20_000, seed=2, discounts=LO_DISCOUNTS)
+    assert np.all(lo["p_show"][:3] == 1.0) and np.all(lo["p_show"][3:] == 0.0)
+
+
+def test_sample_budget_bounds():
+    """Budget scales with latency and stays within the configured bounds."""
+    assert sample_budget(0, 10) == MIN_SAMPLES
+    assert sample_budget(1e6, 10) == MAX_SAMPLES
+    assert sample_budget(20, 10) < sample_budget(40, 10)
@@ -0,0 +1,84 @@
+"""
+Tests for the full-card batch endpoint.
+Each race in a batch must match the single-race endpoint exactly.
+"""
+import random
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from apps.api.predict.calibration import calibrate_win_matrix, get_calibrated_win_probs
+from apps.api.ticket_predict import router
+
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+ODDS = ["5/2", "3-1", "9/5", "12/1", "30/1", "even", "7/2", "2.5", ""]
+
+
+def _card(n_races, seed):
+    """Random card with mixed field sizes and ordering models."""
+    rng = random.Random(seed)
+    return [
+        {
+            "race": {"track": f"Track {r}"},
+            "horses": [
+                {"name": f"Horse {i}", "ml_odds_raw": rng.choice(ODDS)}
+                for i in range(rng.randint(1, 14))
+            ],
+            "ordering_model": rng.choice([None, "harville", "stern", "henery"]),
+        }
+        for r in range(n_races)
+    ]
+
+
+def test_batch_matches_single_endpoint():
+    """Every batch entry equals the single-race response (minus rid/timing)."""
+    card = _card(10, seed=3)
+    batch = client.post("/api/finishline/ticket/predict_batch", json={"races": card}).json()
+
+    assert batch["ok"] is True
+    assert batch["n_races"] == len(card)
+    assert set(batch["timing"]) >= {"calibrate_ms", "place_show_ms", "value_ms"}
+
+    for race, result in zip(card, batch["races"]):
+        single = client.post("/api/finishline/ticket/predict", json=race).json()
+        single.pop("rid")
+        single.pop("elapsed_ms")
+        assert result == single
+
+
+def test_batch_empty_race_does_not_fail_card():
+    """Races without horses are reported individually."""
+    card = _card(2, seed=4) + [{"race": {}, "horses": []}]
+    batch = client.post("/api/finishline/ticket/predict_batch", json={"races": card}).json()
+
+    assert batch["ok"] is True
+    assert batch["races"][0]["ok"] is True
+    assert batch["races"][2]["code"] == "no_horses"
+
+
+def test_calibrate_win_matrix_matches_list_path():
+    """Padded matrix calibration equals get_calibrated_win_probs row by row."""
+    rows = [[2.5, 4.0, 6.0, 11.0], [1.8, 3.0], [21.0, 5.0, 8.0]]
+    width = max(len(r) for r in rows)
+    odds = [r + [0.0] * (width - len(r)) for r in rows]
+    mask = [[True] * len(r) + [False] * (width - len(r)) for r in rows]
+
+    p_win, ci_low, ci_high = calibrate_win_matrix(odds, mask)
+    for r, row in enumerate(rows):
+        expected = get_calibrated_win_probs(row, len(row))
+        for i, (p, lo, hi) in enumerate(expected):
+            assert abs(p_win[r, i] - p) <= 1e-12
+            assert abs(ci_low[r, i] - lo) <= 1e-12
+            assert abs(ci_high[r, i] - hi) <= 1e-12
+        assert (p_win[r, len(row):] == 0.0).all()
+
+
+def test_unknown_ordering_model_is_rejected():
+    race = _card(1, seed=5)[0]
+    race["ordering_model"] = "plackett"
+    assert client.post("/api/finishline/ticket/predict", json=race).status_code == 422
+    assert client.post("/api/finishline/ticket/predict_batch", json={"races": [race]}).status_code == 422
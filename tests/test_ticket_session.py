@@ -0,0 +1,85 @@
+"""
+Tests for live race sessions (odds-delta recompute).
+A session after a tick must agree with a fresh ticket_predict call.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from apps.api.predict.session import RaceSession, RESUM_EVERY
+from apps.api.ticket_predict import router
+
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+KEYS = ("p_win", "p_place", "p_show", "p_win_ci", "ev_win", "kelly_win")
+
+
+def _race(odds, ordering_model=None):
+    return {
+        "race": {"track": "Test"},
+        "horses": [{"name": f"H{i}", "ml_odds_raw": o} for i, o in enumerate(odds)],
+        "ordering_model": ordering_model,
+    }
+
+
+def test_odds_delta_matches_full_predict():
+    """Applying deltas gives the same numbers as predicting from scratch."""
+    for model in (None, "stern"):
+        race = _race(["5/2", "3-1", "9/5", "12/1", "30/1", "7/2", "8/1"], model)
+        created = client.post("/api/finishline/ticket/session", json=race).json()
+        assert created["ok"] is True
+
+        updated = client.post(
+            f"/api/finishline/ticket/session/{created['session_id']}/odds",
+            json={"updates": [
+                {"index": 0, "ml_odds_raw": "4/1"},
+                {"name": "h3", "ml_odds_raw": "6/1"},
+                {"index": 2, "ml_odds_raw": "??"},
+                {"index": 42, "ml_odds_raw": "2/1"},
+            ]},
+        ).json()
+        assert updated["changed"] == [0, 3]
+        assert [r["reason"] for r in updated["rejected"]] == ["unparsable_odds", "unknown_horse"]
+        assert updated["version"] == 1
+
+        race["horses"][0]["ml_odds_raw"] = "4/1"
+        race["horses"][3]["ml_odds_raw"] = "6/1"
+        full = client.post("/api/finishline/ticket/predict", json=race).json()
+        for a, b in zip(updated["horses"], full["horses"]):
+            for key in KEYS:
+                assert a[key] == b[key], key
+
+
+def test_unknown_session():
+    """Expired or unknown sessions return ok:false."""
+    res = client.post("/api/finishline/ticket/session/nope/odds", json={"updates": []}).json()
+    assert res["ok"] is False
+    assert res["code"] == "session_not_found"
+
+
+def test_running_total_stays_exact():
+    """The incrementally patched overround total tracks a fresh session."""
+    session = RaceSession([str(i) for i in range(12)], [3.0 + i for i in range(12)])
+    for k in range(RESUM_EVERY + 7):
+        session.apply_odds({k % 12: 2.0 + (k % 11)})
+
+    fresh = RaceSession(session.names, session.odds[0].tolist())
+    assert abs(session.p_show - fresh.p_show).max() <= 1e-12
+
+
+def test_negative_scratch_index_is_rejected_without_corrupting():
+    """Out-of-range indices never touch the session."""
+    session = RaceSession(["A", "B", "C"], [2.0, 3.0, 5.0])
+    before = session.p_win.copy()
+    for bad in ([-1], [1, 3]):
+        with pytest.raises(IndexError):
+            session.scratch(bad)
+    assert session.interest_of == [0, 1, 2] and (session.p_win == before).all()
+    assert session.scratch([2]) == [2] and session.snapshot()[2]["scratched"]
+
+    created = client.post("/api/finishline/ticket/session", json=_race(["5/2", "3-1", "9/5"])).json()
+    res = client.post(f"/api/finishline/ticket/session/{created['session_id']}/scratch", json={"indices": [-1]})
+    assert res.status_code == 422
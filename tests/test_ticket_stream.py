@@ -0,0 +1,116 @@
+"""
+Tests for the live odds stream (tick coalescing and fan-out).
+"""
+import asyncio
+
+from apps.api.predict.session import RaceSession, SessionStore
+from apps.api.ticket_stream import RaceStream, format_sse
+from apps.api.tote_sim import ToteFeedSimulator
+
+
+def _session(sim):
+    request = sim.race_request()
+    return RaceSession(
+        [h["name"] for h in request["horses"]],
+        [float(h["ml_odds_raw"]) for h in request["horses"]],
+    )
+
+
+def test_ticks_within_window_are_coalesced():
+    """Several ticks inside one window produce a single recompute."""
+    sim = ToteFeedSimulator(n_horses=8, seed=1, tick_fraction=1.0)
+    session = _session(sim)
+
+    async def run():
+        stream = RaceStream(session, coalesce_ms=20)
+        queue = stream.subscribe()
+        last = {}
+        for _ in range(5):
+            updates = sim.tick()
+            changes = {u["index"]: float(u["ml_odds_raw"]) for u in updates}
+            last.update(changes)
+            stream.push(changes)
+        event = await asyncio.wait_for(queue.get(), timeout=1.0)
+        return stream, queue, event, last
+
+    stream, queue, event, last = asyncio.run(run())
+    assert event["ticks"] == 5
+    assert event["version"] == 1
+    assert queue.empty()
+    for i, odds in last.items():
+        assert event["horses"][i]["ml_decimal"] == odds
+
+    fresh = RaceSession(session.names, session.odds[0].tolist())
+    assert event["horses"] == fresh.snapshot()
+
+
+def test_slow_subscriber_keeps_latest():
+    """A full subscriber queue drops its oldest event, not the newest."""
+    session = _session(ToteFeedSimulator(n_horses=4, seed=2))
+    stream = RaceStream(session)
+    queue = stream.subscribe()
+    for v in range(queue.maxsize + 3):
+        stream.broadcast({"version": v})
+    assert queue.qsize() == queue.maxsize
+    assert queue.get_nowait()["version"] == 3
+
+
+def test_simulator_is_seeded():
+    """Same seed, same feed."""
+    a, b = ToteFeedSimulator(seed=7), ToteFeedSimulator(seed=7)
+    assert a.race_request() == b.race_request()
+    assert [a.tick() for _ in range(10)] == [b.tick() for _ in range(10)]
+
+
+def test_format_sse():
+    assert format_sse("prediction", {"v": 1}) == 'event: prediction\ndata: {"v":1}\n\n'
+
+
+def test_rest_updates_and_close_reach_subscribers():
+    """REST odds updates are broadcast; closing the session ends the stream and drops it."""
+    from apps.api.ticket_predict import OddsDeltaRequest, sessions, ticket_session_close, ticket_session_odds
+    from apps.api.ticket_stream import CLOSED, get_stream, streams
+
+    session = sessions.add(_session(ToteFeedSimulator(n_horses=5, seed=3)))
+    sid = session.session_id
+
+    async def run():
+        queue = get_stream(sid).subscribe()
+        body = OddsDeltaRequest(updates=[{"index": 1, "ml_odds_raw": "9/1"}, {"index": 4, "ml_odds_raw": "SCR"}])
+        await ticket_session_odds(None, sid, body)
+        event = queue.get_nowait()
+        await ticket_session_close(sid)
+        return event, queue.get_nowait()
+
+    event, last = asyncio.run(run())
+    assert event["changed"] == [1] and event["scratched"] == [4] and event["horses"][1]["ml_decimal"] == 10.0
+    assert last is CLOSED and sid not in streams
+
+
+def test_store_reports_every_eviction():
+    """Removed, LRU-evicted and expired sessions are all reported to listeners."""
+    store = SessionStore(max_sessions=2, ttl_s=60)
+    gone = []
+    store.on_evict(gone.append)
+    a, b, c = (store.add(_session(ToteFeedSimulator(n_horses=3, seed=s))) for s in range(3))
+    assert gone == [a.session_id]
+    store.remove(b.session_id)
+    c.updated_at -= 120
+    assert store.get(c.session_id) is None
+    assert gone == [a.session_id, b.session_id, c.session_id]
+
+
+def test_failed_flush_is_logged(caplog):
+    session = _session(ToteFeedSimulator(n_horses=4, seed=4))
+    stream = RaceStream(session, coalesce_ms=0)
+
+    def boom(changes):
+        raise RuntimeError("boom")
+    session.apply_odds = boom
+
+    async def run():
+        stream.push({0: 5.0})
+        await stream._flush_task
+
+    asyncio.run(run())
+    assert "stream flush failed" in caplog.text